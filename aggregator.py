@@ -0,0 +1,521 @@
+"""
+Multi-platform search aggregator for marketplace CLI.
+
+Fans one query out to Craigslist, OfferUp and Facebook Marketplace at the same
+time and streams normalized listings back as each platform answers:
+  * Location is resolved once per platform through location_handler
+  * Each platform runs under its own timeout and concurrency limit, so a slow
+    or broken platform only loses its own results
+  * Listings come out in the standardized normalizer schema, de-duplicated
+    within a run
+  * Every listing with coordinates is added to a session SpatialIndex as it
+    streams, so radius / bounding-box re-filtering never rescans results
+
+The existing scrapers are blocking, so each unit of platform work runs on a
+worker thread and the event loop only coordinates.
+
+Usage:
+    from aggregator import MarketplaceAggregator, SearchQuery
+
+    aggregator = MarketplaceAggregator()
+    query = SearchQuery("nintendo switch", "Pine Hill, NJ", max_price=300)
+
+    async for listing in aggregator.stream(query):
+        print(listing["platform"], listing["price"], listing["title"])
+    aggregator.index.within_radius((39.78, -74.99), 5)   # everything streamed so far
+
+    # Or, from synchronous code:
+    result = aggregate(query)
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import os
+import sys
+import time
+import urllib.parse
+
+from location_handler import search_params_for
+from normalizer import PLATFORMS, normalize_listing
+from spatial_index import SpatialIndex
+
+# Allow imports from the patched scraper when used as a script
+_CRAIGSLIST_DIR = Path(__file__).resolve().parent / "craigslist_scraper_patched"
+
+DEFAULT_FACEBOOK_SESSION = Path(__file__).resolve().parent / "facebook_session.json"
+
+WorkUnit = Callable[[], Iterable[Any]]
+
+
+@dataclass
+class SearchQuery:
+    query: str
+    location: str
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    radius_miles: int = 10
+    category: str = "sss"
+    limit: int = 50
+    # Top-K mode: only the best ``top_k`` listings by ``rank_by`` (see topk.RANK_FIELDS).
+    top_k: Optional[int] = None
+    rank_by: str = "price"
+    # Card-level filters, pushed into the Craigslist parser (see search.SearchFilters);
+    # other platforms apply them after normalizing. Distances are straight-line miles.
+    max_hours_old: Optional[float] = None
+    max_distance_miles: Optional[float] = None
+    exclude_terms: Sequence[str] = ()
+
+
+@dataclass
+class PlatformStatus:
+    platform: str
+    state: str = "pending"  # pending | running | done | timeout | error
+    count: int = 0
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "platform": self.platform,
+            "state": self.state,
+            "count": self.count,
+            "elapsed_seconds": self.elapsed_seconds,
+            "error": self.error,
+        }
+
+
+class PlatformAdapter:
+    """Base adapter: splits a query into blocking work units for one platform."""
+
+    name = ""
+    # True when the platform applies SearchQuery card filters while parsing.
+    filters_cards = False
+
+    def __init__(self, timeout: float = 60.0, max_concurrency: int = 2) -> None:
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+    def units(self, query: SearchQuery, params: Dict[str, Any]) -> List[WorkUnit]:
+        """Return callables that each fetch and return raw platform listings."""
+        raise NotImplementedError
+
+
+class CraigslistAdapter(PlatformAdapter):
+    name = "craigslist"
+    filters_cards = True
+
+    def __init__(
+        self,
+        timeout: float = 45.0,
+        max_concurrency: int = 3,
+        request_timeout: float = 20.0,
+        compute_distances: bool = False,
+    ) -> None:
+        super().__init__(timeout, max_concurrency)
+        self.request_timeout = request_timeout
+        self.compute_distances = compute_distances
+
+    def units(self, query: SearchQuery, params: Dict[str, Any]) -> List[WorkUnit]:
+        if str(_CRAIGSLIST_DIR) not in sys.path:
+            sys.path.insert(0, str(_CRAIGSLIST_DIR))
+        from search import SearchFilters, fetch_search
+
+        filters = None
+        if query.max_hours_old is not None or query.max_distance_miles is not None or query.exclude_terms:
+            filters = SearchFilters(
+                max_hours_old=query.max_hours_old,
+                max_distance_miles=query.max_distance_miles,
+                exclude_terms=query.exclude_terms,
+            )
+        if query.top_k:
+            return self._top_k_units(query, params, filters)
+
+        def run(site: str, postal: Optional[str], distance: Optional[int]) -> List[Any]:
+            search = fetch_search(
+                query=query.query,
+                city=site,
+                category=query.category,
+                postal=postal,
+                search_distance=distance,
+                min_price=query.min_price,
+                max_price=query.max_price,
+                origin_location=query.location if self.compute_distances or filters else None,
+                compute_distances=self.compute_distances,
+                filters=filters,
+                timeout=self.request_timeout,
+            )
+            return list(getattr(search, "ads", []))[:query.limit]
+
+        # A ZIP radius search on the primary site already covers the area.
+        if params.get("postal") and params.get("site"):
+            return [lambda: run(params["site"], params["postal"], params.get("search_distance"))]
+
+        sites = params.get("sites") or [params.get("site")]
+        return [lambda site=site: run(site, None, None) for site in sites if site]
+
+    def _top_k_units(self, query: SearchQuery, params: Dict[str, Any], filters: Any) -> List[WorkUnit]:
+        from topk import Ranker, TopK, craigslist_top_k
+
+        # Sites share one heap, so each stops paging at the metro-wide cut-off.
+        heap = TopK(query.top_k, Ranker(query.rank_by))
+
+        def run(site: str, postal: Optional[str], distance: Optional[int]) -> List[Any]:
+            return craigslist_top_k(
+                query.top_k,
+                query=query.query,
+                city=site,
+                category=query.category,
+                postal=postal,
+                search_distance=distance,
+                min_price=query.min_price,
+                max_price=query.max_price,
+                origin_location=query.location,
+                request_timeout=self.request_timeout,
+                filters=filters,
+                heap=heap,
+            ).items
+
+        if params.get("postal") and params.get("site"):
+            return [lambda: run(params["site"], params["postal"], params.get("search_distance"))]
+        sites = params.get("sites") or [params.get("site")]
+        return [lambda site=site: run(site, None, None) for site in sites if site]
+
+
+class OfferUpAdapter(PlatformAdapter):
+    name = "offerup"
+
+    def __init__(self, timeout: float = 30.0, max_concurrency: int = 1) -> None:
+        super().__init__(timeout, max_concurrency)
+
+    def units(self, query: SearchQuery, params: Dict[str, Any]) -> List[WorkUnit]:
+        try:
+            from pyOfferUp import fetch
+        except ImportError as exc:
+            raise ImportError(
+                "pyOfferUp is required for OfferUp searches. Install with: pip install pyOfferUp"
+            ) from exc
+
+        def run() -> List[Dict[str, Any]]:
+            return fetch.get_listings(
+                query=query.query,
+                state=params["state"],
+                city=params["city"],
+                limit=query.limit,
+            )
+
+        return [run]
+
+
+class FacebookAdapter(PlatformAdapter):
+    name = "facebook"
+
+    def __init__(
+        self,
+        timeout: float = 90.0,
+        max_concurrency: int = 1,
+        session_file: Optional[str] = None,
+        headless: bool = True,
+        scrolls: int = 3,
+    ) -> None:
+        super().__init__(timeout, max_concurrency)
+        self.session_file = Path(
+            session_file or os.environ.get("MARKETPLACE_FACEBOOK_SESSION", DEFAULT_FACEBOOK_SESSION)
+        )
+        self.headless = headless
+        self.scrolls = scrolls
+
+    def units(self, query: SearchQuery, params: Dict[str, Any]) -> List[WorkUnit]:
+        if not self.session_file.exists():
+            raise RuntimeError(
+                f"Facebook session not found at {self.session_file}. "
+                "Log in once with test_scripts/test_facebook_with_login.py to create it."
+            )
+        return [lambda: self._scrape(query, params)]
+
+    def _scrape(self, query: SearchQuery, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError as exc:
+            raise ImportError(
+                "playwright is required for Facebook searches. Install with: "
+                "pip install playwright && playwright install chromium"
+            ) from exc
+        from bs4 import BeautifulSoup
+
+        url_params = {"query": query.query}
+        if query.max_price is not None:
+            url_params["maxPrice"] = query.max_price
+        if query.min_price is not None:
+            url_params["minPrice"] = query.min_price
+        url = (
+            f"https://www.facebook.com/marketplace/{params['city_code']}/search/?"
+            f"{urllib.parse.urlencode(url_params)}"
+        )
+
+        with sync_playwright() as p:
+            browser = p.chromium.launch(
+                headless=self.headless,
+                args=["--disable-blink-features=AutomationControlled", "--disable-dev-shm-usage"],
+            )
+            try:
+                context = browser.new_context(storage_state=str(self.session_file))
+                page = context.new_page()
+                page.goto(url)
+                page.wait_for_timeout(3000)
+                for _ in range(self.scrolls):
+                    page.keyboard.press("End")
+                    page.wait_for_timeout(1000)
+                html = page.content()
+            finally:
+                browser.close()
+
+        return _parse_facebook_cards(BeautifulSoup(html, "html.parser"), query.limit)
+
+
+def _parse_facebook_cards(soup: Any, limit: int) -> List[Dict[str, Any]]:
+    """Pull title/price/location/image/url from Marketplace item links."""
+    items: List[Dict[str, Any]] = []
+    seen = set()
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if "/marketplace/item/" not in href or href in seen:
+            continue
+        seen.add(href)
+
+        texts = [span.get_text(strip=True) for span in link.find_all("span")]
+        texts = [text for text in dict.fromkeys(texts) if text]
+        price = next((text for text in texts if text.startswith("$") or text.lower() == "free"), None)
+        rest = [text for text in texts if text != price]
+        image = link.find("img")
+        items.append({
+            "title": rest[0] if rest else None,
+            "price": price,
+            "location": rest[1] if len(rest) > 1 else None,
+            "image": image.get("src") if image else None,
+            "url": f"https://www.facebook.com{href}" if href.startswith("/") else href,
+        })
+        if len(items) >= limit:
+            break
+    return items
+
+
+def default_adapters() -> Dict[str, PlatformAdapter]:
+    return {
+        "craigslist": CraigslistAdapter(),
+        "offerup": OfferUpAdapter(),
+        "facebook": FacebookAdapter(),
+    }
+
+
+def _price_in_range(listing: Dict[str, Any], query: SearchQuery) -> bool:
+    price = listing.get("price")
+    if price is None:
+        return True
+    if query.min_price is not None and price < query.min_price:
+        return False
+    if query.max_price is not None and price > query.max_price:
+        return False
+    return True
+
+
+def _origin_coords(query: SearchQuery) -> Optional[Tuple[float, float]]:
+    """Coordinates of the search location, for straight-line distance filtering."""
+    from location_handler import normalize_location
+
+    try:
+        location = normalize_location(query.location, query.radius_miles)
+    except Exception:
+        return None
+    if location.latitude is None or location.longitude is None:
+        return None
+    return location.latitude, location.longitude
+
+
+def _matches_filters(
+    listing: Dict[str, Any],
+    query: SearchQuery,
+    origin: Optional[Tuple[float, float]] = None,
+) -> bool:
+    """
+    Card-level filters for platforms that cannot apply them while parsing.
+
+    Distance is straight-line miles from ``origin`` to the listing's
+    coordinates, as in search.SearchFilters; unknown values are kept.
+    """
+    if query.exclude_terms:
+        title = (listing.get("title") or "").lower()
+        if any(term.lower() in title for term in query.exclude_terms):
+            return False
+    hours = listing.get("posted_hours_ago")
+    if query.max_hours_old is not None and hours is not None and hours > query.max_hours_old:
+        return False
+    latitude, longitude = listing.get("latitude"), listing.get("longitude")
+    if query.max_distance_miles is not None and origin and latitude is not None and longitude is not None:
+        from distance_utils import geodesic_distance_miles
+
+        if geodesic_distance_miles(origin, (latitude, longitude)) > query.max_distance_miles:
+            return False
+    return True
+
+
+class MarketplaceAggregator:
+    def __init__(
+        self,
+        adapters: Optional[Dict[str, PlatformAdapter]] = None,
+        on_status: Optional[Callable[[PlatformStatus], None]] = None,
+        index: Optional[SpatialIndex] = None,
+    ) -> None:
+        """Concurrent multi-platform search.
+
+        Args:
+            adapters: Platform name -> adapter (defaults to all three platforms)
+            on_status: Called whenever a platform starts, finishes, fails or times out
+            index: Spatial index that streamed listings are added to (default: a new one
+                   shared by every search this aggregator runs)
+        """
+        self.adapters = adapters if adapters is not None else default_adapters()
+        self.on_status = on_status
+        self.index = index if index is not None else SpatialIndex()
+        self.status: Dict[str, PlatformStatus] = {}
+
+    def _set_status(self, status: PlatformStatus, state: str, error: Optional[str] = None) -> None:
+        status.state = state
+        status.error = error
+        if self.on_status:
+            self.on_status(status)
+
+    async def stream(
+        self,
+        query: SearchQuery,
+        platforms: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield normalized listings as each platform's work units complete."""
+        selected = [name for name in (platforms or PLATFORMS) if name in self.adapters]
+        self.status = {name: PlatformStatus(name) for name in selected}
+        if not selected:
+            return
+
+        captured_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        queue: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+
+        # Dedicated pool so a hung platform can't starve the loop's default executor.
+        # One extra worker resolves the origin while the adapters already fetch.
+        pool_size = sum(self.adapters[name].max_concurrency for name in selected) + 1
+        executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="aggregator")
+        loop = asyncio.get_running_loop()
+        origin_future = None
+        if query.max_distance_miles is not None:
+            origin_future = loop.run_in_executor(executor, _origin_coords, query)
+
+        async def run_platform(name: str) -> None:
+            adapter = self.adapters[name]
+            status = self.status[name]
+            started = time.monotonic()
+            semaphore = asyncio.Semaphore(adapter.max_concurrency)
+
+            async def run_unit(unit: WorkUnit) -> None:
+                async with semaphore:
+                    raw_items = await loop.run_in_executor(executor, lambda: list(unit()))
+                # Only needed (and awaited) once a platform without card filters has results.
+                origin = None
+                if origin_future is not None and raw_items and not adapter.filters_cards:
+                    origin = await origin_future
+                listings = []
+                for raw in raw_items:
+                    listing = normalize_listing(name, raw, captured_at=captured_at)
+                    if not _price_in_range(listing, query):
+                        continue
+                    if adapter.filters_cards or _matches_filters(listing, query, origin):
+                        listings.append(listing)
+                status.count += len(listings)
+                await queue.put(listings)
+
+            self._set_status(status, "running")
+            state, error = "done", None
+            try:
+                params = await loop.run_in_executor(
+                    executor, search_params_for, query.location, name, query.radius_miles
+                )
+                units = adapter.units(query, params)
+                await asyncio.wait_for(
+                    asyncio.gather(*(run_unit(unit) for unit in units)),
+                    timeout=adapter.timeout,
+                )
+            except asyncio.TimeoutError:
+                state, error = "timeout", f"no response within {adapter.timeout:g}s"
+            except Exception as exc:
+                state, error = "error", f"{type(exc).__name__}: {exc}"
+            status.elapsed_seconds = round(time.monotonic() - started, 3)
+            self._set_status(status, state, error)
+
+        async def run_all() -> None:
+            try:
+                await asyncio.gather(*(run_platform(name) for name in selected))
+            finally:
+                await queue.put(done_marker)
+
+        runner = asyncio.create_task(run_all())
+        seen_ids = set()
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is done_marker:
+                    break
+                for listing in batch:
+                    listing_id = listing["id"]
+                    if listing_id is not None:
+                        if listing_id in seen_ids:
+                            continue
+                        seen_ids.add(listing_id)
+                    self.index.insert_listing(listing)
+                    yield listing
+        finally:
+            if not runner.done():
+                runner.cancel()
+            # Timed-out threads keep running in the background; don't wait on them.
+            executor.shutdown(wait=False)
+
+    async def top_k(
+        self,
+        query: SearchQuery,
+        platforms: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Best ``query.top_k`` listings across platforms by ``query.rank_by``, best first.
+
+        Platforms that support it (Craigslist) page in rank order and stop at
+        the cut-off; the rest are merged through the same bounded heap.
+        """
+        from topk import Ranker, TopK
+
+        heap = TopK(query.top_k or query.limit, Ranker(query.rank_by))
+        async for listing in self.stream(query, platforms):
+            heap.push(listing)
+        return heap.items()
+
+    async def search(
+        self,
+        query: SearchQuery,
+        platforms: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Collect every listing plus per-platform status."""
+        listings = [listing async for listing in self.stream(query, platforms)]
+        return {
+            "query": query.__dict__.copy(),
+            "listings": listings,
+            "platforms": {name: status.to_dict() for name, status in self.status.items()},
+        }
+
+
+def aggregate(
+    query: SearchQuery,
+    platforms: Optional[Sequence[str]] = None,
+    adapters: Optional[Dict[str, PlatformAdapter]] = None,
+) -> Dict[str, Any]:
+    """Synchronous wrapper around MarketplaceAggregator.search."""
+    return asyncio.run(MarketplaceAggregator(adapters).search(query, platforms))
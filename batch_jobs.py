@@ -0,0 +1,248 @@
+"""
+Resumable, checkpointed batch jobs for marketplace CLI.
+
+Long runs (a multi-search tier-1 sweep, a 500-ad tier-2 pass) used to write
+results only at the end, so a crash or a throttling ban halfway lost
+everything. A BatchJob checkpoints each completed unit of work as it finishes:
+  * Units have stable keys (search name + page, posting URL / listing ID);
+    a unit's result is stored and the unit marked done in one transaction, so
+    re-running a job skips finished units and repeats no network work
+  * Retries are idempotent: a unit is either done (result stored once,
+    replaced on conflict) or not, and failed attempts are counted so a unit
+    that keeps failing is given up on after ``max_attempts`` across restarts
+  * Checkpoints live in the listing database file (see listing_db.py) and
+    jobs can be stopped (Ctrl-C) and restarted freely
+
+Usage:
+    from batch_jobs import BatchJob
+
+    job = BatchJob("tier1-2025-11-20", kind="tier1")
+    for key, result in job.run(units, worker):     # units: [(key, payload), ...]
+        ...                                        # all results, resumed ones included
+
+    job.status()        # {"done": 12, "failed": 1, "pending": 3}
+
+    python cli.py details results.json --top 500 --job tier2-sweep   # rerun to resume
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import time
+
+from listing_db import ListingDB
+import serialization
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT,
+    params TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_units (
+    job_id TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, unit_key)
+) WITHOUT ROWID;
+"""
+
+UNIT_STATES = ("pending", "done", "failed")
+
+Unit = Tuple[str, Any]
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class BatchJob:
+    def __init__(
+        self,
+        job_id: str,
+        db: Optional[ListingDB] = None,
+        kind: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        A named job whose unit results are checkpointed in the listing database.
+
+        Args:
+            job_id: Stable name; reusing it resumes the job
+            db: Listing database holding the checkpoint tables (default: MARKETPLACE_DB)
+            kind: Free-form job type ("tier1", "tier2", ...)
+            params: Job parameters, stored on first creation for reference
+        """
+        self.job_id = job_id
+        self.db = db or ListingDB()
+        self.db.conn.executescript(JOBS_SCHEMA)
+        now = _utc_now()
+        with self.db.conn:
+            self.db.conn.execute(
+                "INSERT OR IGNORE INTO batch_jobs (job_id, kind, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, serialization.dumps(params or {}).decode(), now, now),
+            )
+
+    # --------------------------------------------------------- checkpoints
+    def register(self, keys: Sequence[str]) -> None:
+        """Add units (idempotent; existing units keep their state and position)."""
+        start = self.db.conn.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM batch_units WHERE job_id = ?", (self.job_id,)
+        ).fetchone()[0]
+        now = _utc_now()
+        with self.db.conn:
+            self.db.conn.executemany(
+                "INSERT OR IGNORE INTO batch_units (job_id, unit_key, position, status, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?)",
+                [(self.job_id, key, start + offset, now) for offset, key in enumerate(keys)],
+            )
+
+    def record(self, key: str, result: Any) -> None:
+        """Store a unit's result and mark it done, in one transaction."""
+        now = _utc_now()
+        payload = serialization.dumps(result, omit_defaults=False).decode()
+        with self.db.conn:
+            self.db.conn.execute(
+                "INSERT INTO batch_units (job_id, unit_key, position, status, attempts, result, updated_at) "
+                "VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM batch_units WHERE job_id = ?), "
+                "'done', 1, ?, ?) "
+                "ON CONFLICT(job_id, unit_key) DO UPDATE SET "
+                "status = 'done', attempts = attempts + 1, result = excluded.result, error = NULL, "
+                "updated_at = excluded.updated_at",
+                (self.job_id, key, self.job_id, payload, now),
+            )
+            self.db.conn.execute("UPDATE batch_jobs SET updated_at = ? WHERE job_id = ?", (now, self.job_id))
+
+    def record_failure(self, key: str, error: str, give_up: bool) -> None:
+        """Count a failed attempt; ``give_up`` marks the unit failed (not retried on resume)."""
+        with self.db.conn:
+            self.db.conn.execute(
+                "UPDATE batch_units SET attempts = attempts + 1, error = ?, status = ?, updated_at = ? "
+                "WHERE job_id = ? AND unit_key = ?",
+                (error, "failed" if give_up else "pending", _utc_now(), self.job_id, key),
+            )
+
+    def attempts(self, key: str) -> int:
+        row = self.db.conn.execute(
+            "SELECT attempts FROM batch_units WHERE job_id = ? AND unit_key = ?", (self.job_id, key)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def completed(self) -> Dict[str, Any]:
+        """key -> stored result for every done unit, in registration order."""
+        rows = self.db.conn.execute(
+            "SELECT unit_key, result FROM batch_units WHERE job_id = ? AND status = 'done' ORDER BY position",
+            (self.job_id,),
+        )
+        return {row["unit_key"]: serialization.loads(row["result"], expand=False) for row in rows}
+
+    def status(self) -> Dict[str, int]:
+        counts = {state: 0 for state in UNIT_STATES}
+        rows = self.db.conn.execute(
+            "SELECT status, COUNT(*) FROM batch_units WHERE job_id = ? GROUP BY status", (self.job_id,)
+        )
+        for state, count in rows:
+            counts[state] = count
+        return counts
+
+    def reset_failed(self) -> int:
+        """Make given-up units eligible again (attempt counts restart)."""
+        with self.db.conn:
+            return self.db.conn.execute(
+                "UPDATE batch_units SET status = 'pending', attempts = 0 WHERE job_id = ? AND status = 'failed'",
+                (self.job_id,),
+            ).rowcount
+
+    def delete(self) -> None:
+        with self.db.conn:
+            self.db.conn.execute("DELETE FROM batch_units WHERE job_id = ?", (self.job_id,))
+            self.db.conn.execute("DELETE FROM batch_jobs WHERE job_id = ?", (self.job_id,))
+
+    # ---------------------------------------------------------------- run
+    def run(
+        self,
+        units: Iterable[Unit],
+        worker: Callable[[Any], Any],
+        max_attempts: int = 3,
+        backoff_seconds: float = 2.0,
+        workers: int = 1,
+        on_result: Optional[Callable[[str, Any, bool], None]] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Run ``worker(payload)`` for every unit not already done; yield (key, result) for all units.
+
+        Results restored from the checkpoint are yielded first, then new ones
+        as they complete. A failing unit is retried with exponential backoff
+        up to ``max_attempts`` attempts in total (counted across restarts);
+        after that it is marked failed and skipped.
+
+        Args:
+            units: (key, payload) pairs; keys must be stable between runs
+            worker: Does the work for one payload (network fetch etc.)
+            max_attempts: Attempts per unit across all runs of the job
+            backoff_seconds: First retry delay; doubles on every retry
+            workers: Units run concurrently
+            on_result: Called with (key, result, resumed) for every yielded result
+        """
+        pending: List[Unit] = list(units)
+        self.register([key for key, _ in pending])
+        done = self.completed()
+        failed = {
+            row["unit_key"] for row in self.db.conn.execute(
+                "SELECT unit_key FROM batch_units WHERE job_id = ? AND status = 'failed'", (self.job_id,)
+            )
+        }
+
+        for key, _ in pending:
+            if key in done:
+                if on_result is not None:
+                    on_result(key, done[key], True)
+                yield key, done[key]
+
+        todo = [(key, payload) for key, payload in pending if key not in done and key not in failed]
+
+        def attempt(key: str, payload: Any) -> Tuple[str, Any, Optional[Exception]]:
+            previous = self.attempts(key)
+            while True:
+                try:
+                    result = worker(payload)
+                except Exception as exc:
+                    previous += 1
+                    give_up = previous >= max_attempts
+                    self.record_failure(key, f"{type(exc).__name__}: {exc}", give_up)
+                    if give_up:
+                        return key, None, exc
+                    time.sleep(backoff_seconds * 2 ** (previous - 1))
+                    continue
+                self.record(key, result)
+                return key, result, None
+
+        if workers <= 1:
+            for key, payload in todo:
+                key, result, error = attempt(key, payload)
+                if error is None:
+                    if on_result is not None:
+                        on_result(key, result, False)
+                    yield key, result
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(attempt, key, payload) for key, payload in todo]
+            try:
+                for future in as_completed(futures):
+                    key, result, error = future.result()
+                    if error is None:
+                        if on_result is not None:
+                            on_result(key, result, False)
+                        yield key, result
+            finally:
+                for future in futures:
+                    future.cancel()
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+marketplace-cli command line entry point.
+
+Examples:
+    python cli.py search --query "nintendo switch" --location "Philadelphia, PA" \\
+        --max-price 200 --platforms craigslist offerup --output results.json
+
+    python cli.py search --query "nintendo switch" --location 08021 \\
+        --all-platforms --format csv --output aggregated.csv
+
+    python cli.py search --query "nintendo switch" --location 08021 --format ndjson | jq .title
+
+    python cli.py watch --query "nintendo switch" --location 08021 --max-rpm 10 --output new.ndjson
+
+    python cli.py diff yesterday.ndjson today.ndjson --only added price_changed
+
+    python cli.py query today.ndjson --where "price<=200" --where "condition in good,excellent" \\
+        --near 39.95,-75.16 --within 15 --sort price --limit 20 --format csv
+"""
+
+from typing import Any, Dict, List, Optional, TextIO
+import argparse
+import asyncio
+import csv
+import sys
+import threading
+import time
+
+from aggregator import MarketplaceAggregator, PlatformStatus, SearchQuery, default_adapters
+from location_handler import search_params_for
+from normalizer import PLATFORMS, normalize_listing
+import serialization
+from snapshot_diff import CHANGE_TYPES
+from topk import RANK_FIELDS
+
+CSV_FIELDS = [
+    "platform",
+    "title",
+    "price",
+    "location",
+    "distance_miles",
+    "url",
+    "posted_date",
+    "condition",
+    "image_url",
+    "id",
+    "cluster_id",
+    "deal_score",
+    "deal_flag",
+]
+
+# Recent listings from --db that seed deal-score comparables.
+DEAL_HISTORY_LIMIT = 50000
+
+
+def _print_status(status: PlatformStatus) -> None:
+    if status.state == "running":
+        print(f"[{status.platform}] searching...", file=sys.stderr)
+    elif status.state == "done":
+        print(f"[{status.platform}] {status.count} listings", file=sys.stderr)
+    else:
+        print(f"[{status.platform}] {status.state}: {status.error}", file=sys.stderr)
+
+
+def _open_output(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+class _JSONOutput:
+    """Single JSON document; needs the whole run, so it is written at the end."""
+
+    def __init__(self, path: str, compact: bool = False) -> None:
+        self.path = path
+        self.compact = compact
+        self.listings: List[Dict[str, Any]] = []
+
+    def write(self, listing: Dict[str, Any]) -> None:
+        self.listings.append(listing)
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        # Compact drops null/default listing fields; load with serialization.load().
+        data = serialization.dumps(
+            dict(summary, listings=self.listings),
+            pretty=not self.compact,
+            omit_defaults=self.compact,
+        ) + b"\n"
+        if self.path == "-":
+            sys.stdout.flush()
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        else:
+            with open(self.path, "wb") as handle:
+                handle.write(data)
+
+
+class _CSVOutput:
+    def __init__(self, path: str, fields: Optional[List[str]] = None) -> None:
+        self.handle = _open_output(path)
+        self.writer = csv.DictWriter(self.handle, fieldnames=fields or CSV_FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, listing: Dict[str, Any]) -> None:
+        self.writer.writerow(listing)
+        self.handle.flush()
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        if self.handle is not sys.stdout:
+            self.handle.close()
+
+
+class _NDJSONOutput:
+    def __init__(self, path: str) -> None:
+        from ndjson_sink import NDJSONSink
+
+        self.sink = NDJSONSink(path)
+
+    def write(self, listing: Dict[str, Any]) -> None:
+        self.sink.write(listing)
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        self.sink.close(summary)
+
+
+_OUTPUTS = {"json": _JSONOutput, "csv": _CSVOutput, "ndjson": _NDJSONOutput}
+
+
+async def _run_search(args: argparse.Namespace) -> int:
+    platforms = list(PLATFORMS) if args.all_platforms else args.platforms
+    image_pipeline = None
+    if args.image_hashes:
+        from images import ImagePipeline
+
+        # Built before searching so a missing Pillow fails fast, not after every request.
+        try:
+            image_pipeline = ImagePipeline()
+        except ImportError as exc:
+            print(f"error: --image-hashes: {exc}", file=sys.stderr)
+            return 2
+    query = SearchQuery(
+        query=args.query,
+        location=args.location,
+        min_price=args.min_price,
+        max_price=args.max_price,
+        radius_miles=args.radius,
+        category=args.category,
+        limit=args.limit,
+        top_k=args.top_k,
+        rank_by=args.rank_by,
+        max_hours_old=args.max_age_hours,
+        max_distance_miles=args.max_miles,
+        exclude_terms=args.exclude or (),
+    )
+
+    adapters = default_adapters()
+    if args.timeout is not None:
+        for adapter in adapters.values():
+            adapter.timeout = args.timeout
+    aggregator = MarketplaceAggregator(adapters, on_status=_print_status)
+
+    if args.format == "json":
+        output = _JSONOutput(args.output, compact=args.compact)
+    else:
+        output = _OUTPUTS[args.format](args.output)
+    # Post-processing needs the full result set; otherwise listings stream straight out.
+    post_process = args.dedupe or args.image_hashes or args.deals or args.top_k
+    keep = post_process or args.store or args.db
+    listings: List[Dict[str, Any]] = []
+    db = None
+    if args.db:
+        from listing_db import ListingDB
+
+        db = ListingDB(args.db)
+
+    async for listing in aggregator.stream(query, platforms):
+        if not post_process:
+            output.write(listing)
+        if keep:
+            listings.append(listing)
+
+    if args.top_k:
+        from topk import Ranker, TopK
+
+        # Merge per-platform candidates before any per-listing post-processing.
+        best = TopK(args.top_k, Ranker(args.rank_by))
+        for listing in listings:
+            best.push(listing)
+        listings = best.items()
+
+    if image_pipeline is not None:
+        image_pipeline.attach(listings)
+
+    if args.dedupe:
+        from dedupe import assign_clusters
+
+        assign_clusters(listings)
+
+    if args.deals:
+        from deal_scoring import DealScorer
+
+        scorer = DealScorer()
+        if db is not None:
+            scorer.update(db.query(order_by="last_seen DESC", limit=DEAL_HISTORY_LIMIT))
+        scorer.assign(listings)
+
+    if post_process:
+        for listing in listings:
+            output.write(listing)
+    output.finish({
+        "query": query.__dict__,
+        "platforms": {name: s.to_dict() for name, s in aggregator.status.items()},
+    })
+
+    if args.store:
+        from columnar_store import ListingStore
+
+        written = ListingStore(args.store).write(listings, search=args.query)
+        print(f"Stored {written} listings in {args.store}", file=sys.stderr)
+
+    if db is not None:
+        from price_history import PriceHistory
+
+        session_id = db.create_session(name=args.query, params=query.__dict__)
+        written = db.upsert(listings, session_id=session_id)
+        PriceHistory(db).record_listings(listings)
+        print(f"Recorded {written} listings in {args.db} (session {session_id})", file=sys.stderr)
+
+    failed = [s for s in aggregator.status.values() if s.state != "done"]
+    return 1 if failed and len(failed) == len(aggregator.status) else 0
+
+
+def _run_watch(args: argparse.Namespace) -> int:
+    from listing_db import ListingDB
+    from ndjson_sink import NDJSONSink
+    from poll_scheduler import PollScheduler
+    from price_history import PriceHistory
+    from watch import SeenStore, Watcher
+
+    params = search_params_for(args.location, "craigslist", args.radius)
+    if params.get("postal") and params.get("site"):
+        targets = [(params["site"], params["postal"], params.get("search_distance"))]
+    else:
+        targets = [(site, None, None) for site in params.get("sites") or [params.get("site")] if site]
+
+    db = ListingDB(args.db)
+    store = SeenStore(db)
+    history = PriceHistory(db)
+    watchers = [
+        Watcher(
+            query=args.query,
+            city=site,
+            category=args.category,
+            postal=postal,
+            search_distance=distance,
+            min_price=args.min_price,
+            max_price=args.max_price,
+            origin_location=args.location,
+            name=f"{args.name}:{site}" if args.name else None,
+            store=store,
+            max_pages=args.max_pages,
+            fetch_details=args.details,
+        )
+        for site, postal, distance in targets
+    ]
+
+    scorer = None
+    scorer_lock = threading.Lock()
+    if args.deals:
+        from deal_scoring import DealScorer
+
+        scorer = DealScorer()
+        scorer.update(db.query(platform="craigslist", order_by="last_seen DESC", limit=DEAL_HISTORY_LIMIT))
+
+    def emit(watcher: Any, result: Any) -> None:
+        fresh = []
+        for status, ads in (("new", result.new), ("changed", result.changed)):
+            for ad in ads:
+                listing = normalize_listing("craigslist", ad.to_dict())
+                listing["watch_status"] = status
+                fresh.append(listing)
+        if scorer is not None:
+            with scorer_lock:  # Polls finish on several scheduler threads
+                scorer.assign(fresh)
+        for listing in fresh:
+            sink.write(listing)
+        db.upsert(fresh)
+        history.record_listings(fresh)
+        print(
+            f"[watch] {watcher.key}: {len(result.new)} new, {len(result.changed)} changed "
+            f"({result.pages} pages, {result.elapsed_seconds}s)",
+            file=sys.stderr,
+        )
+
+    with NDJSONSink(args.output, append=args.output != "-") as sink:
+        if args.once:
+            for watcher in watchers:
+                emit(watcher, watcher.poll())
+            return 0
+
+        scheduler = PollScheduler(
+            max_requests_per_minute=args.max_rpm,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+        )
+        for watcher in watchers:
+            scheduler.add(watcher)
+        try:
+            scheduler.run(
+                on_result=lambda search, result: emit(search.watcher, result),
+                on_error=lambda search, exc: print(f"[watch] {search.key}: {exc}", file=sys.stderr),
+            )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+
+def _run_diff(args: argparse.Namespace) -> int:
+    from ndjson_sink import NDJSONSink
+    from snapshot_diff import diff_snapshots, filter_changes
+
+    changes = diff_snapshots(args.old, args.new, platform=args.platform, include_listing=args.full)
+    counts: Dict[str, int] = {}
+    with NDJSONSink(args.output) as sink:
+        for change in filter_changes(changes, only=args.only, min_drop_pct=args.min_drop_pct):
+            sink.write(change)
+            counts[change["change"]] = counts.get(change["change"], 0) + 1
+        sink.close({"changes": counts})
+    print(", ".join(f"{count} {kind}" for kind, count in counts.items()) or "no changes", file=sys.stderr)
+    return 0
+
+
+def _run_details(args: argparse.Namespace) -> int:
+    from ndjson_sink import NDJSONSink
+    from snapshot_diff import iter_snapshot
+    from tier2_scheduler import Tier2Scheduler
+
+    listings = list(iter_snapshot(args.source, platform=args.platform))
+    scheduler = Tier2Scheduler(query=args.query, max_workers=args.workers)
+    ranked = scheduler.submit(listings)
+    # 1-based positions in the tier-1 output, as printed by search.
+    wanted = [listings[index - 1]["id"] for index in args.indices or [] if 0 < index <= len(listings)]
+    budget = args.max_requests if args.max_requests is not None else args.top
+    try:
+        if args.job:
+            results = _run_details_job(args, scheduler, wanted or scheduler.ranked()[:budget])
+        elif args.indices:
+            fetched = scheduler.fetch(wanted, raise_errors=False)
+            results = [result for result in fetched if result is not None]
+        else:
+            results = scheduler.run(max_requests=budget, max_seconds=args.max_seconds)
+    finally:
+        scheduler.close()
+
+    with NDJSONSink(args.output) as sink:
+        for listing in results:
+            sink.write(listing)
+        sink.close({"source": args.source, "candidates": len(ranked), "fetched": len(results)})
+
+    if args.db:
+        from listing_db import ListingDB
+        from price_history import PriceHistory
+
+        db = ListingDB(args.db)
+        db.upsert(results)
+        PriceHistory(db).record_listings(results)
+    print(f"Fetched details for {len(results)} of {len(ranked)} candidates", file=sys.stderr)
+    return 0
+
+
+def _run_details_job(args: argparse.Namespace, scheduler: Any, listing_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch ``listing_ids`` as units of a checkpointed BatchJob, one per posting.
+
+    Fetched listings are stored as they land and failed fetches are retried
+    with backoff and counted, so a rerun with the same --job skips finished
+    postings and gives up on ones that keep failing.
+    """
+    from batch_jobs import BatchJob
+    from listing_db import ListingDB
+
+    job = BatchJob(args.job, db=ListingDB(args.db), kind="tier2", params={"source": args.source})
+    done = job.status()["done"]
+    if done:
+        print(f"Resuming job {args.job}: {done} listings already fetched", file=sys.stderr)
+
+    def fetch_one(listing_id: str) -> Dict[str, Any]:
+        result = scheduler.fetch([listing_id])[0]
+        if result is None:
+            raise RuntimeError(f"No detail fetcher for {listing_id}")
+        return result
+
+    deadline = time.monotonic() + args.max_seconds if args.max_seconds is not None else None
+    results = []
+    units = [
+        (listing_id, listing_id) for listing_id in listing_ids
+        if scheduler.listings[listing_id].get("platform") in scheduler.fetchers
+    ]
+    for _, listing in job.run(units, fetch_one, max_attempts=args.max_attempts, workers=args.workers):
+        results.append(listing)
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    status = job.status()
+    if status["failed"]:
+        print(f"Job {args.job}: gave up on {status['failed']} listings", file=sys.stderr)
+    return results
+
+
+def _run_query(args: argparse.Namespace) -> int:
+    from query_engine import ListingFrame
+
+    started = time.perf_counter()
+    frame = ListingFrame.from_source(args.source, platform=args.platform)
+    loaded = time.perf_counter()
+
+    query = frame.query()
+    for expression in args.where or []:
+        query.where_expression(expression)
+    if args.near:
+        latitude, longitude = (float(part) for part in args.near.split(","))
+        query.within(latitude, longitude, args.within)
+    for key in args.sort or []:
+        field, _, direction = key.partition(":")
+        query.sort(field, descending=direction.lower() == "desc")
+    if args.limit is not None:
+        query.limit(args.limit)
+
+    if args.group_by or args.agg:
+        records = query.aggregate(args.group_by, args.agg or ["count"])
+        fields = list(records[0]) if records else None
+    else:
+        fields = args.fields
+        records = query.rows(fields)
+    elapsed = time.perf_counter() - loaded
+
+    if args.format == "csv":
+        output = _CSVOutput(args.output, fields=fields)
+    else:
+        output = _OUTPUTS[args.format](args.output)
+    for record in records:
+        output.write(record)
+    summary = {"source": args.source, "scanned": len(frame), "matched": query.count(), "returned": len(records)}
+    output.finish(summary)
+    print(
+        f"{summary['matched']} of {len(frame)} listings matched "
+        f"(load {loaded - started:.2f}s, query {elapsed * 1000:.0f}ms)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="marketplace-cli", description="Search local marketplaces")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="Search one or more platforms concurrently")
+    search.add_argument("--query", required=True, help="Search terms")
+    search.add_argument("--location", required=True, help='City, "City, ST" or ZIP code')
+    search.add_argument("--min-price", type=int)
+    search.add_argument("--max-price", type=int)
+    search.add_argument("--radius", type=int, default=10, help="Search radius in miles")
+    search.add_argument("--category", default="sss", help="Craigslist category code")
+    search.add_argument("--max-age-hours", type=float, help="Skip listings posted longer ago than this")
+    search.add_argument("--max-miles", type=float, help="Skip listings farther than this (straight line)")
+    search.add_argument("--exclude", nargs="+", help="Skip listings whose title contains any of these words")
+    search.add_argument("--limit", type=int, default=50, help="Max listings per platform request")
+    search.add_argument("--platforms", nargs="+", choices=PLATFORMS, default=["craigslist"])
+    search.add_argument("--all-platforms", action="store_true")
+    search.add_argument("--top-k", type=int, help="Only the best N listings (pages stop at the cut-off)")
+    search.add_argument(
+        "--rank-by", choices=RANK_FIELDS, default="price", help="Ranking for --top-k (default: price)"
+    )
+    search.add_argument("--timeout", type=float, help="Per-platform timeout in seconds")
+    search.add_argument("--dedupe", action="store_true", help="Cluster cross-posts and reposts")
+    search.add_argument(
+        "--image-hashes", action="store_true", help="Download images and add perceptual hashes"
+    )
+    search.add_argument(
+        "--deals", action="store_true", help="Score listings against comparable prices (uses --db history)"
+    )
+    search.add_argument("--format", choices=sorted(_OUTPUTS), default="json")
+    search.add_argument("--output", default="-", help="Output file (default: stdout)")
+    search.add_argument(
+        "--compact", action="store_true", help="JSON without whitespace or null/default listing fields"
+    )
+    search.add_argument("--store", help="Also append results to this Parquet listing store")
+    search.add_argument("--db", help="Also record results in this SQLite listing database")
+    search.set_defaults(func=lambda args: asyncio.run(_run_search(args)))
+
+    watch = subparsers.add_parser("watch", help="Poll a Craigslist search and emit only new listings")
+    watch.add_argument("--query", required=True, help="Search terms")
+    watch.add_argument("--location", required=True, help='City, "City, ST" or ZIP code')
+    watch.add_argument("--min-price", type=int)
+    watch.add_argument("--max-price", type=int)
+    watch.add_argument("--radius", type=int, default=10, help="Search radius in miles")
+    watch.add_argument("--category", default="sss", help="Craigslist category code")
+    watch.add_argument("--name", help="Saved-search name (default: derived from the search URL)")
+    watch.add_argument("--min-interval", type=float, default=120, help="Fastest poll interval (seconds)")
+    watch.add_argument("--max-interval", type=float, default=6 * 3600, help="Slowest poll interval (seconds)")
+    watch.add_argument("--max-rpm", type=float, default=20, help="Global requests-per-minute ceiling")
+    watch.add_argument("--once", action="store_true", help="Poll once and exit")
+    watch.add_argument("--max-pages", type=int, default=5, help="Page cap per poll")
+    watch.add_argument("--details", action="store_true", help="Fetch full ad pages for new listings")
+    watch.add_argument("--deals", action="store_true", help="Add deal scores against the database's comparables")
+    watch.add_argument("--output", default="-", help="NDJSON output file, appended to (default: stdout)")
+    watch.add_argument("--db", help="Listing database holding the seen IDs (default: MARKETPLACE_DB)")
+    watch.set_defaults(func=_run_watch)
+
+    diff = subparsers.add_parser("diff", help="Compare two captures (JSON, NDJSON or Parquet)")
+    diff.add_argument("old", help="Earlier capture file or listing store directory")
+    diff.add_argument("new", help="Later capture file or listing store directory")
+    diff.add_argument("--only", nargs="+", choices=CHANGE_TYPES, help="Change types to report")
+    diff.add_argument("--min-drop-pct", type=float, help="Only price drops of at least this percent")
+    diff.add_argument("--platform", choices=PLATFORMS, help="Platform of raw (non-normalized) listings")
+    diff.add_argument("--full", action="store_true", help="Include the full new listing in each change")
+    diff.add_argument("--output", default="-", help="NDJSON output file (default: stdout)")
+    diff.set_defaults(func=_run_diff)
+
+    details = subparsers.add_parser("details", help="Fetch tier-2 details, best candidates first")
+    details.add_argument("source", help="Tier-1 capture file (JSON, NDJSON, Parquet) or listing store directory")
+    details.add_argument("--indices", nargs="+", type=int, help="1-based listings to fetch (default: best-ranked)")
+    details.add_argument("--top", type=int, default=10, help="Listings to fetch when no --indices (default: 10)")
+    details.add_argument("--max-requests", type=int, help="Request budget (default: --top)")
+    details.add_argument("--max-seconds", type=float, help="Time budget in seconds")
+    details.add_argument("--query", help="Search text, used to rank title matches")
+    details.add_argument("--workers", type=int, default=2, help="Concurrent detail fetches")
+    details.add_argument("--platform", choices=PLATFORMS, help="Platform of raw (non-normalized) listings")
+    details.add_argument("--db", help="Also record fetched listings in this SQLite listing database")
+    details.add_argument("--job", help="Checkpoint fetched listings under this job name; rerun to resume")
+    details.add_argument(
+        "--max-attempts", type=int, default=3, help="Attempts per listing before --job gives up on it (default: 3)"
+    )
+    details.add_argument("--output", default="-", help="NDJSON output file (default: stdout)")
+    details.set_defaults(func=_run_details)
+
+    query = subparsers.add_parser("query", help="Filter, sort and aggregate a capture")
+    query.add_argument("source", help="Capture file (JSON, NDJSON, Parquet) or listing store directory")
+    query.add_argument(
+        "--where",
+        action="append",
+        help='Filter such as "price<=200", "platform=craigslist", "title~switch" (repeatable, ANDed)',
+    )
+    query.add_argument("--near", help='Center point "lat,lon" for --within')
+    query.add_argument("--within", type=float, default=10, help="Radius in miles around --near")
+    query.add_argument("--sort", action="append", help='Sort key "field" or "field:desc" (repeatable)')
+    query.add_argument("--limit", type=int, help="Max listings to return")
+    query.add_argument("--fields", nargs="+", help="Fields to output (default: whole listing)")
+    query.add_argument("--group-by", help="Category field to group by (platform, site, condition, ...)")
+    query.add_argument("--agg", nargs="+", help='Aggregates such as count "price:median" "price:min"')
+    query.add_argument("--platform", choices=PLATFORMS, help="Platform of raw (non-normalized) listings")
+    query.add_argument("--format", choices=sorted(_OUTPUTS), default="ndjson")
+    query.add_argument("--output", default="-", help="Output file (default: stdout)")
+    query.set_defaults(func=_run_query)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
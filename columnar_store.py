@@ -0,0 +1,226 @@
+"""
+Columnar listing store for marketplace CLI.
+
+Persists normalized listings (see normalizer.py) as Parquet, partitioned
+Hive-style by platform, capture date and search:
+
+    <root>/platform=craigslist/capture_date=2025-11-02/search=nintendo-switch/part-*.parquet
+
+Reads only touch the columns and partitions they need: pass ``columns`` for
+projection and ``filters`` for predicate pushdown (partition pruning plus
+Parquet row-group statistics), so a price histogram over months of history
+reads two columns instead of re-parsing every JSON capture.
+
+Requires pyarrow (pip install pyarrow).
+
+Usage:
+    from columnar_store import ListingStore
+
+    store = ListingStore("data/listings")
+    store.write(listings, search="nintendo switch")
+    table = store.read(columns=["platform", "price"],
+                       filters=[("platform", "=", "craigslist"), ("price", "<", 200)])
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import re
+import uuid
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError as exc:
+    raise ImportError(
+        "pyarrow is required for the columnar listing store. Install with: pip install pyarrow"
+    ) from exc
+
+from normalizer import load_capture
+
+PARTITION_COLUMNS = ["platform", "capture_date", "search"]
+
+# Nested platform payloads vary per platform, so they are kept as JSON text.
+JSON_COLUMNS = ("tier1_data", "tier2_data")
+
+LISTING_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("native_id", pa.string()),
+    ("title", pa.string()),
+    ("price", pa.float64()),
+    ("currency", pa.string()),
+    ("location", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("distance_miles", pa.float64()),
+    ("duration_minutes", pa.float64()),
+    ("url", pa.string()),
+    ("image_url", pa.string()),
+    ("image_hashes", pa.list_(pa.string())),
+    ("posted_date", pa.string()),
+    ("posted_hours_ago", pa.float64()),
+    ("condition", pa.string()),
+    ("captured_at", pa.string()),
+    ("cluster_id", pa.string()),
+    ("tier1_data", pa.string()),
+    ("tier2_data", pa.string()),
+    ("platform", pa.string()),
+    ("capture_date", pa.string()),
+    ("search", pa.string()),
+])
+
+Filters = Union[ds.Expression, List[Tuple[str, str, Any]], List[List[Tuple[str, str, Any]]]]
+
+_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+def search_slug(text: str) -> str:
+    """Partition-safe search name ("Nintendo Switch, <$200" -> "nintendo-switch-200")."""
+    slug = _SLUG_PATTERN.sub("-", (text or "").lower()).strip("-")
+    return slug or "unnamed"
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(listing: Dict[str, Any], search: str, capture_date: str) -> Dict[str, Any]:
+    row = {}
+    for field in LISTING_SCHEMA.names:
+        value = listing.get(field)
+        if field in JSON_COLUMNS:
+            value = json.dumps(value, separators=(",", ":")) if value is not None else None
+        elif LISTING_SCHEMA.field(field).type == pa.float64():
+            value = _float(value)
+        elif field in ("id", "native_id") and value is not None:
+            value = str(value)
+        row[field] = value
+    row["search"] = search
+    row["capture_date"] = capture_date
+    return row
+
+
+def _to_expression(filters: Optional[Filters]) -> Optional[ds.Expression]:
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+class ListingStore:
+    def __init__(self, root: Union[str, Path]) -> None:
+        """Partitioned Parquet dataset rooted at ``root``."""
+        self.root = Path(root)
+        self._partitioning = ds.partitioning(
+            pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+            flavor="hive",
+        )
+
+    def write(
+        self,
+        listings: Iterable[Dict[str, Any]],
+        search: str,
+        capture_date: Optional[str] = None,
+    ) -> int:
+        """Append normalized listings; returns the number of rows written."""
+        slug = search_slug(search)
+        rows = []
+        for listing in listings:
+            date = capture_date or (listing.get("captured_at") or "")[:10]
+            rows.append(_row(listing, slug, date or datetime.now(timezone.utc).strftime("%Y-%m-%d")))
+        if not rows:
+            return 0
+
+        table = pa.Table.from_pylist(rows, schema=LISTING_SCHEMA)
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=self._partitioning,
+            # Unique file names make every write an append, never an overwrite.
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return table.num_rows
+
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(
+            self.root,
+            schema=LISTING_SCHEMA,
+            format="parquet",
+            partitioning=self._partitioning,
+        )
+
+    def read(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> pa.Table:
+        """
+        Load a projection of the store.
+
+        Args:
+            columns: Columns to materialize (default: all)
+            filters: pyarrow expression or DNF tuples like [("price", "<", 200)];
+                     partition columns prune directories before any file is opened
+        """
+        if not self.root.exists():
+            schema = LISTING_SCHEMA if columns is None else pa.schema(
+                [LISTING_SCHEMA.field(name) for name in columns]
+            )
+            return schema.empty_table()
+        return self.dataset().to_table(
+            columns=list(columns) if columns is not None else None,
+            filter=_to_expression(filters),
+        )
+
+    def iter_batches(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[Filters] = None,
+        batch_size: int = 65536,
+    ) -> Iterable[pa.RecordBatch]:
+        """Stream record batches for histories too large to materialize at once."""
+        if not self.root.exists():
+            return iter(())
+        return self.dataset().to_batches(
+            columns=list(columns) if columns is not None else None,
+            filter=_to_expression(filters),
+            batch_size=batch_size,
+        )
+
+    def read_listings(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[Filters] = None,
+    ) -> List[Dict[str, Any]]:
+        """Like read(), but returns listing dicts with JSON columns decoded."""
+        records = self.read(columns, filters).to_pylist()
+        for record in records:
+            for field in JSON_COLUMNS:
+                if record.get(field) is not None:
+                    record[field] = json.loads(record[field])
+        return records
+
+
+def import_tier1_capture(
+    path: Union[str, Path],
+    store: ListingStore,
+    platform: Optional[str] = None,
+    capture_date: Optional[str] = None,
+) -> int:
+    """
+    Load a legacy JSON capture (e.g. craigslist_tier1_results.json) into the store.
+
+    Any layout understood by normalizer.load_capture works; each search record
+    becomes its own ``search`` partition.
+    """
+    captured_at = f"{capture_date}T00:00:00+00:00" if capture_date else None
+    written = 0
+    for search, listings in load_capture(path, platform=platform, captured_at=captured_at):
+        written += store.write(listings, search=search, capture_date=capture_date)
+    return written
@@ -3,14 +3,17 @@ Patched CraigslistScraper helpers.
 """
 
 from .ad import Ad, fetch_ad
-from .search import Search, fetch_search, SearchParser
+from .search import Search, SearchFilters, fetch_search, SearchParser
+from .enrichment import DistanceEnricher
 from .utils import CRAIGSLIST_CONDITION_CODES
 
 __all__ = [
     'Ad',
     'fetch_ad',
     'Search',
+    'SearchFilters',
     'fetch_search',
     'SearchParser',
+    'DistanceEnricher',
     'CRAIGSLIST_CONDITION_CODES',
 ]
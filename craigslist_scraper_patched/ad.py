@@ -17,6 +17,7 @@ from typing import Union
 from typing import List
 from typing import Dict
 from typing import Tuple
+from typing import Callable
 
 try:
     from .utils import format_price
@@ -51,11 +52,14 @@ class Ad:
         longitude: Optional[float] = None,
         drive_distance_miles: Optional[float] = None,
         drive_duration_minutes: Optional[float] = None,
+        image_hashes: Optional[List[str]] = None,
     ) -> None:
         """Abstraction for a Craigslist 'Ad'.
 
         Mirrors the original package interface while adding timestamp fields.
+        Drive metrics may be filled in lazily by an attached enrichment hook.
         """
+        self._pending_enrichment: Optional[Callable[["Ad"], Optional[Dict]]] = None
         self.url = url
         self.price = price
         self.title = title
@@ -73,6 +77,41 @@ class Ad:
         self.longitude = longitude
         self.drive_distance_miles = drive_distance_miles
         self.drive_duration_minutes = drive_duration_minutes
+        self.image_hashes = image_hashes
+
+    @property
+    def drive_distance_miles(self) -> Optional[float]:
+        if self._pending_enrichment is not None:
+            self._pending_enrichment(self)
+        return self._drive_distance_miles
+
+    @drive_distance_miles.setter
+    def drive_distance_miles(self, value: Optional[float]) -> None:
+        self._pending_enrichment = None
+        self._drive_distance_miles = value
+
+    @property
+    def drive_duration_minutes(self) -> Optional[float]:
+        if self._pending_enrichment is not None:
+            self._pending_enrichment(self)
+        return self._drive_duration_minutes
+
+    @drive_duration_minutes.setter
+    def drive_duration_minutes(self, value: Optional[float]) -> None:
+        self._pending_enrichment = None
+        self._drive_duration_minutes = value
+
+    @property
+    def enrichment_pending(self) -> bool:
+        """True while drive metrics are deferred to the enrichment stage."""
+        return self._pending_enrichment is not None
+
+    def __getstate__(self) -> Dict:
+        # The enrichment hook is bound to a DistanceEnricher (locks, caches) and
+        # stays with the original; copies keep whatever metrics were resolved.
+        state = self.__dict__.copy()
+        state["_pending_enrichment"] = None
+        return state
 
     def __repr__(self) -> str:
         if (self.title is None) or (self.price is None):
@@ -140,6 +179,7 @@ class Ad:
             "longitude": self.longitude,
             "drive_distance_miles": self.drive_distance_miles,
             "drive_duration_minutes": self.drive_duration_minutes,
+            "image_hashes": self.image_hashes,
         }
 
     def compute_drive_metrics(
@@ -156,6 +196,7 @@ class Ad:
         if self.latitude is None or self.longitude is None:
             return None
 
+        self._pending_enrichment = None
         metrics = compute_drive_metrics(
             origin_location=origin_location,
             destination_coords=(self.latitude, self.longitude),
@@ -0,0 +1,138 @@
+"""
+Distance enrichment stage for Craigslist ads.
+
+Parsing no longer computes drive metrics inline. Instead the parser attaches a
+`DistanceEnricher` to each ad it produces; the metrics are computed:
+  * lazily, the first time `drive_distance_miles`/`drive_duration_minutes` is read
+  * eagerly for a chosen subset via `enrich()` (e.g. the filtered top N)
+  * in the background, batch by batch, via `enrich_in_background()`
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from ..distance_utils import compute_drive_metrics  # type: ignore
+except ImportError:
+    import sys as _sys
+    from pathlib import Path as _Path
+    root_dir = _Path(__file__).resolve().parent.parent
+    if str(root_dir) not in _sys.path:
+        _sys.path.insert(0, str(root_dir))
+    from distance_utils import compute_drive_metrics  # type: ignore
+
+
+Coords = Tuple[float, float]
+
+
+class DistanceEnricher:
+    def __init__(
+        self,
+        locate: Callable[["Ad"], Optional[Coords]],
+        origin_location: Optional[str] = None,
+        origin_coords: Optional[Coords] = None,
+        attempt_routing: bool = False,
+        fallback_to_geodesic: bool = True,
+        max_workers: int = 2,
+    ) -> None:
+        """Compute drive metrics for ads on demand.
+
+        Args:
+            locate: Returns destination coordinates for an ad (or None to skip it)
+            origin_location: Origin text, geocoded by distance_utils if coords are missing
+            origin_coords: Origin latitude/longitude
+            attempt_routing: Call ORS instead of using the geodesic estimate
+            fallback_to_geodesic: Use straight-line miles when routing is unavailable
+            max_workers: Thread count for background enrichment
+        """
+        self.locate = locate
+        self.origin_location = origin_location
+        self.origin_coords = origin_coords
+        self.attempt_routing = attempt_routing
+        self.fallback_to_geodesic = fallback_to_geodesic
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+        self._in_flight: Dict[int, threading.Event] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def attach(self, ads: Iterable["Ad"]) -> None:
+        """Defer enrichment of `ads` until their drive fields are first read."""
+        for ad in ads:
+            ad._pending_enrichment = self.enrich_ad
+
+    def enrich_ad(self, ad: "Ad") -> Optional[Dict]:
+        """Compute (once) and store drive metrics for a single ad.
+
+        Concurrent callers for the same ad wait for the in-flight computation
+        instead of observing half-enriched fields.
+        """
+        with self._lock:
+            if ad._pending_enrichment is None:
+                return None
+            in_flight = self._in_flight.get(id(ad))
+            if in_flight is None:
+                self._in_flight[id(ad)] = threading.Event()
+        if in_flight is not None:
+            in_flight.wait()
+            return None
+
+        metrics = None
+        try:
+            coords = self.locate(ad)
+            if coords and coords[0] is not None and coords[1] is not None:
+                metrics = compute_drive_metrics(
+                    origin_location=self.origin_location,
+                    origin_coords=self.origin_coords,
+                    destination_coords=coords,
+                    fallback_to_geodesic=self.fallback_to_geodesic,
+                    attempt_routing=self.attempt_routing,
+                )
+            if metrics:
+                ad._drive_distance_miles = metrics.get("distance_miles")
+                ad._drive_duration_minutes = metrics.get("duration_minutes")
+        finally:
+            with self._lock:
+                ad._pending_enrichment = None
+                self._in_flight.pop(id(ad)).set()
+        return metrics
+
+    def enrich(self, ads: Iterable["Ad"], top_n: Optional[int] = None) -> List["Ad"]:
+        """Enrich `ads` now (only the first `top_n` if given) and return them."""
+        selected = list(ads)
+        if top_n is not None:
+            selected = selected[:top_n]
+        for ad in selected:
+            self.enrich_ad(ad)
+        return selected
+
+    def enrich_in_background(
+        self,
+        ads: Iterable["Ad"],
+        batch_size: int = 25,
+        top_n: Optional[int] = None,
+    ) -> List[Future]:
+        """Queue enrichment in batches; reads of pending ads still resolve lazily."""
+        selected = list(ads)
+        if top_n is not None:
+            selected = selected[:top_n]
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="distance-enrich",
+                )
+            executor = self._executor
+
+        return [
+            executor.submit(self.enrich, selected[start:start + batch_size])
+            for start in range(0, len(selected), batch_size)
+        ]
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
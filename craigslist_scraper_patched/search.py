@@ -5,6 +5,8 @@ Enhancements:
   * Gracefully handle missing price fields in search results
   * Allow ZIP + radius aware URL construction
   * Surface advanced filters (price range, conditions, custom query params)
+  * Card-level filter predicates (SearchFilters) applied while parsing, so
+    rejected cards never become Ads, get geocoded or get enriched
 """
 
 from bs4 import BeautifulSoup
@@ -12,8 +14,12 @@ import requests
 import re
 import os
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
 
-from typing import Union, List, Dict, Optional, Tuple
+from typing import Union, List, Dict, Optional, Sequence, Tuple
 
 ENABLE_NETWORK_GEOCODING = os.environ.get("MARKETPLACE_ENABLE_GEOCODE", "0").lower() in ("1", "true", "yes")
 
@@ -28,16 +34,16 @@ if str(root_dir) not in sys.path:
 
 try:
     from .ad import Ad
+    from .enrichment import DistanceEnricher
     from ..distance_utils import (
-        compute_drive_metrics,
         geocode_location,
         geodesic_distance_miles,
         get_ip_location,
     )  # type: ignore
 except ImportError:
     from ad import Ad
+    from enrichment import DistanceEnricher
     from distance_utils import (
-        compute_drive_metrics,
         geocode_location,
         geodesic_distance_miles,
         get_ip_location,
@@ -54,6 +60,87 @@ except ImportError:  # Allow script-style imports when module is on sys.path
     from utils import CRAIGSLIST_CONDITION_CODES
 
 
+_CARD_DATE_PATTERN = re.compile(r"^(\d{1,2})/(\d{1,2})$")
+
+
+def _card_age_hours(posted_hours_ago: Optional[float], posted_date: Optional[str]) -> Optional[float]:
+    """Hours since posting from a relative label, or from a "M/D" card date (current year)."""
+    if posted_hours_ago is not None:
+        return posted_hours_ago
+    match = _CARD_DATE_PATTERN.match((posted_date or "").strip())
+    if not match:
+        return None
+    now = datetime.now()
+    try:
+        posted = datetime(now.year, int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        return None
+    if posted > now:  # December cards seen in January
+        posted = posted.replace(year=now.year - 1)
+    return (now - posted).total_seconds() / 3600
+
+
+@dataclass
+class SearchFilters:
+    """Predicates checked on each search card before an Ad is built.
+
+    Each check runs at the cheapest point it can: title terms before the price
+    is parsed, price right after `format_price`, age after the card metadata,
+    straight-line distance once the card location has coordinates. A card that
+    fails skips everything after it.
+
+    Args:
+        min_price, max_price: Price bounds (applied on top of the URL's)
+        max_hours_old: Oldest posting age to keep
+        max_distance_miles: Straight-line miles from `origin_coords` (or the
+            parser's origin) to the card's approximate location
+        include_terms: Words that must all appear in the title (case-insensitive)
+        exclude_terms: Words that must not appear in the title
+        keep_unknown: Keep cards whose price, age or location is unknown
+        origin_coords: Distance origin (filled in from the Search when unset)
+    """
+
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    max_hours_old: Optional[float] = None
+    max_distance_miles: Optional[float] = None
+    include_terms: Sequence[str] = field(default_factory=tuple)
+    exclude_terms: Sequence[str] = field(default_factory=tuple)
+    keep_unknown: bool = True
+    origin_coords: Optional[Tuple[float, float]] = None
+
+    def __post_init__(self) -> None:
+        self._include = [term.lower() for term in self.include_terms if term]
+        self._exclude = [term.lower() for term in self.exclude_terms if term]
+
+    def accepts_title(self, title: Optional[str]) -> bool:
+        if not (self._include or self._exclude):
+            return True
+        text = (title or "").lower()
+        return all(term in text for term in self._include) and not any(term in text for term in self._exclude)
+
+    def accepts_price(self, price: Optional[float]) -> bool:
+        if price is None:
+            return self.keep_unknown or (self.min_price is None and self.max_price is None)
+        if self.min_price is not None and price < self.min_price:
+            return False
+        return self.max_price is None or price <= self.max_price
+
+    def accepts_age(self, hours: Optional[float]) -> bool:
+        if self.max_hours_old is None:
+            return True
+        if hours is None:
+            return self.keep_unknown
+        return hours <= self.max_hours_old
+
+    def accepts_distance(self, miles: Optional[float]) -> bool:
+        if self.max_distance_miles is None:
+            return True
+        if miles is None:
+            return self.keep_unknown
+        return miles <= self.max_distance_miles
+
+
 class Search:
     CONDITION_MAP = CRAIGSLIST_CONDITION_CODES
 
@@ -70,11 +157,16 @@ class Search:
         extra_params: Dict = None,
         origin_location: Optional[str] = None,
         origin_coords: Optional[Tuple[float, float]] = None,
+        compute_distances: bool = True,
+        filters: Optional[SearchFilters] = None,
     ) -> None:
         """An abstraction for a Craigslist 'Search'. Similar to the 'Ad' this is
         also lazy and follows the same layout with the `fetch()` and `to_dict()`
         methods.
 
+        Origin resolution is lazy as well: nothing is geocoded at construction
+        time, and `fetch()` resolves the origin alongside the page request only
+        when `compute_distances` is set (or `filters` has a distance bound).
         """
         self.query = query
         self.city = city
@@ -85,6 +177,7 @@ class Search:
         self.max_price = max_price
         self.conditions = conditions or []
         self.extra_params = extra_params or {}
+        self.filters = filters
 
         origin_provided = origin_location is not None or origin_coords is not None
         origin_set_by_env = False
@@ -96,17 +189,13 @@ class Search:
                 origin_set_by_env = True
 
         self.origin_location = origin_location
-        self.origin_coords = origin_coords
+        self.compute_distances = compute_distances
+        self._origin_coords = origin_coords
+        self._origin_set_by_env = origin_set_by_env
+        # Origin geocoding is deferred until distances are actually needed.
+        self._origin_pending = self._origin_coords is None and bool(self.origin_location)
         self._geo_cache: Dict[str, Optional[Tuple[Tuple[float, float], Optional[str]]]] = {}
 
-        if self.origin_coords is None and self.origin_location:
-            resolved = self._resolve_origin_coords(self.origin_location)
-            if resolved:
-                self.origin_coords = resolved
-
-        if origin_set_by_env and self.origin_coords is not None:
-            self._maybe_prompt_origin_update()
-
         self.url = build_url(
             query=self.query,
             city=self.city,
@@ -119,21 +208,91 @@ class Search:
             extra_params=self.extra_params,
         )
         self.ads: List[Ad] = []
+        self.enricher: Optional[DistanceEnricher] = None
+
+    @property
+    def origin_coords(self) -> Optional[Tuple[float, float]]:
+        """Origin coordinates, resolved (once per process) on first access."""
+        if self._origin_pending:
+            self._finish_origin_resolution(_origin_future(self.origin_location))
+        return self._origin_coords
+
+    @origin_coords.setter
+    def origin_coords(self, value: Optional[Tuple[float, float]]) -> None:
+        self._origin_coords = value
+        self._origin_pending = False
 
     def fetch(self, **kwargs) -> int:
+        # Overlap origin geocoding with the page request instead of paying for it up front.
+        origin_future = None
+        needs_origin = self.compute_distances or (
+            self.filters is not None and self.filters.max_distance_miles is not None
+        )
+        if needs_origin and self._origin_pending:
+            origin_future = _origin_future(self.origin_location)
+            if self._origin_set_by_env and sys.stdin.isatty():
+                # Warm the per-process ipinfo cache used by the origin prompt.
+                _origin_executor.submit(get_ip_location)
+
         self.request = requests.get(self.url, **kwargs)
+
+        if origin_future is not None:
+            self._finish_origin_resolution(origin_future)
+
+        filters = self.filters
+        if filters is not None and filters.max_distance_miles is not None and filters.origin_coords is None:
+            filters.origin_coords = self.origin_coords
+
         if self.request.status_code == 200:
             parser = SearchParser(
                 self.request.content,
-                origin_location=self.origin_location,
-                origin_coords=self.origin_coords,
+                origin_location=self.origin_location if self.compute_distances else None,
+                origin_coords=self.origin_coords if self.compute_distances else None,
                 geo_cache=self._geo_cache,
                 site_code=self.city,
+                filters=filters,
             )
             self.ads = parser.ads
+            self.enricher = parser.enricher
 
         return self.request.status_code
 
+    def enrich_distances(
+        self,
+        ads: Optional[List[Ad]] = None,
+        top_n: Optional[int] = None,
+        background: bool = False,
+        batch_size: int = 25,
+    ) -> Union[List[Ad], List[Future]]:
+        """Compute drive metrics for `ads` (default: all results) up front.
+
+        Pass the filtered/sorted subset you will display so enrichment is only
+        spent where it is used. With `background=True` the work is queued and
+        the futures are returned; unread ads still resolve lazily on access.
+        """
+        targets = self.ads if ads is None else ads
+        if self.enricher is None:
+            return [] if background else list(targets[:top_n] if top_n is not None else targets)
+        if background:
+            return self.enricher.enrich_in_background(targets, batch_size=batch_size, top_n=top_n)
+        return self.enricher.enrich(targets, top_n=top_n)
+
+    def _finish_origin_resolution(self, future: Future) -> None:
+        self._origin_pending = False
+        try:
+            resolved = future.result()
+        except Exception:
+            resolved = None
+        if resolved:
+            self._origin_coords = resolved
+
+        if self._origin_set_by_env and self._origin_coords is not None:
+            override = _ORIGIN_OVERRIDES.get(self.origin_location)
+            if override:
+                self.origin_location, self._origin_coords = override
+            else:
+                self._maybe_prompt_origin_update()
+
     def to_dict(self) -> Dict:
         return {
             "query": self.query,
@@ -151,28 +310,18 @@ class Search:
 
     def _resolve_origin_coords(self, origin_location: str) -> Optional[Tuple[float, float]]:
         """Attempt to resolve origin coordinates via location handler or geocoding."""
-        try:
-            from location_handler import normalize_location  # type: ignore
-
-            normalized = normalize_location(origin_location)
-            if normalized.latitude is not None and normalized.longitude is not None:
-                return (normalized.latitude, normalized.longitude)
-        except Exception:
-            pass
-
-        try:
-            coords = geocode_location(origin_location)
-            if coords and coords[0] is not None and coords[1] is not None:
-                return coords
-        except Exception:
-            pass
-
-        return None
+        return _origin_future(origin_location).result()
 
     def _maybe_prompt_origin_update(self) -> None:
         if not sys.stdin.isatty():
             return
 
+        # Only ask once per configured origin per process.
+        with _ORIGIN_LOCK:
+            if self.origin_location in _PROMPTED_ORIGINS:
+                return
+            _PROMPTED_ORIGINS.add(self.origin_location)
+
         ip_result = get_ip_location()
         if not ip_result or self.origin_coords is None:
             return
@@ -212,14 +361,58 @@ class Search:
         if not new_origin:
             return
 
+        previous_origin = self.origin_location
         new_coords = self._resolve_origin_coords(new_origin)
         if new_coords:
             self.origin_location = new_origin
             self.origin_coords = new_coords
+            _ORIGIN_OVERRIDES[previous_origin] = (new_origin, new_coords)
         else:
             print("Could not resolve that origin. Keeping existing location.")
 
 
+_ORIGIN_LOCK = threading.Lock()
+_ORIGIN_FUTURES: Dict[str, Future] = {}
+_ORIGIN_OVERRIDES: Dict[str, Tuple[str, Tuple[float, float]]] = {}
+_PROMPTED_ORIGINS: set = set()
+_origin_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _lookup_origin_coords(origin_location: str) -> Optional[Tuple[float, float]]:
+    """Resolve origin coordinates via location handler, then Nominatim."""
+    try:
+        from location_handler import normalize_location  # type: ignore
+
+        normalized = normalize_location(origin_location)
+        if normalized.latitude is not None and normalized.longitude is not None:
+            return (normalized.latitude, normalized.longitude)
+    except Exception:
+        pass
+
+    try:
+        coords = geocode_location(origin_location)
+        if coords and coords[0] is not None and coords[1] is not None:
+            return coords
+    except Exception:
+        pass
+
+    return None
+
+
+def _origin_future(origin_location: str) -> Future:
+    """Return the shared (process-wide) resolution future for an origin string."""
+    global _origin_executor
+    key = origin_location.strip().lower()
+    with _ORIGIN_LOCK:
+        future = _ORIGIN_FUTURES.get(key)
+        if future is None:
+            if _origin_executor is None:
+                _origin_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="origin-resolve")
+            future = _origin_executor.submit(_lookup_origin_coords, origin_location)
+            _ORIGIN_FUTURES[key] = future
+        return future
+
+
 def fetch_search(
     query: str,
     city: str,
@@ -232,6 +425,8 @@ def fetch_search(
     extra_params: Dict = None,
     origin_location: Optional[str] = None,
     origin_coords: Optional[Tuple[float, float]] = None,
+    compute_distances: bool = True,
+    filters: Optional[SearchFilters] = None,
     **kwargs,
 ) -> Search:
     """Functional implementation of a Craigslist search."""
@@ -247,6 +442,8 @@ def fetch_search(
         extra_params=extra_params,
         origin_location=origin_location,
         origin_coords=origin_coords,
+        compute_distances=compute_distances,
+        filters=filters,
     )
     search.fetch(**kwargs)
     return search
@@ -294,6 +491,7 @@ class SearchParser:
         origin_coords: Optional[Tuple[float, float]] = None,
         geo_cache: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
         site_code: Optional[str] = None,
+        filters: Optional[SearchFilters] = None,
         **kwargs,
     ) -> None:
         self.soup = BeautifulSoup(content, "html.parser", **kwargs)
@@ -301,6 +499,18 @@ class SearchParser:
         self.origin_coords = origin_coords
         self.geo_cache = geo_cache if geo_cache is not None else {}
         self.site_code = site_code
+        self.filters = filters
+        # Cards dropped by `filters`, per stage.
+        self.rejected: Dict[str, int] = {"title": 0, "price": 0, "age": 0, "distance": 0}
+        self.enricher: Optional[DistanceEnricher] = None
+        if origin_location or origin_coords:
+            self.enricher = DistanceEnricher(
+                locate=self.approximate_coords,
+                origin_location=origin_location,
+                origin_coords=origin_coords,
+                attempt_routing=False,
+                fallback_to_geodesic=True,
+            )
 
     @property
     def ads(self) -> List[Ad]:
@@ -313,12 +523,26 @@ class SearchParser:
 
                 if self._is_filtered_title(title):
                     continue
+                filters = self.filters
+                if filters is not None and not filters.accepts_title(title):
+                    self.rejected["title"] += 1
+                    continue
 
                 # FIX: Handle missing price gracefully
                 price_elem = ad_html.find(class_ = "price")
                 price = format_price(price_elem.text) if price_elem else None
+                if filters is not None and not filters.accepts_price(price):
+                    self.rejected["price"] += 1
+                    continue
 
                 posted_label, posted_hours_ago, posted_date, location = self._parse_meta(ad_html)
+                if filters is not None and not filters.accepts_age(_card_age_hours(posted_hours_ago, posted_date)):
+                    self.rejected["age"] += 1
+                    continue
+                if filters is not None and filters.max_distance_miles is not None:
+                    if not filters.accepts_distance(self._card_distance(location, url)):
+                        self.rejected["distance"] += 1
+                        continue
 
                 # Extract post ID
                 url_match = re.search(r"/(\d+)\.html", url)
@@ -335,39 +559,57 @@ class SearchParser:
                     location=location,
                 )
 
-                # Compute approximate drive metrics if origin provided.
-                if (self.origin_location or self.origin_coords) and location:
-                    approx_result = self._geocode_location(location, url)
-                    if approx_result:
-                        approx_coords, quality = approx_result
-                    else:
-                        approx_coords = quality = None
-
-                    if (
-                        approx_coords
-                        and approx_coords[0] is not None
-                        and approx_coords[1] is not None
-                        and self._is_useful_approximation(approx_coords, quality)
-                    ):
-                        metrics = compute_drive_metrics(
-                            origin_location=self.origin_location,
-                            origin_coords=self.origin_coords,
-                            destination_coords=approx_coords,
-                            fallback_to_geodesic=True,
-                            attempt_routing=False,
-                        )
-                        if metrics:
-                            ad.drive_distance_miles = metrics.get("distance_miles")
-                            ad.drive_duration_minutes = metrics.get("duration_minutes")
-
                 ads.append(ad)
             except Exception as e:
                 # Skip malformed ads but continue parsing
                 print(f"Warning: Skipped ad due to parsing error: {e}")
                 continue
 
+        # Drive metrics are computed by the enrichment stage, not during parsing.
+        if self.enricher is not None:
+            self.enricher.attach(ad for ad in ads if ad.location)
+
         return ads
 
+    # Site/city centroids stand in for every card on a site; too coarse to filter on.
+    COARSE_QUALITIES = ("city", "site")
+
+    def _card_distance(self, location: Optional[str], url: str) -> Optional[float]:
+        """Straight-line miles from the filter origin to a card's location, or None if not known precisely."""
+        origin = self.filters.origin_coords or self.origin_coords
+        if not location or not origin:
+            return None
+        coords = self._card_coords(location, url, precise=True)
+        if coords is None:
+            return None
+        try:
+            return geodesic_distance_miles(origin, coords)
+        except Exception:
+            return None
+
+    def approximate_coords(self, ad: Ad) -> Optional[Tuple[float, float]]:
+        """Best-effort coordinates for a search card, or None if not useful."""
+        if not ad.location:
+            return None
+        return self._card_coords(ad.location, ad.url)
+
+    def _card_coords(self, location: str, url: str, precise: bool = False) -> Optional[Tuple[float, float]]:
+        """Approximate card coordinates passing _is_useful_approximation; ``precise`` drops centroids."""
+        approx_result = self._geocode_location(location, url)
+        if not approx_result:
+            return None
+        approx_coords, quality = approx_result
+        if precise and quality in self.COARSE_QUALITIES:
+            return None
+        if (
+            approx_coords
+            and approx_coords[0] is not None
+            and approx_coords[1] is not None
+            and self._is_useful_approximation(approx_coords, quality)
+        ):
+            return approx_coords
+        return None
+
     @staticmethod
     def _parse_meta(ad_html) -> Tuple[Optional[str], Optional[float], Optional[str], Optional[str]]:
         """Extract posted label, parsed hours/date, and location from search result card."""
@@ -0,0 +1,333 @@
+"""
+Market-price statistics and deal scoring for marketplace CLI.
+
+Groups comparable listings and scores each listing against its group's price
+distribution, so "is a Switch at $180 a deal?" is a number instead of
+eyeballing results:
+  * Comparables share a category (Craigslist URL section), a condition code
+    (CRAIGSLIST_CONDITION_CODES, also matched in OfferUp/Facebook condition
+    text) and a title key (leading normalized title tokens). Listings fall back
+    to coarser groups until at least ``min_comparables`` prices are available
+  * Robust statistics per group: median, quartiles/IQR and each listing's
+    percentile, computed on sorted NumPy arrays
+  * Incremental: each ``update()`` only re-sorts the groups it touched, and a
+    relisted or repriced listing replaces its earlier price rather than
+    counting twice
+  * deal_score 0-100 (100 = cheapest of its comparables) plus a ``deal_flag``
+    of "scam_suspect" for prices far below the market (bait listings) or
+    "overpriced" far above it
+
+Usage:
+    from deal_scoring import DealScorer
+
+    scorer = DealScorer()
+    scorer.warm("craigslist_tier1_results.json")      # any snapshot_diff source
+    scorer.assign(listings)                           # adds deal_* fields in place
+    [l for l in listings if l["deal_score"] and l["deal_score"] >= 80 and not l["deal_flag"]]
+
+    python cli.py search --query "nintendo switch" --location 08021 --deals --db market.db
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from pathlib import Path
+import re
+import sys
+import urllib.parse
+
+import numpy as np
+
+from dedupe import normalize_title
+
+_CRAIGSLIST_DIR = Path(__file__).resolve().parent / "craigslist_scraper_patched"
+if str(_CRAIGSLIST_DIR) not in sys.path:
+    sys.path.insert(0, str(_CRAIGSLIST_DIR))
+from utils import CRAIGSLIST_CONDITION_CODES  # noqa: E402
+
+_CRAIGSLIST_SECTION = re.compile(r"^/([a-z]{3})/d/")
+
+# OfferUp / Facebook wording without a Craigslist equivalent.
+_CONDITION_ALIASES = {"open box": 20, "used": 40, "for parts": 60, "broken": 60}
+
+
+def _phrase(name: str) -> "re.Pattern[str]":
+    """Whole-word pattern for a condition phrase ("like new" also matches "Like-New")."""
+    return re.compile(r"\b" + r"[\s_-]+".join(re.escape(word) for word in name.split()) + r"\b")
+
+
+# Craigslist names (longest first so "like new" wins over "new"), then aliases.
+# Whole words only, so "renewed" or "newer" is not "new".
+_CONDITION_PATTERNS = [
+    (_phrase(name), code)
+    for name, code in sorted(
+        ((name, code) for code, name in CRAIGSLIST_CONDITION_CODES.items()),
+        key=lambda item: -len(item[0]),
+    )
+] + [(_phrase(name), code) for name, code in _CONDITION_ALIASES.items()]
+
+# Condition and packaging words describe the condition, not the item.
+CONDITION_WORDS = frozenset({
+    "new", "brand", "used", "sealed", "unopened", "opened", "open", "box", "mint",
+    "excellent", "good", "fair", "works", "working", "perfect", "not", "never",
+})
+
+# Comparable-group levels, most specific first: (category, condition, title tokens).
+LEVELS: Tuple[Tuple[bool, bool, int], ...] = (
+    (True, True, 3),
+    (True, False, 3),
+    (True, False, 2),
+    (False, False, 2),
+)
+
+DEAL_FLAGS = ("scam_suspect", "overpriced")
+
+
+def condition_code(text: Optional[str]) -> Optional[int]:
+    """Craigslist condition code for condition text ("Used - Like New" -> 20)."""
+    if not text:
+        return None
+    text = str(text).strip().lower()
+    if text.isdigit():
+        code = int(text)
+        return code if code in CRAIGSLIST_CONDITION_CODES else None
+    for pattern, code in _CONDITION_PATTERNS:
+        if pattern.search(text):
+            return code
+    return None
+
+
+def listing_category(listing: Dict[str, Any]) -> str:
+    """Craigslist section code from the URL ("vgm"), else the listing's category field."""
+    url = listing.get("url") or ""
+    match = _CRAIGSLIST_SECTION.match(urllib.parse.urlsplit(url).path)
+    if match:
+        return match.group(1)
+    return str(listing.get("category") or "").lower()
+
+
+def title_tokens(title: Optional[str]) -> List[str]:
+    """Normalized title tokens without condition words and bare numbers."""
+    return [
+        token for token in normalize_title(title).split()
+        if token not in CONDITION_WORDS and not token.isdigit()
+    ]
+
+
+def comparable_keys(listing: Dict[str, Any]) -> Tuple[str, ...]:
+    """Group key at every level in LEVELS (empty title keys match nothing)."""
+    tokens = title_tokens(listing.get("title"))
+    category = listing_category(listing)
+    condition = condition_code(listing.get("condition"))
+    keys = []
+    for use_category, use_condition, size in LEVELS:
+        if not tokens:
+            keys.append("")
+            continue
+        parts = [" ".join(sorted(tokens[:size]))]
+        if use_category:
+            parts.append(category)
+        if use_condition:
+            parts.append(str(condition or 0))
+        keys.append(f"{len(keys)}|" + "|".join(parts))
+    return tuple(keys)
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceStats:
+    def __init__(self, max_samples: int = 500) -> None:
+        """Prices of one comparable group, most recent ``max_samples`` listings."""
+        self.max_samples = max_samples
+        self.prices: Dict[str, float] = {}
+        self._sorted: Optional[np.ndarray] = None
+        self._quartiles: Tuple[float, float, float] = (np.nan, np.nan, np.nan)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, listing_id: str, price: float) -> None:
+        # Re-inserting moves a repriced listing to the recent end.
+        self.prices.pop(listing_id, None)
+        self.prices[listing_id] = price
+        if len(self.prices) > self.max_samples:
+            del self.prices[next(iter(self.prices))]
+        self._sorted = None
+
+    def sorted(self) -> np.ndarray:
+        if self._sorted is None:
+            self._sorted = np.sort(np.fromiter(self.prices.values(), dtype="float64", count=len(self.prices)))
+            self._quartiles = tuple(np.percentile(self._sorted, (25, 50, 75))) if len(self._sorted) else (np.nan,) * 3
+        return self._sorted
+
+    @property
+    def quartiles(self) -> Tuple[float, float, float]:
+        """(q1, median, q3)."""
+        self.sorted()
+        return self._quartiles
+
+    def percentiles(self, prices: np.ndarray) -> np.ndarray:
+        """Mid-rank percentile (0-100) of each price within the group."""
+        values = self.sorted()
+        below = np.searchsorted(values, prices, side="left")
+        through = np.searchsorted(values, prices, side="right")
+        return 100.0 * (below + through) / (2 * len(values))
+
+    def summary(self) -> Dict[str, Any]:
+        q1, median, q3 = self.quartiles
+        return {
+            "count": len(self),
+            "median": round(float(median), 2),
+            "q1": round(float(q1), 2),
+            "q3": round(float(q3), 2),
+            "iqr": round(float(q3 - q1), 2),
+        }
+
+
+class DealScorer:
+    def __init__(
+        self,
+        min_comparables: int = 5,
+        max_samples: int = 500,
+        min_price: float = 2.0,
+        fence: float = 3.0,
+        scam_ratio: float = 0.35,
+    ) -> None:
+        """
+        Incremental comparable-price model.
+
+        Args:
+            min_comparables: Prices a group needs before it is used for scoring
+            max_samples: Most recent prices kept per group
+            min_price: Prices below this ($0/$1 placeholders) are neither learned nor scored
+            fence: IQR multiple beyond the quartiles that counts as an outlier
+            scam_ratio: Prices below this fraction of the median are scam suspects
+                        even when the IQR is wide
+        """
+        self.min_comparables = min_comparables
+        self.max_samples = max_samples
+        self.min_price = min_price
+        self.fence = fence
+        self.scam_ratio = scam_ratio
+        self.groups: Dict[str, PriceStats] = {}
+
+    # ------------------------------------------------------------- learning
+    def update(self, listings: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add listing prices to their comparable groups.
+
+        Returns:
+            Number of listings learned from
+        """
+        learned = 0
+        for listing in listings:
+            price = _price(listing.get("price"))
+            listing_id = listing.get("id") or listing.get("url")
+            if price is None or price < self.min_price or not listing_id:
+                continue
+            for key in comparable_keys(listing):
+                if not key:
+                    continue
+                stats = self.groups.get(key)
+                if stats is None:
+                    stats = self.groups[key] = PriceStats(self.max_samples)
+                stats.add(listing_id, price)
+            learned += 1
+        return learned
+
+    def warm(self, source: Any, platform: Optional[str] = None) -> int:
+        """Learn from a capture, NDJSON run, Parquet store or iterable (see snapshot_diff.iter_snapshot)."""
+        from snapshot_diff import iter_snapshot
+
+        return self.update(iter_snapshot(source, platform))
+
+    def comparables(self, listing: Dict[str, Any]) -> Optional[Tuple[str, PriceStats]]:
+        """Most specific group with at least ``min_comparables`` prices."""
+        for key in comparable_keys(listing):
+            stats = self.groups.get(key)
+            if key and stats is not None and len(stats) >= self.min_comparables:
+                return key, stats
+        return None
+
+    # -------------------------------------------------------------- scoring
+    def score(self, listings: Sequence[Dict[str, Any]], update: bool = True) -> List[Dict[str, Any]]:
+        """
+        Score listings against their comparables.
+
+        Args:
+            listings: Normalized listings
+            update: Learn the batch first (scores then include the batch itself)
+
+        Returns:
+            One dict per listing: deal_score (0-100, higher is cheaper),
+            price_percentile, market_median, discount_pct, deal_flag
+            (None, "scam_suspect" or "overpriced"), comparables and
+            comparable_key. Unscorable listings get None values.
+        """
+        if update:
+            self.update(listings)
+
+        # Gather listings per chosen group, then score each group in one pass.
+        batches: Dict[str, Tuple[PriceStats, List[int]]] = {}
+        prices = np.full(len(listings), np.nan)
+        for index, listing in enumerate(listings):
+            price = _price(listing.get("price"))
+            if price is None or price < self.min_price:
+                continue
+            found = self.comparables(listing)
+            if found is None:
+                continue
+            prices[index] = price
+            key, stats = found
+            batches.setdefault(key, (stats, []))[1].append(index)
+
+        results: List[Dict[str, Any]] = [
+            {
+                "deal_score": None,
+                "price_percentile": None,
+                "market_median": None,
+                "discount_pct": None,
+                "deal_flag": None,
+                "comparables": 0,
+                "comparable_key": None,
+            }
+            for _ in listings
+        ]
+        for key, (stats, indices) in batches.items():
+            group_prices = prices[indices]
+            q1, median, q3 = stats.quartiles
+            iqr = q3 - q1
+            percentile = stats.percentiles(group_prices)
+            low = (group_prices < q1 - self.fence * iqr) | (group_prices < median * self.scam_ratio)
+            high = group_prices > q3 + self.fence * iqr
+            discount = 100.0 * (median - group_prices) / median
+            for position, index in enumerate(indices):
+                result = results[index]
+                result["deal_score"] = int(round(100 - percentile[position]))
+                result["price_percentile"] = round(float(percentile[position]), 1)
+                result["market_median"] = round(float(median), 2)
+                result["discount_pct"] = round(float(discount[position]), 1)
+                result["deal_flag"] = "scam_suspect" if low[position] else ("overpriced" if high[position] else None)
+                result["comparables"] = len(stats)
+                result["comparable_key"] = key
+        return results
+
+    def assign(self, listings: Sequence[Dict[str, Any]], update: bool = True) -> List[Dict[str, Any]]:
+        """Score listings and set deal_score / market_median / discount_pct / deal_flag on them in place."""
+        for listing, result in zip(listings, self.score(listings, update=update)):
+            listing["deal_score"] = result["deal_score"]
+            listing["market_median"] = result["market_median"]
+            listing["discount_pct"] = result["discount_pct"]
+            listing["deal_flag"] = result["deal_flag"]
+        return list(listings)
+
+    def stats(self, listing: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Summary of the comparables ``listing`` would be scored against."""
+        found = self.comparables(listing)
+        if found is None:
+            return None
+        key, stats = found
+        return dict(stats.summary(), key=key)
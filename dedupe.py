@@ -0,0 +1,350 @@
+"""
+Near-duplicate listing detection for marketplace CLI.
+
+The same item is routinely cross-posted to Craigslist, OfferUp and Facebook,
+and reposted on Craigslist under a fresh d_pid. This module clusters those
+duplicates without comparing every pair:
+  1. Titles are normalized and cut into character shingles
+  2. Each title gets a MinHash signature; LSH banding buckets signatures so only
+     listings sharing a band become candidate pairs
+  3. Image perceptual hashes (when present) add candidates by pigeonhole
+     bucketing of hash segments
+  4. Candidates are confirmed with title similarity plus price, location and
+     image-hash proximity, then merged with union-find
+
+Every listing gets ``cluster_id``, ``cluster_size`` and ``is_representative``,
+so tier 2 can fetch one representative per cluster.
+
+Usage:
+    from dedupe import assign_clusters, representatives
+
+    assign_clusters(listings)          # normalized listing dicts
+    to_fetch = representatives(listings)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import re
+import zlib
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError(
+        "numpy is required for duplicate detection. Install with: pip install numpy"
+    ) from exc
+
+from drive_time_estimator import haversine_miles_array
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Filler that sellers add or drop between reposts without changing the item.
+TITLE_STOPWORDS = frozenset({
+    "a", "an", "and", "the", "for", "with", "w", "in", "of",
+    "sale", "obo", "firm", "price", "cash", "only", "pickup", "like", "great", "condition",
+})
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Lowercase, strip punctuation and filler words."""
+    if not title:
+        return ""
+    tokens = _NON_ALNUM.sub(" ", title.lower()).split()
+    return " ".join(token for token in tokens if token not in TITLE_STOPWORDS)
+
+
+def title_shingles(title: Optional[str], size: int = 4) -> Set[str]:
+    """Character shingles of the normalized title (whole title if shorter)."""
+    text = normalize_title(title)
+    if not text:
+        return set()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Bit difference between two hex-encoded perceptual hashes."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1) -> None:
+        """Universal-hash MinHash over 32-bit shingle hashes."""
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingles: Iterable[str]) -> Optional[np.ndarray]:
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64
+        )
+        if hashes.size == 0:
+            return None
+        # a < 2^31 and x < 2^32, so a*x + b stays below 2^64.
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def signatures(
+        self,
+        shingle_sets: Sequence[Iterable[str]],
+        chunk_shingles: int = 200000,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Batch signatures: (n x num_perm matrix, mask of rows that had shingles)."""
+        lengths = []
+        flat: List[int] = []
+        for shingles in shingle_sets:
+            before = len(flat)
+            flat.extend(zlib.crc32(s.encode("utf-8")) for s in shingles)
+            lengths.append(len(flat) - before)
+        lengths_arr = np.array(lengths, dtype=np.int64)
+        has_signature = lengths_arr > 0
+        result = np.zeros((len(lengths), self.num_perm), dtype=np.uint32)
+        if not flat:
+            return result, has_signature
+
+        hashes = np.array(flat, dtype=np.uint64)
+        offsets = np.concatenate([[0], np.cumsum(lengths_arr)])
+        rows = np.flatnonzero(has_signature)
+        # Chunk on whole listings so reduceat segments never straddle chunks.
+        chunk_ids = offsets[rows] // chunk_shingles
+        for chunk_rows in np.split(rows, np.flatnonzero(np.diff(chunk_ids)) + 1):
+            lo, hi = offsets[chunk_rows[0]], offsets[chunk_rows[-1] + 1]
+            permuted = (self._a[:, None] * hashes[None, lo:hi] + self._b[:, None]) % _MERSENNE_PRIME
+            starts = offsets[chunk_rows] - lo
+            result[chunk_rows] = np.minimum.reduceat(permuted, starts, axis=1).T.astype(np.uint32)
+        return result, has_signature
+
+
+class _UnionFind:
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Lower index wins so cluster roots are stable for a given input order.
+            if rj < ri:
+                ri, rj = rj, ri
+            self.parent[rj] = ri
+
+
+def _coords(listing: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    lat, lon = listing.get("latitude"), listing.get("longitude")
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
+def _price(listing: Dict[str, Any]) -> Optional[float]:
+    price = listing.get("price")
+    try:
+        return float(price) if price is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _image_hashes(listing: Dict[str, Any]) -> List[str]:
+    hashes = listing.get("image_hashes") or []
+    return [h for h in hashes if h]
+
+
+class Deduplicator:
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        title_threshold: float = 0.5,
+        image_title_threshold: float = 0.2,
+        price_tolerance: float = 0.15,
+        price_slack: float = 10.0,
+        max_distance_miles: float = 25.0,
+        image_hamming: int = 6,
+        max_bucket_size: int = 200,
+    ) -> None:
+        """Cluster near-duplicate listings.
+
+        Args:
+            num_perm: MinHash signature length (must be divisible by bands)
+            bands: LSH bands; candidate threshold is about (1/bands)^(bands/num_perm)
+            title_threshold: Estimated title Jaccard needed to merge on text alone
+            image_title_threshold: Lower title bar when an image hash also matches
+            price_tolerance: Allowed relative price difference
+            price_slack: Allowed absolute price difference (covers $5 vs $10 repricing)
+            max_distance_miles: Listings further apart than this are never merged
+            image_hamming: Max bit difference for two image hashes to match
+            max_bucket_size: Oversized LSH buckets (generic titles) are skipped
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.title_threshold = title_threshold
+        self.image_title_threshold = image_title_threshold
+        self.price_tolerance = price_tolerance
+        self.price_slack = price_slack
+        self.max_distance_miles = max_distance_miles
+        self.image_hamming = image_hamming
+        self.max_bucket_size = max_bucket_size
+
+    # ----------------------------------------------------------- candidates
+    def _title_candidates(self, signatures: np.ndarray, has_signature: np.ndarray) -> Set[Tuple[int, int]]:
+        indices = np.flatnonzero(has_signature)
+        groups: List[Sequence[int]] = []
+        for band in range(self.bands):
+            block = signatures[indices, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            # Fold the band's rows into one 64-bit key; rare collisions are
+            # harmless because every candidate pair is verified afterwards.
+            keys = block[:, 0].copy()
+            for column in range(1, self.rows):
+                keys = keys * np.uint64(0x9E3779B97F4A7C15) ^ block[:, column]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            bounds = np.concatenate([[0], np.flatnonzero(np.diff(sorted_keys)) + 1, [len(order)]])
+            sizes = np.diff(bounds)
+            for start in np.flatnonzero((sizes >= 2) & (sizes <= self.max_bucket_size)).tolist():
+                groups.append(indices[order[bounds[start]:bounds[start + 1]]].tolist())
+        return self._pairs(groups)
+
+    def _image_candidates(self, image_hashes: Sequence[List[str]]) -> Set[Tuple[int, int]]:
+        # Split each hash into image_hamming + 1 segments: two hashes within the
+        # Hamming limit must agree exactly on at least one segment.
+        segments = self.image_hamming + 1
+        buckets: Dict[Tuple[int, int, int], List[int]] = {}
+        for index, hashes in enumerate(image_hashes):
+            for hex_hash in hashes:
+                bits = len(hex_hash) * 4
+                value = int(hex_hash, 16)
+                width = max(1, bits // segments)
+                for segment in range(segments):
+                    key = (bits, segment, (value >> (segment * width)) & ((1 << width) - 1))
+                    bucket = buckets.setdefault(key, [])
+                    if not bucket or bucket[-1] != index:
+                        bucket.append(index)
+        return self._pairs(buckets.values())
+
+    def _pairs(self, buckets: Iterable[Sequence[int]]) -> Set[Tuple[int, int]]:
+        pairs: Set[Tuple[int, int]] = set()
+        for members in buckets:
+            if len(members) < 2 or len(members) > self.max_bucket_size:
+                continue
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+        return pairs
+
+    # --------------------------------------------------------- verification
+    def _images_match(self, a: List[str], b: List[str]) -> bool:
+        return any(
+            len(x) == len(y) and hamming_distance(x, y) <= self.image_hamming
+            for x in a for y in b
+        )
+
+    def _verify(
+        self,
+        pairs: np.ndarray,
+        signatures: np.ndarray,
+        has_signature: np.ndarray,
+        prices: np.ndarray,
+        lats: np.ndarray,
+        lons: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized pair checks: returns (text_match, needs_image_check) masks."""
+        i, j = pairs[:, 0], pairs[:, 1]
+        similarity = np.where(
+            has_signature[i] & has_signature[j],
+            (signatures[i] == signatures[j]).mean(axis=1),
+            0.0,
+        )
+
+        pi, pj = prices[i], prices[j]
+        with np.errstate(invalid="ignore"):
+            price_ok = np.isnan(pi) | np.isnan(pj) | (
+                np.abs(pi - pj) <= np.maximum(self.price_slack, self.price_tolerance * np.fmax(pi, pj))
+            )
+            located = ~(np.isnan(lats[i]) | np.isnan(lats[j]))
+            distance = np.zeros(len(pairs))
+            if located.any():
+                distance[located] = haversine_miles_array(
+                    lats[i][located], lons[i][located], lats[j][located], lons[j][located]
+                )
+        compatible = price_ok & (distance <= self.max_distance_miles)
+
+        text_match = compatible & (similarity >= self.title_threshold)
+        needs_image = compatible & ~text_match & (similarity >= self.image_title_threshold)
+        return text_match, needs_image
+
+    # -------------------------------------------------------------- cluster
+    def cluster(self, listings: Sequence[Dict[str, Any]], chunk_size: int = 100000) -> List[int]:
+        """Return a cluster label per listing (the index of its cluster root)."""
+        count = len(listings)
+        forest = _UnionFind(count)
+        if count < 2:
+            return [forest.find(i) for i in range(count)]
+
+        signatures, has_signature = self.hasher.signatures(
+            [title_shingles(item.get("title")) for item in listings]
+        )
+        image_hashes = [_image_hashes(item) for item in listings]
+        prices = np.array([_price(item) for item in listings], dtype=float)
+        coords = [_coords(item) or (np.nan, np.nan) for item in listings]
+        lats = np.array([c[0] for c in coords], dtype=float)
+        lons = np.array([c[1] for c in coords], dtype=float)
+
+        candidates = self._title_candidates(signatures, has_signature) | self._image_candidates(image_hashes)
+        if not candidates:
+            return [forest.find(i) for i in range(count)]
+        pairs = np.array(sorted(candidates), dtype=np.int64)
+
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            text_match, needs_image = self._verify(chunk, signatures, has_signature, prices, lats, lons)
+            for i, j in chunk[text_match].tolist():
+                forest.union(i, j)
+            for i, j in chunk[needs_image].tolist():
+                if image_hashes[i] and image_hashes[j] and self._images_match(image_hashes[i], image_hashes[j]):
+                    forest.union(i, j)
+        return [forest.find(i) for i in range(count)]
+
+
+def _completeness(listing: Dict[str, Any]) -> int:
+    return sum(1 for value in listing.values() if value not in (None, "", [], {}))
+
+
+def assign_clusters(
+    listings: List[Dict[str, Any]],
+    deduplicator: Optional[Deduplicator] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Annotate listings in place with cluster_id, cluster_size and is_representative.
+
+    The representative is the most complete listing in the cluster (ties go to
+    the earliest in input order), and its ``id`` becomes the ``cluster_id``.
+    """
+    labels = (deduplicator or Deduplicator()).cluster(listings)
+    members: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels):
+        members.setdefault(label, []).append(index)
+
+    for indices in members.values():
+        best = max(indices, key=lambda i: (_completeness(listings[i]), -i))
+        representative = listings[best]
+        cluster_id = representative.get("id") or representative.get("url") or f"cluster-{best}"
+        for i in indices:
+            listings[i]["cluster_id"] = cluster_id
+            listings[i]["cluster_size"] = len(indices)
+            listings[i]["is_representative"] = i == best
+    return listings
+
+
+def representatives(listings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One listing per cluster (listings without a cluster_id are kept)."""
+    return [item for item in listings if item.get("is_representative", True)]
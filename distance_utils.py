@@ -4,6 +4,7 @@ Distance and routing utilities for marketplace CLI.
 Supports:
 - Straight-line (geodesic) distance calculations via geopy
 - Driving distance/time estimates via OpenRouteService (ORS)
+- Thread-safe ORS key scheduling with per-key quotas and cooldowns
 
 Usage:
     from distance_utils import (
@@ -13,10 +14,21 @@ Usage:
     )
 """
 
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, List, Set, Union, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import atexit
+import hashlib
+import json
 import os
+import threading
+import time
+import weakref
 import requests
 
+from rate_limit import TokenBucket
+
 try:
     from geopy.distance import geodesic
     from geopy.geocoders import Nominatim
@@ -32,8 +44,37 @@ _DEFAULT_ORS_KEYS: List[str] = [
     "eyJvcmciOiI1YjNjZTM1OTc4NTExMTAwMDFjZjYyNDgiLCJpZCI6IjhjNmZiZmY1NWM2ZjQyYTVhYmIwNGQzMGUzNGRhMDc4IiwiaCI6Im11cm11cjY0In0=",
 ]
 
+# Published OpenRouteService free-plan quotas per key: (requests/minute, requests/day).
+ORS_QUOTAS: Dict[str, Tuple[int, int]] = {
+    "directions": (40, 2000),
+    "isochrones": (20, 500),
+    "matrix": (40, 500),
+}
+
+# Cooldowns applied after the API rejects a key.
+ORS_RATE_LIMIT_COOLDOWN_SECONDS = 60.0
+ORS_INVALID_KEY_COOLDOWN_SECONDS = 24 * 3600.0
+
+_DEFAULT_USAGE_FILE = Path.home() / ".cache" / "marketplace-cli" / "ors_usage.json"
+_DEFAULT_ROUTE_LOG = Path.home() / ".cache" / "marketplace-cli" / "ors_routes.jsonl"
+
+_DEFAULT_ORS_BASE_URL = "https://api.openrouteservice.org"
+
 _additional_ors_keys: List[str] = []
-_ors_key_index: int = 0
+
+# Schedulers with usage to flush at exit; one atexit hook serves them all.
+_live_schedulers: "weakref.WeakSet[ORSKeyScheduler]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_schedulers() -> None:
+    for scheduler in list(_live_schedulers):
+        scheduler.flush()
+
+
+def ors_base_url() -> str:
+    """ORS endpoint root; OPENROUTESERVICE_BASE_URL points it at a self-hosted or stand-in server."""
+    return os.environ.get("OPENROUTESERVICE_BASE_URL", _DEFAULT_ORS_BASE_URL).rstrip("/")
 
 
 def register_additional_ors_keys(keys: List[str]) -> None:
@@ -76,15 +117,265 @@ def _gather_ors_keys() -> List[str]:
     return deduped
 
 
+def _key_fingerprint(key: str) -> str:
+    """Stable short identifier so usage files never contain raw keys."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class ORSKeyScheduler:
+    """
+    Thread-safe scheduler for the ORS key pool.
+
+    Each key gets a token bucket per endpoint sized to the published per-minute
+    quota plus a daily counter persisted to ``usage_path`` (so restarts don't
+    reset it). Keys rejected with 401 or 429 sit out a cooldown, and
+    ``acquire`` returns None immediately when no key can serve the request, so
+    callers fail fast instead of re-trying dead keys. The lock is only held
+    for bookkeeping, which keeps it safe to call from asyncio code as well.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[List[str]] = None,
+        quotas: Optional[Dict[str, Tuple[int, int]]] = None,
+        usage_path: Optional[Union[str, Path]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        persist_interval: float = 10.0,
+    ) -> None:
+        self.quotas = dict(quotas or ORS_QUOTAS)
+        self._explicit_keys = list(keys) if keys is not None else None
+        env_usage = os.environ.get("MARKETPLACE_ORS_USAGE_FILE")
+        self.usage_path = Path(usage_path or env_usage or _DEFAULT_USAGE_FILE)
+        self._clock = clock
+        self._persist_interval = persist_interval
+        self._lock = threading.RLock()
+        self._keys: List[str] = []
+        self._key_signature: Optional[Tuple] = None
+        self._cursor = 0
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._usage_day = self._today()
+        self._daily_usage: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+        self._last_persist = 0.0
+        self._load_usage()
+        _live_schedulers.add(self)
+
+    # ------------------------------------------------------------------ keys
+    def _signature(self) -> Tuple:
+        if self._explicit_keys is not None:
+            return ("explicit", len(self._explicit_keys))
+        return (
+            os.environ.get("OPENROUTESERVICE_API_KEYS"),
+            os.environ.get("OPENROUTESERVICE_API_KEY"),
+            len(_additional_ors_keys),
+        )
+
+    def _sync_keys(self) -> None:
+        """Rebuild the key list only when its sources changed."""
+        signature = self._signature()
+        if signature == self._key_signature:
+            return
+        self._keys = list(self._explicit_keys) if self._explicit_keys is not None else _gather_ors_keys()
+        self._key_signature = signature
+        self._cursor = 0
+
+    @property
+    def keys(self) -> List[str]:
+        with self._lock:
+            self._sync_keys()
+            return list(self._keys)
+
+    # ---------------------------------------------------------------- quotas
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _roll_day(self) -> None:
+        today = self._today()
+        if today != self._usage_day:
+            self._usage_day = today
+            self._daily_usage = {}
+            self._dirty = True
+
+    def _bucket(self, key: str, endpoint: str) -> TokenBucket:
+        bucket = self._buckets.get((key, endpoint))
+        if bucket is None:
+            per_minute, _ = self.quotas.get(endpoint, self.quotas["directions"])
+            bucket = TokenBucket(per_minute, clock=self._clock)
+            self._buckets[(key, endpoint)] = bucket
+        return bucket
+
+    def _used_today(self, key: str, endpoint: str) -> int:
+        return self._daily_usage.get(_key_fingerprint(key), {}).get(endpoint, 0)
+
+    def _is_serviceable(self, key: str, endpoint: str, now: float) -> bool:
+        if self._cooldown_until.get(key, 0.0) > now:
+            return False
+        _, per_day = self.quotas.get(endpoint, self.quotas["directions"])
+        return self._used_today(key, endpoint) < per_day
+
+    # --------------------------------------------------------------- acquire
+    def acquire(
+        self,
+        endpoint: str = "directions",
+        exclude: Optional[Set[str]] = None,
+        max_wait: float = 0.0,
+        prefer: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Return a key with quota for ``endpoint`` or None.
+
+        Waits up to ``max_wait`` seconds when keys are merely throttled by their
+        per-minute bucket; returns None at once when the pool is exhausted.
+        ``prefer`` (e.g. a caller's explicit key, pooled or not) is tried first,
+        under the same buckets, quotas and cooldowns as pooled keys.
+        """
+        deadline = self._clock() + max_wait
+        while True:
+            key, wait = self._try_acquire(endpoint, exclude, prefer)
+            if key is not None or wait is None:
+                return key
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return None
+            time.sleep(min(wait, remaining))
+
+    async def acquire_async(
+        self,
+        endpoint: str = "directions",
+        exclude: Optional[Set[str]] = None,
+        max_wait: float = 0.0,
+        prefer: Optional[str] = None,
+    ) -> Optional[str]:
+        """Asyncio variant of ``acquire`` that yields instead of sleeping."""
+        deadline = self._clock() + max_wait
+        while True:
+            key, wait = self._try_acquire(endpoint, exclude, prefer)
+            if key is not None or wait is None:
+                return key
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(wait, remaining))
+
+    def _try_acquire(
+        self,
+        endpoint: str,
+        exclude: Optional[Set[str]],
+        prefer: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[float]]:
+        """Return (key, None) on success, (None, wait) if throttled, (None, None) if exhausted."""
+        with self._lock:
+            self._sync_keys()
+            self._roll_day()
+            now = self._clock()
+            shortest_wait: Optional[float] = None
+            if prefer and not (exclude and prefer in exclude) and self._is_serviceable(prefer, endpoint, now):
+                bucket = self._bucket(prefer, endpoint)
+                if bucket.try_acquire():
+                    self._record_use(prefer, endpoint)
+                    return prefer, None
+                shortest_wait = bucket.time_until_available()
+            count = len(self._keys)
+            for offset in range(count):
+                index = (self._cursor + offset) % count
+                key = self._keys[index]
+                if exclude and key in exclude:
+                    continue
+                if not self._is_serviceable(key, endpoint, now):
+                    continue
+                bucket = self._bucket(key, endpoint)
+                if bucket.try_acquire():
+                    self._cursor = (index + 1) % count
+                    self._record_use(key, endpoint)
+                    return key, None
+                wait = bucket.time_until_available()
+                shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+            return None, shortest_wait
+
+    def _record_use(self, key: str, endpoint: str) -> None:
+        per_key = self._daily_usage.setdefault(_key_fingerprint(key), {})
+        per_key[endpoint] = per_key.get(endpoint, 0) + 1
+        self._dirty = True
+        if self._clock() - self._last_persist >= self._persist_interval:
+            self._persist_locked()
+
+    # ---------------------------------------------------------------- report
+    def report(self, key: str, status_code: int, retry_after: Optional[float] = None) -> None:
+        """Feed a response status back so rejected keys sit out a cooldown."""
+        with self._lock:
+            if status_code in (401, 403):
+                self._cooldown_until[key] = self._clock() + ORS_INVALID_KEY_COOLDOWN_SECONDS
+            elif status_code == 429:
+                cooldown = retry_after if retry_after is not None else ORS_RATE_LIMIT_COOLDOWN_SECONDS
+                self._cooldown_until[key] = self._clock() + cooldown
+
+    def is_exhausted(self, endpoint: str = "directions") -> bool:
+        """True when no key can serve ``endpoint`` until a cooldown/day rolls over."""
+        with self._lock:
+            self._sync_keys()
+            self._roll_day()
+            now = self._clock()
+            return not any(self._is_serviceable(key, endpoint, now) for key in self._keys)
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """Today's request counts, keyed by key fingerprint then endpoint."""
+        with self._lock:
+            self._roll_day()
+            return {fp: dict(counts) for fp, counts in self._daily_usage.items()}
+
+    # ----------------------------------------------------------- persistence
+    def _load_usage(self) -> None:
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("date") == self._usage_day:
+            self._daily_usage = {
+                fp: {ep: int(n) for ep, n in counts.items()}
+                for fp, counts in data.get("usage", {}).items()
+            }
+
+    def _persist_locked(self) -> None:
+        self._last_persist = self._clock()
+        if not self._dirty:
+            return
+        payload = {"date": self._usage_day, "usage": self._daily_usage}
+        try:
+            self.usage_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.usage_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle)
+            os.replace(tmp_path, self.usage_path)
+            self._dirty = False
+        except OSError:
+            # Usage tracking is best-effort; never fail a routing call over it.
+            pass
+
+    def flush(self) -> None:
+        """Write pending usage counts to disk."""
+        with self._lock:
+            self._persist_locked()
+
+
+_ors_scheduler: Optional[ORSKeyScheduler] = None
+_ors_scheduler_lock = threading.Lock()
+
+
+def get_ors_scheduler() -> ORSKeyScheduler:
+    """Return the process-wide ORS key scheduler."""
+    global _ors_scheduler
+    with _ors_scheduler_lock:
+        if _ors_scheduler is None:
+            _ors_scheduler = ORSKeyScheduler()
+        return _ors_scheduler
+
+
 def _next_ors_key() -> Optional[str]:
-    """Return the next ORS key in rotation, or None if no keys configured."""
-    global _ors_key_index
-    keys = _gather_ors_keys()
-    if not keys:
-        return None
-    key = keys[_ors_key_index % len(keys)]
-    _ors_key_index = (_ors_key_index + 1) % len(keys)
-    return key
+    """Return the next ORS key with quota, or None if the pool is exhausted."""
+    return get_ors_scheduler().acquire("directions")
 
 
 def geocode_location(
@@ -108,6 +399,64 @@ def geodesic_distance_miles(
     return geodesic(origin, destination).miles
 
 
+_local_router: Optional[Any] = None
+_local_router_path: Optional[str] = None
+_local_router_explicit = False
+_local_router_lock = threading.Lock()
+
+
+def set_local_router(router: Optional[Any]) -> None:
+    """Install (or with None, remove) an in-process LocalRouter backend."""
+    global _local_router, _local_router_explicit
+    with _local_router_lock:
+        _local_router = router
+        _local_router_explicit = router is not None
+
+
+def get_local_router() -> Optional[Any]:
+    """Return the configured LocalRouter, loading MARKETPLACE_LOCAL_GRAPH on first use."""
+    global _local_router, _local_router_path
+    if _local_router_explicit:
+        return _local_router
+
+    graph_path = os.environ.get("MARKETPLACE_LOCAL_GRAPH") or None
+    if graph_path == _local_router_path:
+        return _local_router
+
+    with _local_router_lock:
+        if graph_path != _local_router_path:
+            _local_router = None
+            if graph_path:
+                from local_routing import LocalRouter
+
+                _local_router = LocalRouter.load(graph_path)
+            _local_router_path = graph_path
+        return _local_router
+
+
+def drive_metrics_one_to_many(
+    origin: Tuple[float, float],
+    destinations: List[Optional[Tuple[float, float]]],
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Drive metrics from one origin to many destinations.
+
+    Uses a single local graph search when a LocalRouter is configured, and
+    per-pair ors_drive_metrics calls otherwise (or for pairs left unreachable).
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(destinations)
+    router = get_local_router()
+    if router is not None:
+        for position, local in enumerate(router.one_to_many(origin, destinations)):
+            if local:
+                results[position] = dict(local, raw=None, backend="local")
+
+    for position, destination in enumerate(destinations):
+        if results[position] is None and destination and None not in destination:
+            results[position] = ors_drive_metrics(origin, destination)
+    return results
+
+
 def ors_drive_metrics(
     origin: Tuple[float, float],
     destination: Tuple[float, float],
@@ -118,6 +467,11 @@ def ors_drive_metrics(
     """
     Compute driving distance (km) and duration (seconds) using OpenRouteService.
 
+    When a local routing graph is configured (MARKETPLACE_LOCAL_GRAPH or
+    set_local_router) car routes are answered in-process first and ORS is only
+    used for pairs the local graph cannot reach. An explicit ``api_key`` is
+    tried before the pool but shares its pacing, quotas and cooldowns.
+
     Returns:
         {
             "distance_miles": float,
@@ -127,19 +481,25 @@ def ors_drive_metrics(
         }
         or None if API key missing / call fails.
     """
-    attempted = set()
+    router = get_local_router() if profile == "driving-car" else None
+    if router is not None:
+        local = router.route(origin, destination)
+        if local:
+            return dict(local, raw=None, backend="local")
+
+    scheduler = get_ors_scheduler()
+    attempted: Set[str] = set()
     while True:
-        if api_key and api_key not in attempted:
-            current_key = api_key
-        else:
-            current_key = _next_ors_key()
+        # An explicit key goes first but is paced like pooled ones; fails fast
+        # (None) once every key is cooling down or out of quota.
+        current_key = scheduler.acquire("directions", exclude=attempted, prefer=api_key)
 
         if not current_key or current_key in attempted:
             return None
 
         attempted.add(current_key)
 
-        url = f"https://api.openrouteservice.org/v2/directions/{profile}"
+        url = f"{ors_base_url()}/v2/directions/{profile}"
         headers = {
             "Authorization": current_key,
             "Content-Type": "application/json",
@@ -152,11 +512,9 @@ def ors_drive_metrics(
         }
 
         response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-        if response.status_code == 401:
-            # Invalid key; try the next one.
-            continue
-        if response.status_code == 429:
-            # Rate-limited; try next key in rotation before giving up.
+        if response.status_code in (401, 429):
+            # Invalid or rate-limited key; bench it and try the next one.
+            scheduler.report(current_key, response.status_code, parse_retry_after(response))
             continue
         if response.status_code != 200:
             return None
@@ -188,24 +546,79 @@ def ors_drive_metrics(
         if duration_minutes is not None:
             duration_minutes /= 60.0
 
+        distance_miles = distance_km * 0.621371 if distance_km is not None else None
+        if distance_miles is not None and duration_minutes is not None:
+            record_route_observation(origin, destination, distance_miles, duration_minutes)
+
         return {
             "distance_km": distance_km,
-            "distance_miles": distance_km * 0.621371 if distance_km is not None else None,
+            "distance_miles": distance_miles,
             "duration_minutes": duration_minutes,
             "raw": data,
         }
 
 
+_route_log_lock = threading.Lock()
+
+
+def route_log_path() -> Path:
+    """JSONL log of successful ORS routes, used to calibrate offline estimates."""
+    return Path(os.environ.get("MARKETPLACE_ROUTE_LOG", _DEFAULT_ROUTE_LOG))
+
+
+def record_route_observation(
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    distance_miles: float,
+    duration_minutes: float,
+) -> None:
+    """Append a routed result to the route log (best-effort)."""
+    line = json.dumps({
+        "origin": [origin[0], origin[1]],
+        "destination": [destination[0], destination[1]],
+        "distance_miles": distance_miles,
+        "duration_minutes": duration_minutes,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    })
+    path = route_log_path()
+    try:
+        with _route_log_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+    except OSError:
+        pass
+
+
+def parse_retry_after(response: Any) -> Optional[float]:
+    value = response.headers.get("Retry-After") if getattr(response, "headers", None) else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
 def compute_drive_metrics(
     origin_location: Optional[str],
     destination_coords: Tuple[float, float],
     origin_coords: Optional[Tuple[float, float]] = None,
     fallback_to_geodesic: bool = True,
     attempt_routing: bool = True,
+    estimate_duration: bool = True,
+    estimator: Optional[Any] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Convenience helper: geocode origin (if needed), call ORS, and optionally fall
     back to straight-line miles. Returns None if neither succeeds.
+
+    The geodesic fallback's distance_miles is always the straight line and its
+    duration_minutes None. Unless ``estimate_duration`` is False it also
+    carries an offline road estimate (calibrated from previously routed trips)
+    in separate keys: estimated_distance_miles, estimated_duration_minutes and
+    estimate_confidence.
+
+    Args:
+        estimator: DriveTimeEstimator to use (default: get_default_estimator())
     """
     if not destination_coords or destination_coords[0] is None or destination_coords[1] is None:
         return None
@@ -226,7 +639,7 @@ def compute_drive_metrics(
 
     if fallback_to_geodesic:
         distance_miles = geodesic_distance_miles(origin_coords, destination_coords)
-        return {
+        metrics = {
             "distance_miles": distance_miles,
             "distance_km": distance_miles * 1.60934,
             "duration_minutes": None,
@@ -234,12 +647,44 @@ def compute_drive_metrics(
             "destination_coords": destination_coords,
             "fallback": "geodesic",
         }
+        if estimate_duration:
+            try:
+                if estimator is None:
+                    from drive_time_estimator import get_default_estimator
+
+                    estimator = get_default_estimator()
+                estimate = estimator.estimate_one(origin_coords, destination_coords)
+            except ImportError:
+                estimate = None
+            if estimate:
+                # One estimated road trip: miles and minutes share the same detour.
+                metrics["estimated_distance_miles"] = estimate["distance_miles"]
+                metrics["estimated_duration_minutes"] = estimate["duration_minutes"]
+                metrics["estimate_confidence"] = estimate["confidence"]
+        return metrics
 
     return None
 
 
-def get_ip_location(timeout: int = 5) -> Optional[Tuple[Tuple[float, float], Dict[str, Any]]]:
-    """Best-effort IP-based geolocation (city-level)."""
+_ip_location_lock = threading.Lock()
+_ip_location_cache: Dict[str, Optional[Tuple[Tuple[float, float], Dict[str, Any]]]] = {}
+
+
+def get_ip_location(
+    timeout: int = 5,
+    use_cache: bool = True,
+) -> Optional[Tuple[Tuple[float, float], Dict[str, Any]]]:
+    """Best-effort IP-based geolocation (city-level), looked up once per process."""
+    with _ip_location_lock:
+        if use_cache and "result" in _ip_location_cache:
+            return _ip_location_cache["result"]
+
+        result = _fetch_ip_location(timeout)
+        _ip_location_cache["result"] = result
+        return result
+
+
+def _fetch_ip_location(timeout: int) -> Optional[Tuple[Tuple[float, float], Dict[str, Any]]]:
     token = os.environ.get("IPINFO_TOKEN")
     url = "https://ipinfo.io/json"
     params = {"token": token} if token else None
@@ -0,0 +1,286 @@
+"""
+Offline drive-time estimator for marketplace CLI.
+
+Learns, from routes already returned by OpenRouteService (the route log written
+by ``distance_utils.ors_drive_metrics``), how much longer roads are than the
+straight line (detour factor) and how fast trips move (average speed), per
+region and distance band. With that, any origin/destination pair gets an
+estimated road distance and duration without a network call.
+
+Confidence flags:
+  * "high"   - calibrated from enough routes in the same region and band
+  * "medium" - calibrated from the same distance band anywhere
+  * "low"    - built-in defaults (no calibration data yet)
+
+Usage:
+    from drive_time_estimator import get_default_estimator
+
+    estimator = get_default_estimator()
+    estimator.estimate_one((39.78, -74.99), (39.95, -75.16))
+    estimator.estimate(origins, destinations)   # vectorized over a batch
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from bisect import bisect_right
+from pathlib import Path
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError(
+        "numpy is required for the drive-time estimator. Install with: pip install numpy"
+    ) from exc
+
+Coords = Tuple[float, float]
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Upper-open distance bands in straight-line miles: [0, 2), [2, 5), ... [50, inf)
+BAND_EDGES: List[float] = [0.0, 2.0, 5.0, 10.0, 20.0, 50.0]
+DEFAULT_DETOUR = 1.3
+DEFAULT_SPEED_MPH: List[float] = [18.0, 24.0, 30.0, 38.0, 46.0, 55.0]
+
+CONFIDENCE_LABELS = ("low", "medium", "high")
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(min(1.0, h)))
+
+
+def haversine_miles_array(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distance in miles."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lon2 - lon1)
+    h = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(1.0, h)))
+
+
+class DriveTimeEstimator:
+    def __init__(self, region_size_degrees: float = 0.5, min_samples: int = 5) -> None:
+        """Detour/speed model keyed by (region, distance band).
+
+        Args:
+            region_size_degrees: Grid cell size used to group trips by region
+            min_samples: Routes needed before a region/band fit is trusted
+        """
+        self.region_size_degrees = region_size_degrees
+        self.min_samples = min_samples
+        # (region_lat, region_lon, band) -> (detour, speed_mph, samples)
+        self._regional: Dict[Tuple[int, int, int], Tuple[float, float, int]] = {}
+        # band -> (detour, speed_mph, samples)
+        self._global: Dict[int, Tuple[float, float, int]] = {}
+
+    # -------------------------------------------------------------- fitting
+    def _region(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            int(math.floor(lat / self.region_size_degrees)),
+            int(math.floor(lon / self.region_size_degrees)),
+        )
+
+    @staticmethod
+    def _band(miles: float) -> int:
+        return max(0, bisect_right(BAND_EDGES, miles) - 1)
+
+    def fit(self, observations: Iterable[Dict[str, Any]]) -> "DriveTimeEstimator":
+        """Calibrate from route records ({origin, destination, distance_miles, duration_minutes})."""
+        regional: Dict[Tuple[int, int, int], Tuple[List[float], List[float]]] = {}
+        global_: Dict[int, Tuple[List[float], List[float]]] = {}
+
+        for obs in observations:
+            try:
+                (olat, olon), (dlat, dlon) = obs["origin"], obs["destination"]
+                road_miles = float(obs["distance_miles"])
+                minutes = float(obs["duration_minutes"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            straight = haversine_miles(olat, olon, dlat, dlon)
+            if straight < 0.1 or road_miles <= 0 or minutes <= 0:
+                continue
+            detour = max(1.0, road_miles / straight)
+            speed = road_miles / (minutes / 60.0)
+            band = self._band(straight)
+            region = self._region((olat + dlat) / 2, (olon + dlon) / 2)
+            for bucket in (
+                regional.setdefault(region + (band,), ([], [])),
+                global_.setdefault(band, ([], [])),
+            ):
+                bucket[0].append(detour)
+                bucket[1].append(speed)
+
+        # Medians keep odd detours (ferries, closures) from skewing a band.
+        self._regional = {
+            key: (float(np.median(d)), float(np.median(s)), len(d))
+            for key, (d, s) in regional.items()
+        }
+        self._global = {
+            band: (float(np.median(d)), float(np.median(s)), len(d))
+            for band, (d, s) in global_.items()
+        }
+        return self
+
+    @classmethod
+    def from_route_log(cls, path: Optional[Union[str, Path]] = None, **kwargs) -> "DriveTimeEstimator":
+        """Build an estimator from the JSONL route log written by distance_utils."""
+        if path is None:
+            from distance_utils import route_log_path
+
+            path = route_log_path()
+        return cls(**kwargs).fit(_read_route_log(Path(path)))
+
+    # ----------------------------------------------------------- parameters
+    def _params(self, region: Tuple[int, int], band: int) -> Tuple[float, float, int]:
+        """Return (detour, speed_mph, confidence index) for a region/band."""
+        fitted = self._regional.get(region + (band,))
+        if fitted and fitted[2] >= self.min_samples:
+            return fitted[0], fitted[1], 2
+        fitted = self._global.get(band)
+        if fitted and fitted[2] >= self.min_samples:
+            return fitted[0], fitted[1], 1
+        return DEFAULT_DETOUR, DEFAULT_SPEED_MPH[band], 0
+
+    # ------------------------------------------------------------ estimates
+    def estimate_one(self, origin: Coords, destination: Coords) -> Dict[str, Any]:
+        """Estimate a single trip (pure Python, a few microseconds)."""
+        straight = haversine_miles(origin[0], origin[1], destination[0], destination[1])
+        region = self._region((origin[0] + destination[0]) / 2, (origin[1] + destination[1]) / 2)
+        detour, speed, confidence = self._params(region, self._band(straight))
+        road_miles = straight * detour
+        return {
+            "distance_miles": road_miles,
+            "duration_minutes": road_miles / speed * 60.0,
+            "straight_line_miles": straight,
+            "confidence": CONFIDENCE_LABELS[confidence],
+        }
+
+    def estimate(
+        self,
+        origins: Union[Coords, Sequence[Coords], np.ndarray],
+        destinations: Union[Sequence[Coords], np.ndarray],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized estimate for a batch.
+
+        ``origins`` may be a single (lat, lon) broadcast over all destinations.
+        Returns arrays: distance_miles, duration_minutes, straight_line_miles,
+        confidence (labels).
+        """
+        dest = np.asarray(destinations, dtype=float).reshape(-1, 2)
+        orig = np.asarray(origins, dtype=float).reshape(-1, 2)
+        if orig.shape[0] == 1:
+            orig = np.broadcast_to(orig, dest.shape)
+
+        straight = haversine_miles_array(orig[:, 0], orig[:, 1], dest[:, 0], dest[:, 1])
+        bands = np.clip(np.searchsorted(BAND_EDGES, straight, side="right") - 1, 0, len(BAND_EDGES) - 1)
+        mid_lat = np.floor((orig[:, 0] + dest[:, 0]) / 2 / self.region_size_degrees).astype(np.int64)
+        mid_lon = np.floor((orig[:, 1] + dest[:, 1]) / 2 / self.region_size_degrees).astype(np.int64)
+
+        # Resolve parameters once per distinct (region, band), then scatter.
+        keys = np.stack([mid_lat, mid_lon, bands], axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        params = np.array(
+            [self._params((int(k[0]), int(k[1])), int(k[2])) for k in unique_keys],
+            dtype=float,
+        ).reshape(-1, 3)
+        inverse = inverse.reshape(-1)
+        detour, speed, confidence = params[inverse, 0], params[inverse, 1], params[inverse, 2]
+
+        road_miles = straight * detour
+        return {
+            "distance_miles": road_miles,
+            "duration_minutes": road_miles / speed * 60.0,
+            "straight_line_miles": straight,
+            "confidence": np.array(CONFIDENCE_LABELS, dtype=object)[confidence.astype(int)],
+        }
+
+    # ---------------------------------------------------------- persistence
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "region_size_degrees": self.region_size_degrees,
+            "min_samples": self.min_samples,
+            "regional": [list(key) + list(value) for key, value in self._regional.items()],
+            "global": [[band] + list(value) for band, value in self._global.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DriveTimeEstimator":
+        estimator = cls(data["region_size_degrees"], data["min_samples"])
+        estimator._regional = {
+            (int(r[0]), int(r[1]), int(r[2])): (float(r[3]), float(r[4]), int(r[5]))
+            for r in data.get("regional", [])
+        }
+        estimator._global = {
+            int(g[0]): (float(g[1]), float(g[2]), int(g[3])) for g in data.get("global", [])
+        }
+        return estimator
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.to_dict(), handle)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "DriveTimeEstimator":
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls.from_dict(json.load(handle))
+
+
+def _read_route_log(path: Path) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+_default_estimator: Optional[DriveTimeEstimator] = None
+_default_signature: Optional[Tuple[float, int]] = None
+_default_checked_at = 0.0
+_default_lock = threading.Lock()
+
+
+def get_default_estimator(recheck_seconds: float = 60.0) -> DriveTimeEstimator:
+    """
+    Process-wide estimator calibrated from the route log.
+
+    The log is re-read (at most every ``recheck_seconds``) only when it has
+    changed, so per-listing calls stay cheap.
+    """
+    global _default_estimator, _default_signature, _default_checked_at
+    now = time.monotonic()
+    if _default_estimator is not None and now - _default_checked_at < recheck_seconds:
+        return _default_estimator
+
+    with _default_lock:
+        from distance_utils import route_log_path
+
+        path = route_log_path()
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime, stat.st_size)
+        except OSError:
+            signature = (0.0, 0)
+
+        if _default_estimator is None or signature != _default_signature:
+            _default_estimator = DriveTimeEstimator.from_route_log(path)
+            _default_signature = signature
+        _default_checked_at = now
+        return _default_estimator
@@ -0,0 +1,324 @@
+"""
+Listing image pipeline for marketplace CLI.
+
+Downloads listing images once and keeps them in a content-addressed store so
+image-based analysis (dedupe, thumbnails, review) never re-downloads:
+  * Bounded concurrency, with a per-host cap so one CDN isn't hammered
+  * Files are stored by SHA-256 of their bytes; URLs map onto digests, so the
+    same photo behind different URLs is stored and hashed once
+  * Perceptual difference hashes (dHash) and optional downscaled thumbnails are
+    computed once per digest and cached next to the image
+
+Perceptual hashing and thumbnails need Pillow (pip install Pillow); downloads
+and the store work without it.
+
+Usage:
+    from images import ImagePipeline
+
+    pipeline = ImagePipeline(thumbnail_size=256)
+    pipeline.attach(listings)     # adds image_hashes / image_digests to listings
+    listings[0]["image_hashes"]   # -> ["c4e0f0f8f8f0e0c4", ...]
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import urllib.parse
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:  # Hashing/thumbnails are optional; downloads still work.
+    Image = None
+
+_DEFAULT_STORE = Path.home() / ".cache" / "marketplace-cli" / "images"
+_CRAIGSLIST_SIZE_PATTERN = re.compile(r"_\d+x\d+(c)?\.jpg$")
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+def _require_pillow() -> None:
+    if Image is None:
+        raise ImportError(
+            "Pillow is required for perceptual hashing and thumbnails. Install with: pip install Pillow"
+        )
+
+
+def dhash(data: bytes, hash_size: int = 8) -> str:
+    """Difference hash of image bytes as a hex string (hash_size**2 bits)."""
+    _require_pillow()
+    with Image.open(io.BytesIO(data)) as image:
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def make_thumbnail(data: bytes, size: int = 256, quality: int = 85) -> bytes:
+    """JPEG downscaled so the longest side is at most ``size`` pixels."""
+    _require_pillow()
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality)
+        return out.getvalue()
+
+
+def image_size(data: bytes) -> Optional[List[int]]:
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return [image.width, image.height]
+    except Exception:
+        return None
+
+
+def thumbnail_url(url: str, size: str = "300x300") -> str:
+    """Point Craigslist image URLs at the CDN's smaller rendition; others unchanged."""
+    if "images.craigslist.org" in url and _CRAIGSLIST_SIZE_PATTERN.search(url):
+        return _CRAIGSLIST_SIZE_PATTERN.sub(f"_{size}.jpg", url)
+    return url
+
+
+class ImageStore:
+    def __init__(self, root: Optional[Union[str, Path]] = None) -> None:
+        """Content-addressed image store.
+
+        Layout under ``root``:
+            objects/ab/<sha256>          image bytes
+            meta/ab/<sha256>.json        dhash, size, thumbnails
+            thumbs/<size>/ab/<sha256>.jpg
+            urls/ab/<sha256(url)>        digest for a source URL
+        """
+        self.root = Path(root or os.environ.get("MARKETPLACE_IMAGE_STORE", _DEFAULT_STORE))
+
+    @staticmethod
+    def _fanout(base: Path, name: str, suffix: str = "") -> Path:
+        return base / name[:2] / f"{name}{suffix}"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def object_path(self, digest: str) -> Path:
+        return self._fanout(self.root / "objects", digest)
+
+    def thumbnail_path(self, digest: str, size: int) -> Path:
+        return self._fanout(self.root / "thumbs" / str(size), digest, ".jpg")
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            self._write_atomic(path, data)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            return self.object_path(digest).read_bytes()
+        except OSError:
+            return None
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        try:
+            digest = self._fanout(self.root / "urls", key).read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        return digest if self.object_path(digest).exists() else None
+
+    def record_url(self, url: str, digest: str) -> None:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        self._write_atomic(self._fanout(self.root / "urls", key), digest.encode("utf-8"))
+
+    def load_meta(self, digest: str) -> Dict[str, Any]:
+        try:
+            with open(self._fanout(self.root / "meta", digest, ".json"), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def save_meta(self, digest: str, meta: Dict[str, Any]) -> None:
+        self._write_atomic(
+            self._fanout(self.root / "meta", digest, ".json"),
+            json.dumps(meta, sort_keys=True).encode("utf-8"),
+        )
+
+
+class ImagePipeline:
+    def __init__(
+        self,
+        store: Optional[ImageStore] = None,
+        max_workers: int = 8,
+        max_per_host: int = 4,
+        timeout: float = 15.0,
+        compute_hashes: bool = True,
+        thumbnail_size: Optional[int] = None,
+        prefer_thumbnails: bool = True,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        """Fetch, store and hash listing images.
+
+        Args:
+            store: Content-addressed store (defaults to ~/.cache/marketplace-cli/images)
+            max_workers: Concurrent downloads overall
+            max_per_host: Concurrent downloads per host
+            timeout: Per-request timeout in seconds
+            compute_hashes: Compute dHash per image (needs Pillow)
+            thumbnail_size: Also write a JPEG thumbnail with this longest side
+            prefer_thumbnails: Download smaller CDN renditions where the URL scheme allows
+            session: Shared requests session (one is created otherwise)
+        """
+        if compute_hashes or thumbnail_size:
+            _require_pillow()
+        self.store = store or ImageStore()
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.compute_hashes = compute_hashes
+        self.thumbnail_size = thumbnail_size
+        self.prefer_thumbnails = prefer_thumbnails
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", USER_AGENT)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _download(self, url: str) -> Optional[bytes]:
+        with self._host_slot(url):
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException:
+                return None
+        if response.status_code != 200 or not response.content:
+            return None
+        return response.content
+
+    def _describe(self, digest: str, data: Optional[bytes]) -> Dict[str, Any]:
+        """Fill in (and persist) hash/size/thumbnail metadata for a digest."""
+        meta = self.store.load_meta(digest)
+        wants_hash = self.compute_hashes and "dhash" not in meta
+        thumb_key = str(self.thumbnail_size) if self.thumbnail_size else None
+        wants_thumb = thumb_key is not None and thumb_key not in meta.get("thumbnails", {})
+        if not (wants_hash or wants_thumb or "size" not in meta):
+            return meta
+
+        data = data if data is not None else self.store.get(digest)
+        if data is None:
+            return meta
+        changed = False
+        if "size" not in meta:
+            size = image_size(data)
+            if size is not None:
+                meta["size"] = size
+                changed = True
+        try:
+            if wants_hash:
+                meta["dhash"] = dhash(data)
+                changed = True
+            if wants_thumb:
+                path = self.store.thumbnail_path(digest, self.thumbnail_size)
+                if not path.exists():
+                    self.store._write_atomic(path, make_thumbnail(data, self.thumbnail_size))
+                meta.setdefault("thumbnails", {})[thumb_key] = str(path)
+                changed = True
+        except Exception:
+            # Undecodable image: keep the bytes, skip hashing.
+            pass
+        if changed:
+            self.store.save_meta(digest, meta)
+        return meta
+
+    def process(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch (or reuse) one image; returns digest, dhash, size and thumbnail path."""
+        fetch_url = thumbnail_url(url) if self.prefer_thumbnails else url
+        data = None
+        digest = self.store.lookup_url(fetch_url)
+        if digest is None:
+            data = self._download(fetch_url)
+            if data is None and fetch_url != url:
+                fetch_url = url
+                data = self._download(url)
+            if data is None:
+                return None
+            digest = self.store.put(data)
+            self.store.record_url(fetch_url, digest)
+
+        meta = self._describe(digest, data)
+        thumbnails = meta.get("thumbnails", {})
+        return {
+            "url": url,
+            "digest": digest,
+            "dhash": meta.get("dhash"),
+            "size": meta.get("size"),
+            "thumbnail": thumbnails.get(str(self.thumbnail_size)) if self.thumbnail_size else None,
+        }
+
+    def process_many(self, urls: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Process unique URLs concurrently; returns url -> result (None on failure)."""
+        unique = list(dict.fromkeys(url for url in urls if url))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="images") as executor:
+            return dict(zip(unique, executor.map(self.process, unique)))
+
+    def attach(self, listings: List[Any], max_images: int = 3) -> List[Any]:
+        """Add ``image_digests`` and ``image_hashes`` to listings (dicts or Ads)."""
+        per_listing = [listing_image_urls(listing)[:max_images] for listing in listings]
+        results = self.process_many(url for urls in per_listing for url in urls)
+        for listing, urls in zip(listings, per_listing):
+            found = [results.get(url) for url in urls]
+            digests = [r["digest"] for r in found if r]
+            hashes = [r["dhash"] for r in found if r and r.get("dhash")]
+            if isinstance(listing, dict):
+                listing["image_digests"] = digests
+                listing["image_hashes"] = hashes
+            else:
+                listing.image_hashes = hashes
+        return listings
+
+
+def listing_image_urls(listing: Any) -> List[str]:
+    """Image URLs from a normalized listing, raw platform dict or Craigslist Ad."""
+    if not isinstance(listing, dict):
+        return list(getattr(listing, "image_urls", None) or [])
+    tier2 = listing.get("tier2_data") or {}
+    urls = list(tier2.get("image_urls") or listing.get("image_urls") or [])
+    image = listing.get("image_url") or listing.get("image")
+    if isinstance(image, dict):
+        image = image.get("url")
+    if image and image not in urls:
+        urls.insert(0, image)
+    return urls
@@ -0,0 +1,350 @@
+"""
+Drive-time isochrone prefilter for marketplace CLI.
+
+Answers "which listings are within N minutes' drive" with one routing call per
+origin instead of one per listing:
+  1. Fetch (or load from cache) the ORS isochrone polygon for origin + budget
+  2. Test every listing coordinate against it in one vectorized pass
+  3. Route only the listings close to the polygon edge, where the isochrone's
+     smoothing makes the answer uncertain, up to a per-call cap; the rest are
+     decided by the offline drive-time estimate (drive_time_estimator)
+
+A failed isochrone request is remembered per (origin, minutes, profile) and
+not retried until its retry-after passes, so an outage costs one request, not
+one per listing.
+
+The ORS endpoint honours OPENROUTESERVICE_BASE_URL, so the whole flow can be
+exercised against a local stand-in that serves a fixed GeoJSON polygon.
+
+Usage:
+    from isochrone import IsochroneFilter
+
+    iso = IsochroneFilter(origin=(39.7831, -74.9958), minutes=30)
+    nearby = iso.filter(listings, coords=lambda ad: (ad.latitude, ad.longitude))
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError(
+        "numpy is required for isochrone filtering. Install with: pip install numpy"
+    ) from exc
+
+from distance_utils import get_ors_scheduler, ors_base_url, ors_drive_metrics, parse_retry_after
+from drive_time_estimator import get_default_estimator
+
+Coords = Tuple[float, float]
+Ring = List[Tuple[float, float]]  # [(lon, lat), ...] as served by ORS
+
+INSIDE = 1
+OUTSIDE = 0
+BORDERLINE = -1
+
+_MILES_PER_DEGREE_LAT = 69.0
+_DEFAULT_CACHE_DIR = Path.home() / ".cache" / "marketplace-cli" / "isochrones"
+
+# After a failed isochrone request, wait this long (or the server's Retry-After) before asking again.
+FAILURE_RETRY_SECONDS = 300.0
+
+_memory_cache: Dict[str, List[Ring]] = {}
+_failures: Dict[str, float] = {}  # cache key -> monotonic time after which to retry
+_cache_lock = threading.Lock()
+
+
+def _record_failure(key: str, retry_after: Optional[float] = None) -> None:
+    with _cache_lock:
+        _failures[key] = time.monotonic() + (retry_after or FAILURE_RETRY_SECONDS)
+
+
+def _cache_key(origin: Coords, minutes: float, profile: str) -> str:
+    # ~10 m precision on the origin keeps nearby repeats on the same polygon.
+    raw = f"{profile}:{origin[0]:.4f}:{origin[1]:.4f}:{float(minutes):g}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _cache_dir() -> Path:
+    return Path(os.environ.get("MARKETPLACE_ISOCHRONE_CACHE", _DEFAULT_CACHE_DIR))
+
+
+def _rings_from_geojson(data: Dict[str, Any]) -> List[Ring]:
+    """Flatten Polygon/MultiPolygon features into a list of rings (holes included)."""
+    rings: List[Ring] = []
+    for feature in data.get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry.get("coordinates", [])]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry.get("coordinates", [])
+        else:
+            continue
+        for polygon in polygons:
+            for ring in polygon:
+                rings.append([(float(lon), float(lat)) for lon, lat in ring])
+    return rings
+
+
+def fetch_isochrone(
+    origin: Coords,
+    minutes: float,
+    profile: str = "driving-car",
+    api_key: Optional[str] = None,
+    timeout: int = 20,
+    use_cache: bool = True,
+) -> Optional[List[Ring]]:
+    """
+    Return the drive-time polygon around ``origin`` as a list of (lon, lat) rings.
+
+    Polygons are cached in memory and on disk per (origin, minutes, profile).
+    Returns None if no key has isochrone quota or the request fails; failures
+    are cached too, until FAILURE_RETRY_SECONDS (or the Retry-After) pass.
+    """
+    key = _cache_key(origin, minutes, profile)
+    cache_file = _cache_dir() / f"{key}.json"
+
+    if use_cache:
+        with _cache_lock:
+            if key in _memory_cache:
+                return _memory_cache[key]
+            if time.monotonic() < _failures.get(key, 0.0):
+                return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as handle:
+                rings = [[tuple(point) for point in ring] for ring in json.load(handle)]
+            with _cache_lock:
+                _memory_cache[key] = rings
+            return rings
+        except (OSError, ValueError):
+            pass
+
+    scheduler = get_ors_scheduler()
+    attempted = set()
+    rings = None
+    retry_after = None
+    while rings is None:
+        current_key = scheduler.acquire("isochrones", exclude=attempted, prefer=api_key)
+        if not current_key or current_key in attempted:
+            _record_failure(key, retry_after)
+            return None
+        attempted.add(current_key)
+
+        try:
+            response = requests.post(
+                f"{ors_base_url()}/v2/isochrones/{profile}",
+                json={
+                    "locations": [[origin[1], origin[0]]],  # ORS expects [lon, lat]
+                    "range": [float(minutes) * 60.0],
+                    "range_type": "time",
+                },
+                headers={"Authorization": current_key, "Content-Type": "application/json"},
+                timeout=timeout,
+            )
+        except requests.RequestException:
+            _record_failure(key)
+            return None
+        if response.status_code in (401, 429):
+            retry_after = parse_retry_after(response)
+            scheduler.report(current_key, response.status_code, retry_after)
+            continue
+        if response.status_code != 200:
+            _record_failure(key, parse_retry_after(response))
+            return None
+        try:
+            rings = _rings_from_geojson(response.json())
+        except ValueError:
+            rings = []
+
+    if not rings:
+        _record_failure(key)
+        return None
+
+    with _cache_lock:
+        _memory_cache[key] = rings
+        _failures.pop(key, None)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as handle:
+            json.dump(rings, handle)
+    except OSError:
+        pass
+    return rings
+
+
+def _edges(rings: Sequence[Ring]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Stack every ring edge into (x1, y1, x2, y2) arrays of lon/lat."""
+    starts, ends = [], []
+    for ring in rings:
+        points = np.asarray(ring, dtype=float)
+        if len(points) < 3:
+            continue
+        if not np.array_equal(points[0], points[-1]):
+            points = np.vstack([points, points[:1]])
+        starts.append(points[:-1])
+        ends.append(points[1:])
+    if not starts:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    start = np.vstack(starts)
+    end = np.vstack(ends)
+    return start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+
+
+def points_in_polygon(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    rings: Sequence[Ring],
+    chunk_size: int = 4096,
+) -> np.ndarray:
+    """Even-odd point-in-polygon test for many points at once (holes supported)."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    x1, y1, x2, y2 = _edges(rings)
+    inside = np.zeros(lats.shape[0], dtype=bool)
+    if x1.size == 0:
+        return inside
+
+    for start in range(0, lats.shape[0], chunk_size):
+        py = lats[start:start + chunk_size, None]
+        px = lons[start:start + chunk_size, None]
+        straddles = (y1 > py) != (y2 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crossings = straddles & (px < x_cross)
+        inside[start:start + chunk_size] = (crossings.sum(axis=1) % 2) == 1
+    return inside
+
+
+def distance_to_boundary_miles(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    rings: Sequence[Ring],
+    chunk_size: int = 2048,
+) -> np.ndarray:
+    """Approximate distance (miles) from each point to the nearest polygon edge."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    x1, y1, x2, y2 = _edges(rings)
+    result = np.full(lats.shape[0], np.inf)
+    if x1.size == 0 or lats.size == 0:
+        return result
+
+    # Local equirectangular projection is plenty for a few-mile margin test.
+    lon_scale = _MILES_PER_DEGREE_LAT * np.cos(np.radians(np.nanmean(lats)))
+    ax, ay = x1 * lon_scale, y1 * _MILES_PER_DEGREE_LAT
+    dx, dy = (x2 - x1) * lon_scale, (y2 - y1) * _MILES_PER_DEGREE_LAT
+    seg_len2 = dx * dx + dy * dy
+    seg_len2[seg_len2 == 0] = 1e-12
+
+    for start in range(0, lats.shape[0], chunk_size):
+        px = lons[start:start + chunk_size, None] * lon_scale
+        py = lats[start:start + chunk_size, None] * _MILES_PER_DEGREE_LAT
+        t = np.clip(((px - ax) * dx + (py - ay) * dy) / seg_len2, 0.0, 1.0)
+        cx = ax + t * dx - px
+        cy = ay + t * dy - py
+        result[start:start + chunk_size] = np.sqrt(cx * cx + cy * cy).min(axis=1)
+    return result
+
+
+class IsochroneFilter:
+    def __init__(
+        self,
+        origin: Coords,
+        minutes: float,
+        profile: str = "driving-car",
+        margin_miles: float = 1.0,
+        refine_borderline: bool = True,
+        rings: Optional[List[Ring]] = None,
+        max_routed: int = 25,
+    ) -> None:
+        """Classify coordinates as inside/outside a drive-time budget.
+
+        Args:
+            origin: Origin latitude/longitude
+            minutes: Drive-time budget
+            profile: ORS routing profile
+            margin_miles: Points closer than this to the polygon edge count as borderline
+            refine_borderline: Route borderline points exactly with ors_drive_metrics
+            rings: Pre-fetched polygon rings (skips the isochrone request)
+            max_routed: Most borderline points routed per within() call (the
+                        least certain first); the rest use the offline estimate
+        """
+        self.origin = origin
+        self.minutes = minutes
+        self.profile = profile
+        self.margin_miles = margin_miles
+        self.refine_borderline = refine_borderline
+        self.max_routed = max_routed
+        self._rings = rings
+
+    @property
+    def rings(self) -> Optional[List[Ring]]:
+        if self._rings is None:
+            self._rings = fetch_isochrone(self.origin, self.minutes, self.profile)
+        return self._rings
+
+    def classify(self, coords: Sequence[Optional[Coords]]) -> np.ndarray:
+        """Return INSIDE / OUTSIDE / BORDERLINE per coordinate (missing → OUTSIDE)."""
+        count = len(coords)
+        states = np.full(count, OUTSIDE, dtype=np.int8)
+        valid = np.array(
+            [c is not None and c[0] is not None and c[1] is not None for c in coords],
+            dtype=bool,
+        )
+        rings = self.rings
+        if rings is None or not valid.any():
+            states[valid] = BORDERLINE
+            return states
+
+        points = np.array([coords[i] for i in np.flatnonzero(valid)], dtype=float)
+        lats, lons = points[:, 0], points[:, 1]
+        inside = points_in_polygon(lats, lons, rings)
+        near_edge = distance_to_boundary_miles(lats, lons, rings) < self.margin_miles
+
+        valid_states = np.where(inside, INSIDE, OUTSIDE).astype(np.int8)
+        valid_states[near_edge] = BORDERLINE
+        states[valid] = valid_states
+        return states
+
+    def within(self, coords: Sequence[Optional[Coords]]) -> List[bool]:
+        """Decide each coordinate, routing only (a bounded number of) the borderline ones."""
+        states = self.classify(coords)
+        decisions = (states == INSIDE).tolist()
+        borderline = np.flatnonzero(states == BORDERLINE)
+        if borderline.size == 0:
+            return decisions
+        if not self.refine_borderline:
+            for index in borderline:
+                decisions[index] = True
+            return decisions
+
+        # Offline estimates decide everything; routing overrides the least certain ones.
+        estimated = get_default_estimator().estimate(self.origin, [coords[i] for i in borderline])
+        minutes = estimated["duration_minutes"]
+        for index, duration in zip(borderline, minutes):
+            decisions[index] = bool(duration <= self.minutes)
+        for position in np.argsort(np.abs(minutes - self.minutes))[:max(0, self.max_routed)]:
+            index = borderline[position]
+            metrics = ors_drive_metrics(self.origin, coords[index], profile=self.profile)
+            duration = metrics.get("duration_minutes") if metrics else None
+            if duration is not None:
+                decisions[index] = duration <= self.minutes
+        return decisions
+
+    def filter(
+        self,
+        items: Iterable[Any],
+        coords: Callable[[Any], Optional[Coords]],
+    ) -> List[Any]:
+        """Keep the items whose coordinates fall within the drive-time budget."""
+        items = list(items)
+        decisions = self.within([coords(item) for item in items])
+        return [item for item, keep in zip(items, decisions) if keep]
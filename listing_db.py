@@ -0,0 +1,453 @@
+"""
+SQLite listing database for marketplace CLI.
+
+One embedded database holds every captured listing across sessions, so
+"have I seen this d_pid?" and "everything mentioning OLED" are index lookups
+instead of scans over per-session JSON files:
+  * WAL journal so several capture processes can write while others read
+  * Listings keyed by "platform:native_id", with indexes on platform ID, URL,
+    price, posting time and coordinates
+  * FTS5 full-text index over titles and descriptions, kept in sync by triggers
+  * Sessions and per-tier session membership (the CaptureSession layout)
+  * Batched bulk import of existing JSON captures and session directories
+
+Usage:
+    from listing_db import ListingDB
+
+    db = ListingDB()                                    # ~/.cache/marketplace-cli/listings.db
+    db.import_capture("craigslist_tier1_results.json")
+    db.seen("craigslist", "7891671290")
+    db.search("oled", platform="craigslist")
+    db.query(max_price=200, posted_after="2025-11-01")
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+
+import serialization
+from normalizer import load_capture
+
+_DEFAULT_DB = Path.home() / ".cache" / "marketplace-cli" / "listings.db"
+_SESSION_TIER_PATTERN = re.compile(r"tier(\d+)_results\.json$")
+_FTS_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    native_id TEXT,
+    url TEXT,
+    title TEXT,
+    description TEXT,
+    price REAL,
+    location TEXT,
+    latitude REAL,
+    longitude REAL,
+    posted_at TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    tier INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_listings_native ON listings(platform, native_id);
+CREATE INDEX IF NOT EXISTS idx_listings_url ON listings(url);
+CREATE INDEX IF NOT EXISTS idx_listings_price ON listings(platform, price);
+CREATE INDEX IF NOT EXISTS idx_listings_posted ON listings(posted_at);
+CREATE INDEX IF NOT EXISTS idx_listings_coords ON listings(latitude, longitude);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+    title, description, content='listings', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS listings_fts_insert AFTER INSERT ON listings BEGIN
+    INSERT INTO listings_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS listings_fts_delete AFTER DELETE ON listings BEGIN
+    INSERT INTO listings_fts(listings_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS listings_fts_update AFTER UPDATE OF title, description ON listings
+WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+    INSERT INTO listings_fts(listings_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO listings_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at TEXT NOT NULL,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS session_listings (
+    session_id TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    tier INTEGER NOT NULL,
+    captured_at TEXT NOT NULL,
+    PRIMARY KEY (session_id, listing_id, tier)
+);
+CREATE INDEX IF NOT EXISTS idx_session_listings_listing ON session_listings(listing_id);
+"""
+
+# Listing fields a lower-tier capture may refresh inside a higher tier's JSON.
+TIER1_FIELDS = (
+    "url", "title", "price", "location", "latitude", "longitude",
+    "image_url", "posted_date", "posted_hours_ago", "condition",
+)
+
+# Later captures fill gaps but never erase richer data already stored; a
+# lower-tier capture still refreshes the tier-1 fields inside the stored JSON.
+# The stored JSON keeps the row's id even when a (platform, native_id) match
+# arrives under another one.
+_MERGE = """
+    url = COALESCE(excluded.url, listings.url),
+    title = COALESCE(excluded.title, listings.title),
+    description = COALESCE(excluded.description, listings.description),
+    price = COALESCE(excluded.price, listings.price),
+    location = COALESCE(excluded.location, listings.location),
+    latitude = COALESCE(excluded.latitude, listings.latitude),
+    longitude = COALESCE(excluded.longitude, listings.longitude),
+    posted_at = COALESCE(excluded.posted_at, listings.posted_at),
+    first_seen = MIN(listings.first_seen, excluded.first_seen),
+    last_seen = MAX(listings.last_seen, excluded.last_seen),
+    data = json_set(CASE WHEN excluded.tier >= listings.tier THEN excluded.data ELSE json_patch(
+        listings.data,
+        (SELECT json_group_object(key, value) FROM json_each(excluded.data)
+         WHERE key IN ({fields}) AND type != 'null')
+    ) END, '$.id', listings.id),
+    tier = MAX(listings.tier, excluded.tier)
+""".format(fields=", ".join(f"'{name}'" for name in TIER1_FIELDS))
+
+# Both unique keys can identify an existing row: the ID and (platform, native_id).
+_UPSERT = f"""
+INSERT INTO listings (
+    id, platform, native_id, url, title, description, price, location,
+    latitude, longitude, posted_at, first_seen, last_seen, tier, data
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET {_MERGE}
+ON CONFLICT(platform, native_id) DO UPDATE SET {_MERGE}
+"""
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def _parse_time(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            # Craigslist's "2025-11-05T12:00:00-0500" on Pythons without full ISO parsing
+            parsed = datetime.strptime(text, "%Y-%m-%dT%H:%M:%S%z")
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def posted_timestamp(listing: Dict[str, Any]) -> Optional[str]:
+    """Best available posting time as UTC ISO text (sortable in the index)."""
+    tier2 = listing.get("tier2_data") or {}
+    posted = _parse_time(tier2.get("posted_at"))
+    if posted is None and listing.get("posted_hours_ago") is not None:
+        captured = _parse_time(listing.get("captured_at"))
+        if captured is not None:
+            posted = captured - timedelta(hours=float(listing["posted_hours_ago"]))
+    if posted is None:
+        posted = _parse_time(listing.get("posted_date"))
+    return _utc_iso(posted) if posted else None
+
+
+def _row(listing: Dict[str, Any], tier: int, seen_at: str) -> Tuple:
+    tier2 = listing.get("tier2_data") or {}
+    native_id = listing.get("native_id")
+    return (
+        listing["id"],
+        listing["platform"],
+        str(native_id) if native_id is not None else None,
+        listing.get("url"),
+        listing.get("title"),
+        tier2.get("description"),
+        listing.get("price"),
+        listing.get("location"),
+        listing.get("latitude"),
+        listing.get("longitude"),
+        posted_timestamp(listing),
+        seen_at,
+        seen_at,
+        tier,
+        serialization.dumps(listing).decode("utf-8"),
+    )
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query that ANDs quoted tokens (prefix match on the last)."""
+    tokens = _FTS_TOKEN_PATTERN.findall(text)
+    if not tokens:
+        return '""'
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class ListingDB:
+    def __init__(self, path: Optional[Union[str, Path]] = None, timeout: float = 30.0) -> None:
+        """Open (and migrate) the listing database.
+
+        Args:
+            path: Database file (env MARKETPLACE_DB, default ~/.cache/marketplace-cli/listings.db)
+            timeout: Seconds to wait on a locked database before failing
+        """
+        self.path = Path(path or os.environ.get("MARKETPLACE_DB", _DEFAULT_DB))
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    # ---------------------------------------------------------- connection
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections must not cross threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass  # Opened on another, already-finished thread
+            self._connections.clear()
+        self._local = threading.local()
+
+    # -------------------------------------------------------------- writes
+    def upsert(
+        self,
+        listings: Iterable[Dict[str, Any]],
+        session_id: Optional[str] = None,
+        tier: int = 1,
+        batch_size: int = 1000,
+    ) -> int:
+        """Insert or refresh normalized listings in batched transactions."""
+        conn = self.conn
+        seen_at = _utc_iso(datetime.now(timezone.utc))
+        written = 0
+        batch: List[Tuple] = []
+
+        def flush() -> None:
+            nonlocal written
+            if not batch:
+                return
+            with conn:
+                conn.executemany(_UPSERT, batch)
+                if session_id is not None:
+                    # Link the stored row: a (platform, native_id) conflict keeps its original id.
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO session_listings SELECT ?, COALESCE("
+                        "(SELECT id FROM listings WHERE platform = ? AND native_id = ?), ?), ?, ?",
+                        [(session_id, row[1], row[2], row[0], tier, row[12]) for row in batch],
+                    )
+            written += len(batch)
+            batch.clear()
+
+        for listing in listings:
+            if not listing.get("id"):
+                continue
+            row = _row(listing, tier, listing.get("captured_at") or seen_at)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        return written
+
+    def create_session(
+        self,
+        name: Optional[str] = None,
+        session_id: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        session_id = session_id or str(uuid.uuid4())
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, name, created_at, params) VALUES (?, ?, ?, ?)",
+                (
+                    session_id,
+                    name,
+                    _utc_iso(datetime.now(timezone.utc)),
+                    json.dumps(params) if params is not None else None,
+                ),
+            )
+        return session_id
+
+    # -------------------------------------------------------------- lookups
+    @staticmethod
+    def _listing(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        listing = serialization.loads(row["data"])
+        listing["first_seen"] = row["first_seen"]
+        listing["last_seen"] = row["last_seen"]
+        return listing
+
+    def get(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT data, first_seen, last_seen FROM listings WHERE id = ?", (listing_id,)
+        ).fetchone()
+        return self._listing(row)
+
+    def get_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT data, first_seen, last_seen FROM listings WHERE url = ?", (url,)
+        ).fetchone()
+        return self._listing(row)
+
+    def seen(self, platform: str, native_id: Union[str, int]) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM listings WHERE platform = ? AND native_id = ?", (platform, str(native_id))
+        ).fetchone()
+        return row is not None
+
+    def seen_ids(self, platform: str, native_ids: Iterable[Union[str, int]], chunk_size: int = 500) -> Set[str]:
+        """Subset of ``native_ids`` already stored for ``platform``."""
+        ids = [str(value) for value in native_ids]
+        found: Set[str] = set()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT native_id FROM listings WHERE platform = ? AND native_id IN ({placeholders})",
+                [platform, *chunk],
+            )
+            found.update(row[0] for row in rows)
+        return found
+
+    def search(
+        self,
+        text: str,
+        platform: Optional[str] = None,
+        limit: int = 50,
+        raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over titles and descriptions, best matches first.
+
+        Plain words are ANDed (last one prefix-matched); pass ``raw=True`` to use
+        FTS5 query syntax directly ("oled OR lite", "title:switch").
+        """
+        sql = (
+            "SELECT l.data, l.first_seen, l.last_seen, bm25(listings_fts) AS rank "
+            "FROM listings_fts JOIN listings l ON l.rowid = listings_fts.rowid "
+            "WHERE listings_fts MATCH ?"
+        )
+        params: List[Any] = [text if raw else fts_query(text)]
+        if platform:
+            sql += " AND l.platform = ?"
+            params.append(platform)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        return [self._listing(row) for row in self.conn.execute(sql, params)]
+
+    def query(
+        self,
+        platform: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        posted_after: Optional[str] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        session_id: Optional[str] = None,
+        order_by: str = "posted_at DESC",
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Structured lookup over the indexed columns.
+
+        ``bbox`` is (south, west, north, east); ``order_by`` accepts
+        "posted_at", "price" or "last_seen" with optional ASC/DESC.
+        """
+        column, _, direction = order_by.partition(" ")
+        if column not in ("posted_at", "price", "last_seen", "first_seen"):
+            raise ValueError(f"Unsupported order_by column: {column}")
+        direction = direction.strip().upper() or "ASC"
+        if direction not in ("ASC", "DESC"):
+            raise ValueError(f"Unsupported order direction: {direction}")
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        if platform:
+            clauses.append("platform = ?")
+            params.append(platform)
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        if posted_after:
+            parsed = _parse_time(posted_after)
+            clauses.append("posted_at >= ?")
+            params.append(_utc_iso(parsed) if parsed else posted_after)
+        if bbox:
+            clauses.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+            params.extend([bbox[0], bbox[2], bbox[1], bbox[3]])
+        if session_id:
+            clauses.append("id IN (SELECT listing_id FROM session_listings WHERE session_id = ?)")
+            params.append(session_id)
+
+        sql = "SELECT data, first_seen, last_seen FROM listings"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {column} IS NULL, {column} {direction} LIMIT ?"
+        params.append(limit)
+        return [self._listing(row) for row in self.conn.execute(sql, params)]
+
+    def count(self, platform: Optional[str] = None) -> int:
+        if platform:
+            return self.conn.execute("SELECT COUNT(*) FROM listings WHERE platform = ?", (platform,)).fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    # --------------------------------------------------------------- import
+    def import_capture(
+        self,
+        path: Union[str, Path],
+        platform: Optional[str] = None,
+        session_id: Optional[str] = None,
+        tier: int = 1,
+        batch_size: int = 1000,
+    ) -> int:
+        """Bulk-load a JSON capture file (any layout normalizer.load_capture reads)."""
+        written = 0
+        for _, listings in load_capture(path, platform=platform):
+            written += self.upsert(listings, session_id=session_id, tier=tier, batch_size=batch_size)
+        return written
+
+    def import_session_dir(self, root: Union[str, Path] = "data/sessions") -> int:
+        """Load every ``<root>/<session_id>/tier{n}_results.json`` file."""
+        written = 0
+        for path in sorted(Path(root).glob("*/tier*_results.json")):
+            match = _SESSION_TIER_PATTERN.search(path.name)
+            if not match:
+                continue
+            session_id = self.create_session(name=path.parent.name, session_id=path.parent.name)
+            written += self.import_capture(path, session_id=session_id, tier=int(match.group(1)))
+        return written
@@ -0,0 +1,644 @@
+"""
+Local road-network routing for marketplace CLI.
+
+Builds a compact road graph from a regional OpenStreetMap extract (e.g. NJ/PA)
+and answers drive distance/time queries in-process, with no API keys or rate
+limits. The graph is contracted to intersections only (chains of shape points
+collapse into single weighted edges) and stored as CSR arrays in an ``.npz``
+file, so loading is a handful of array reads. Queries:
+  * Snap origin and destinations to the graph's main strongly connected
+    component, so every snapped pair is mutually reachable and no search ever
+    has to exhaust the graph to prove a target unreachable
+  * Route with A* for a few destinations, or a single Dijkstra search for
+    many; either stops as soon as every destination has been settled. The A*
+    bound is the larger of straight-line distance at the graph's top speed
+    and landmark (ALT) bounds: drive times to and from a handful of
+    peripheral landmarks, precomputed by ``build`` and stored with the graph
+
+Inputs:
+  * ``.osm`` / ``.osm.gz`` / ``.osm.bz2`` XML extracts (stdlib parser, two passes)
+  * ``.osm.pbf`` extracts (requires ``pip install osmium``)
+
+Usage:
+    python local_routing.py build nj-pa.osm.pbf nj-pa-graph.npz
+
+    export MARKETPLACE_LOCAL_GRAPH=nj-pa-graph.npz   # picked up by distance_utils
+
+    from local_routing import LocalRouter
+    router = LocalRouter.load("nj-pa-graph.npz")
+    router.one_to_many((39.7831, -74.9958), [(39.9526, -75.1652), (39.9470, -74.1710)])
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from array import array
+from pathlib import Path
+import argparse
+import bz2
+import gzip
+import heapq
+import math
+import xml.etree.ElementTree as ET
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError(
+        "numpy is required for local routing. Install with: pip install numpy"
+    ) from exc
+
+Coords = Tuple[float, float]
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_MILE = 1609.344
+
+# Default free-flow speeds (km/h) for drivable highway classes.
+HIGHWAY_SPEEDS_KMH: Dict[str, float] = {
+    "motorway": 105.0,
+    "motorway_link": 60.0,
+    "trunk": 90.0,
+    "trunk_link": 50.0,
+    "primary": 70.0,
+    "primary_link": 45.0,
+    "secondary": 60.0,
+    "secondary_link": 40.0,
+    "tertiary": 50.0,
+    "tertiary_link": 35.0,
+    "unclassified": 45.0,
+    "residential": 35.0,
+    "living_street": 15.0,
+    "service": 20.0,
+    "road": 35.0,
+}
+
+# Off-network access (origin/destination to the nearest graph node).
+SNAP_SPEED_KMH = 20.0
+SNAP_DETOUR = 1.3
+MAX_SNAP_METERS = 5000.0
+_GRID_DEGREES = 0.01
+
+# Above this many destinations the A* heuristic costs more than it saves.
+ASTAR_MAX_TARGETS = 8
+DEFAULT_LANDMARKS = 8
+# Seconds shaved off landmark bounds so float32 storage never overestimates.
+_LANDMARK_SLACK_SECONDS = 0.01
+
+
+def _haversine_m(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lon2 - lon1)
+    h = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(1.0, h)))
+
+
+def _reachable(indptr: np.ndarray, indices: np.ndarray, seed: int) -> np.ndarray:
+    """Nodes reachable from ``seed`` (breadth-first, one vectorized step per hop)."""
+    seen = np.zeros(indptr.shape[0] - 1, dtype=bool)
+    seen[seed] = True
+    frontier = np.array([seed], dtype=np.int64)
+    while frontier.size:
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        neighbours = indices[positions]
+        frontier = np.unique(neighbours[~seen[neighbours]]).astype(np.int64)
+        seen[frontier] = True
+    return seen
+
+
+def _reverse_csr(indptr: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reversed graph as (indptr, indices, edge order into the original arrays)."""
+    node_count = indptr.shape[0] - 1
+    sources = np.repeat(np.arange(node_count), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    reverse_indptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=node_count))])
+    return reverse_indptr, sources[order], order
+
+
+def _shortest_times(indptr: List[int], indices: List[int], seconds: List[float], source: int) -> np.ndarray:
+    """Seconds from ``source`` to every node (inf where unreachable)."""
+    best = [math.inf] * (len(indptr) - 1)
+    best[source] = 0.0
+    done = bytearray(len(best))
+    heap: List[Tuple[float, int]] = [(0.0, source)]
+    heappush, heappop = heapq.heappush, heapq.heappop
+    while heap:
+        time_so_far, node = heappop(heap)
+        if done[node]:
+            continue
+        done[node] = 1
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[edge]
+            candidate = time_so_far + seconds[edge]
+            if candidate < best[neighbour]:
+                best[neighbour] = candidate
+                heappush(heap, (candidate, neighbour))
+    return np.array(best)
+
+
+def select_landmarks(node_lat: np.ndarray, node_lon: np.ndarray, component: np.ndarray, count: int) -> np.ndarray:
+    """Farthest main-component node from the centre in each of ``count`` compass sectors."""
+    nodes = np.flatnonzero(component)
+    if nodes.size == 0 or count <= 0:
+        return np.empty(0, dtype=np.int64)
+    centre_lat = float(node_lat[nodes].mean())
+    dy = node_lat[nodes] - centre_lat
+    dx = (node_lon[nodes] - node_lon[nodes].mean()) * math.cos(math.radians(centre_lat))
+    sector = np.floor((np.arctan2(dy, dx) + math.pi) / (2 * math.pi) * count).astype(np.int64) % count
+    radius = np.hypot(dx, dy)
+    picks = []
+    for index in range(count):
+        members = np.flatnonzero(sector == index)
+        if members.size:
+            picks.append(nodes[members[np.argmax(radius[members])]])
+    return np.array(picks, dtype=np.int64)
+
+
+def main_component(indptr: np.ndarray, indices: np.ndarray, attempts: int = 4) -> np.ndarray:
+    """
+    Mask of the largest strongly connected component found.
+
+    A strongly connected component is the set reachable both from and to a
+    seed node; seeds are tried in order of degree until one covers at least
+    half the graph (a road network's main component always does).
+    """
+    node_count = indptr.shape[0] - 1
+    best = np.zeros(node_count, dtype=bool)
+    if node_count == 0:
+        return best
+    reverse_indptr, reverse_indices, _ = _reverse_csr(indptr, indices)
+
+    degree = np.diff(indptr)
+    for seed in np.argsort(-degree, kind="stable"):
+        if best[seed]:
+            continue
+        component = _reachable(indptr, indices, int(seed)) & _reachable(reverse_indptr, reverse_indices, int(seed))
+        if component.sum() > best.sum():
+            best = component
+        attempts -= 1
+        if best.sum() * 2 >= node_count or attempts == 0:
+            break
+    return best
+
+
+def _parse_speed(maxspeed: Optional[str], highway: str) -> float:
+    default = HIGHWAY_SPEEDS_KMH[highway]
+    if not maxspeed:
+        return default
+    text = maxspeed.strip().lower()
+    try:
+        if text.endswith("mph"):
+            return float(text[:-3].strip()) * 1.609344
+        return float(text.split()[0])
+    except (ValueError, IndexError):
+        return default
+
+
+def _oneway(tags: Dict[str, str]) -> int:
+    """1 = forward only, -1 = reverse only, 0 = both directions."""
+    value = tags.get("oneway", "").lower()
+    if value in ("yes", "true", "1"):
+        return 1
+    if value == "-1":
+        return -1
+    if value == "no":
+        return 0
+    if tags.get("highway") == "motorway" or tags.get("junction") == "roundabout":
+        return 1
+    return 0
+
+
+class _Way:
+    __slots__ = ("refs", "speed_kmh", "oneway")
+
+    def __init__(self, refs: array, speed_kmh: float, oneway: int) -> None:
+        self.refs = refs
+        self.speed_kmh = speed_kmh
+        self.oneway = oneway
+
+
+def _drivable(tags: Dict[str, str]) -> bool:
+    highway = tags.get("highway")
+    if highway not in HIGHWAY_SPEEDS_KMH:
+        return False
+    if tags.get("access") in ("no", "private") or tags.get("motor_vehicle") == "no":
+        return False
+    if highway == "service" and tags.get("service") in ("parking_aisle", "driveway"):
+        return False
+    return True
+
+
+def _open_xml(path: Path):
+    name = path.name.lower()
+    if name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if name.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _iter_osm_elements(path: Path) -> Iterable[ET.Element]:
+    """Yield top-level OSM elements, releasing each one after it is consumed."""
+    with _open_xml(path) as handle:
+        context = ET.iterparse(handle, events=("start", "end"))
+        _, root = next(context)
+        depth = 0
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                yield elem
+                root.clear()
+
+
+def _read_osm_xml(path: Path) -> Tuple[List[_Way], np.ndarray, np.ndarray, np.ndarray]:
+    """Two streaming passes: drivable ways first, then only the nodes they use."""
+    ways: List[_Way] = []
+    for elem in _iter_osm_elements(path):
+        if elem.tag != "way":
+            continue
+        tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+        if _drivable(tags):
+            refs = array("q", (int(nd.get("ref")) for nd in elem.iter("nd")))
+            if len(refs) >= 2:
+                speed = _parse_speed(tags.get("maxspeed"), tags["highway"])
+                ways.append(_Way(refs, speed, _oneway(tags)))
+
+    needed = np.unique(np.concatenate([np.frombuffer(w.refs, dtype=np.int64) for w in ways])) \
+        if ways else np.empty(0, dtype=np.int64)
+    lat = np.full(needed.shape[0], np.nan)
+    lon = np.full(needed.shape[0], np.nan)
+
+    for elem in _iter_osm_elements(path):
+        if elem.tag != "node":
+            continue
+        node_id = int(elem.get("id"))
+        index = np.searchsorted(needed, node_id)
+        if index < needed.shape[0] and needed[index] == node_id:
+            lat[index] = float(elem.get("lat"))
+            lon[index] = float(elem.get("lon"))
+    return ways, needed, lat, lon
+
+
+def _read_osm_pbf(path: Path) -> Tuple[List[_Way], np.ndarray, np.ndarray, np.ndarray]:
+    try:
+        import osmium
+    except ImportError as exc:
+        raise ImportError(
+            "osmium is required to read .osm.pbf extracts. Install with: pip install osmium"
+        ) from exc
+
+    ways: List[_Way] = []
+    ref_ids = array("q")
+    ref_lat = array("d")
+    ref_lon = array("d")
+
+    class _Handler(osmium.SimpleHandler):
+        def way(self, w):
+            tags = {t.k: t.v for t in w.tags}
+            if not _drivable(tags) or len(w.nodes) < 2:
+                return
+            refs = array("q")
+            for node in w.nodes:
+                if not node.location.valid():
+                    return
+                refs.append(node.ref)
+                ref_ids.append(node.ref)
+                ref_lat.append(node.location.lat)
+                ref_lon.append(node.location.lon)
+            ways.append(_Way(refs, _parse_speed(tags.get("maxspeed"), tags["highway"]), _oneway(tags)))
+
+    _Handler().apply_file(str(path), locations=True)
+
+    ids = np.frombuffer(ref_ids, dtype=np.int64)
+    needed, first = np.unique(ids, return_index=True)
+    return ways, needed, np.frombuffer(ref_lat)[first], np.frombuffer(ref_lon)[first]
+
+
+def build_graph(osm_path: Union[str, Path]) -> "LocalRouter":
+    """Parse an OSM extract and contract it to an intersection-level graph."""
+    path = Path(osm_path)
+    if path.name.lower().endswith(".pbf"):
+        ways, node_ids, lat, lon = _read_osm_pbf(path)
+    else:
+        ways, node_ids, lat, lon = _read_osm_xml(path)
+    if not ways:
+        raise ValueError(f"No drivable ways found in {path}")
+
+    # A node survives contraction if it ends a way or is shared between ways.
+    all_refs = np.concatenate([np.frombuffer(w.refs, dtype=np.int64) for w in ways])
+    ref_index = np.searchsorted(node_ids, all_refs)
+    counts = np.bincount(ref_index, minlength=node_ids.shape[0])
+    keep = counts > 1
+    offset = 0
+    for way in ways:
+        keep[ref_index[offset]] = True
+        keep[ref_index[offset + len(way.refs) - 1]] = True
+        offset += len(way.refs)
+    keep &= ~np.isnan(lat)
+    compact_id = np.full(node_ids.shape[0], -1, dtype=np.int64)
+    compact_id[keep] = np.arange(int(keep.sum()))
+
+    sources, targets, seconds, meters = array("q"), array("q"), array("d"), array("d")
+
+    def add_edge(u: int, v: int, duration: float, length: float) -> None:
+        sources.append(u)
+        targets.append(v)
+        seconds.append(duration)
+        meters.append(length)
+
+    offset = 0
+    for way in ways:
+        idx = ref_index[offset:offset + len(way.refs)]
+        offset += len(way.refs)
+        if np.isnan(lat[idx]).any():
+            continue
+        segment_m = _haversine_m(lat[idx[:-1]], lon[idx[:-1]], lat[idx[1:]], lon[idx[1:]])
+        cumulative = np.concatenate([[0.0], np.cumsum(segment_m)])
+        kept_positions = np.flatnonzero(keep[idx])
+        meters_per_second = way.speed_kmh / 3.6
+        for a, b in zip(kept_positions[:-1], kept_positions[1:]):
+            u, v = int(compact_id[idx[a]]), int(compact_id[idx[b]])
+            if u == v:
+                continue
+            length = float(cumulative[b] - cumulative[a])
+            duration = length / meters_per_second
+            if way.oneway >= 0:
+                add_edge(u, v, duration, length)
+            if way.oneway <= 0:
+                add_edge(v, u, duration, length)
+
+    src = np.frombuffer(sources, dtype=np.int64)
+    order = np.argsort(src, kind="stable")
+    node_count = int(keep.sum())
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.add.at(indptr, src + 1, 1)
+    indptr = np.cumsum(indptr)
+
+    router = LocalRouter(
+        node_lat=lat[keep].astype(np.float64),
+        node_lon=lon[keep].astype(np.float64),
+        indptr=indptr,
+        indices=np.frombuffer(targets, dtype=np.int64)[order].astype(np.int32),
+        seconds=np.frombuffer(seconds)[order].astype(np.float32),
+        meters=np.frombuffer(meters)[order].astype(np.float32),
+    )
+    router.add_landmarks()
+    return router
+
+
+class LocalRouter:
+    def __init__(
+        self,
+        node_lat: np.ndarray,
+        node_lon: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        seconds: np.ndarray,
+        meters: np.ndarray,
+        component: Optional[np.ndarray] = None,
+        landmarks: Optional[np.ndarray] = None,
+        landmark_from: Optional[np.ndarray] = None,
+        landmark_to: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        In-process router over a contracted CSR road graph.
+
+        Args:
+            node_lat, node_lon, indptr, indices, seconds, meters: CSR graph arrays
+            component: Main strongly connected component mask (computed if omitted)
+            landmarks: Landmark node indices (see add_landmarks)
+            landmark_from: Seconds from each landmark to every node (landmarks x nodes)
+            landmark_to: Seconds from every node to each landmark (landmarks x nodes)
+        """
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.indptr = indptr
+        self.indices = indices
+        self.seconds = seconds
+        self.meters = meters
+        self.component = (
+            component.astype(bool) if component is not None else main_component(indptr, indices)
+        )
+        # Plain lists are much faster than numpy scalars inside the search loop.
+        self._indptr = indptr.tolist()
+        self._indices = indices.tolist()
+        self._seconds = seconds.tolist()
+        self._meters = meters.tolist()
+        self._lat = node_lat.tolist()
+        self._lon = node_lon.tolist()
+        # Top speed (m/s) turns straight-line meters into a lower bound on seconds;
+        # the margin absorbs float32 rounding of edge weights.
+        moving = seconds > 0
+        self._max_speed = float(np.max(meters[moving] / seconds[moving])) * 1.001 if moving.any() else 1.0
+        self._grid = self._build_grid()
+        self.landmarks = landmarks if landmarks is not None else np.empty(0, dtype=np.int64)
+        self.landmark_from = landmark_from
+        self.landmark_to = landmark_to
+
+    def add_landmarks(self, count: int = DEFAULT_LANDMARKS) -> None:
+        """
+        Precompute drive times to and from ``count`` peripheral landmarks.
+
+        Two full graph searches per landmark (seconds each on a regional
+        graph); ``build`` does this once and the result is saved with the graph.
+        """
+        self.landmarks = select_landmarks(self.node_lat, self.node_lon, self.component, count)
+        reverse_indptr, reverse_indices, order = _reverse_csr(self.indptr, self.indices)
+        reverse = (reverse_indptr.tolist(), reverse_indices.tolist(), self.seconds[order].tolist())
+        forward = (self._indptr, self._indices, self._seconds)
+        self.landmark_from = np.array(
+            [_shortest_times(*forward, int(node)) for node in self.landmarks], dtype=np.float32
+        )
+        self.landmark_to = np.array(
+            [_shortest_times(*reverse, int(node)) for node in self.landmarks], dtype=np.float32
+        )
+
+    @property
+    def node_count(self) -> int:
+        return int(self.node_lat.shape[0])
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.indices.shape[0])
+
+    # ----------------------------------------------------------- persistence
+    def save(self, path: Union[str, Path]) -> None:
+        np.savez_compressed(
+            path,
+            node_lat=self.node_lat,
+            node_lon=self.node_lon,
+            indptr=self.indptr,
+            indices=self.indices,
+            seconds=self.seconds,
+            meters=self.meters,
+            component=self.component,
+            **({
+                "landmarks": self.landmarks,
+                "landmark_from": self.landmark_from,
+                "landmark_to": self.landmark_to,
+            } if self.landmark_from is not None else {}),
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LocalRouter":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    # -------------------------------------------------------------- snapping
+    def _build_grid(self) -> Dict[Tuple[int, int], np.ndarray]:
+        # Only main-component nodes are snap targets, so snapped pairs always connect.
+        nodes = np.flatnonzero(self.component)
+        cells = np.zeros((self.node_count, 2), dtype=np.int64)
+        cells[nodes, 0] = np.floor(self.node_lat[nodes] / _GRID_DEGREES)
+        cells[nodes, 1] = np.floor(self.node_lon[nodes] / _GRID_DEGREES)
+        order = nodes[np.lexsort((cells[nodes, 1], cells[nodes, 0]))]
+        grid: Dict[Tuple[int, int], np.ndarray] = {}
+        if order.size == 0:
+            return grid
+        sorted_cells = cells[order]
+        boundaries = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+        for chunk in np.split(order, boundaries):
+            grid[(int(cells[chunk[0], 0]), int(cells[chunk[0], 1]))] = chunk
+        return grid
+
+    def nearest_node(self, coords: Coords, max_rings: int = 5) -> Optional[Tuple[int, float]]:
+        """Return (node index, distance in meters) of the closest graph node."""
+        cell_lat = int(math.floor(coords[0] / _GRID_DEGREES))
+        cell_lon = int(math.floor(coords[1] / _GRID_DEGREES))
+        for ring in range(max_rings + 1):
+            candidates = [
+                self._grid[(cell_lat + dy, cell_lon + dx)]
+                for dy in range(-ring, ring + 1)
+                for dx in range(-ring, ring + 1)
+                if (cell_lat + dy, cell_lon + dx) in self._grid
+            ]
+            if candidates:
+                nodes = np.concatenate(candidates)
+                dist = _haversine_m(coords[0], coords[1], self.node_lat[nodes], self.node_lon[nodes])
+                best = int(np.argmin(dist))
+                if dist[best] <= MAX_SNAP_METERS:
+                    return int(nodes[best]), float(dist[best])
+                return None
+        return None
+
+    # --------------------------------------------------------------- routing
+    def _heuristic(self, targets: Sequence[int]) -> List[float]:
+        """
+        Per-node lower bound on seconds to the nearest target.
+
+        Straight-line time at top speed, raised by the landmark bounds
+        d(L, t) - d(L, v) and d(v, L) - d(t, L) when landmarks are available.
+        Both are consistent, so A* still returns exact shortest times.
+        """
+        bound = np.full(self.node_count, np.inf)
+        for target in targets:
+            estimate = _haversine_m(
+                self.node_lat, self.node_lon, self.node_lat[target], self.node_lon[target]
+            ) / self._max_speed
+            if self.landmark_from is not None and len(self.landmarks):
+                with np.errstate(invalid="ignore"):
+                    ahead = self.landmark_from[:, target:target + 1] - self.landmark_from
+                    behind = self.landmark_to - self.landmark_to[:, target:target + 1]
+                    landmark = np.nanmax(np.maximum(ahead, behind), axis=0) - _LANDMARK_SLACK_SECONDS
+                estimate = np.fmax(estimate, landmark)
+            bound = np.minimum(bound, estimate)
+        return bound.tolist()
+
+    def _search(self, source: int, targets: Iterable[int]) -> Dict[int, Tuple[float, float]]:
+        """
+        Shortest-time search from ``source`` until every target is settled.
+
+        A* for up to ASTAR_MAX_TARGETS targets, plain Dijkstra beyond that.
+
+        Returns:
+            Settled node -> (seconds, meters)
+        """
+        remaining = set(targets)
+        if not remaining:
+            return {}
+        estimate = self._heuristic(sorted(remaining)) if len(remaining) <= ASTAR_MAX_TARGETS else None
+        best_time: Dict[int, float] = {source: 0.0}
+        best_meters: Dict[int, float] = {source: 0.0}
+        settled: Dict[int, Tuple[float, float]] = {}
+        heap: List[Tuple[float, float, int]] = [(estimate[source] if estimate else 0.0, 0.0, source)]
+        indptr, indices, seconds, meters = self._indptr, self._indices, self._seconds, self._meters
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        while heap and remaining:
+            _, time_so_far, node = heappop(heap)
+            if node in settled:
+                continue
+            settled[node] = (time_so_far, best_meters[node])
+            remaining.discard(node)
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[edge]
+                if neighbour in settled:
+                    continue
+                candidate = time_so_far + seconds[edge]
+                if candidate < best_time.get(neighbour, math.inf):
+                    best_time[neighbour] = candidate
+                    best_meters[neighbour] = best_meters[node] + meters[edge]
+                    key = candidate + estimate[neighbour] if estimate else candidate
+                    heappush(heap, (key, candidate, neighbour))
+        return settled
+
+    def one_to_many(
+        self,
+        origin: Coords,
+        destinations: Sequence[Optional[Coords]],
+    ) -> List[Optional[Dict[str, float]]]:
+        """Drive metrics from ``origin`` to every destination (None if unreachable)."""
+        origin_snap = self.nearest_node(origin)
+        results: List[Optional[Dict[str, float]]] = [None] * len(destinations)
+        if origin_snap is None:
+            return results
+
+        snaps: Dict[int, Tuple[int, float]] = {}
+        for position, destination in enumerate(destinations):
+            if destination is None or destination[0] is None or destination[1] is None:
+                continue
+            snap = self.nearest_node(destination)
+            if snap is not None:
+                snaps[position] = snap
+
+        settled = self._search(origin_snap[0], {node for node, _ in snaps.values()})
+        snap_mps = SNAP_SPEED_KMH / 3.6
+        for position, (node, snap_m) in snaps.items():
+            if node not in settled:
+                continue
+            seconds, meters = settled[node]
+            access_m = (origin_snap[1] + snap_m) * SNAP_DETOUR
+            total_m = meters + access_m
+            results[position] = {
+                "distance_km": total_m / 1000.0,
+                "distance_miles": total_m / METERS_PER_MILE,
+                "duration_minutes": (seconds + access_m / snap_mps) / 60.0,
+            }
+        return results
+
+    def route(self, origin: Coords, destination: Coords) -> Optional[Dict[str, float]]:
+        return self.one_to_many(origin, [destination])[0]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a local routing graph from an OSM extract")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Contract an .osm/.osm.pbf extract into an .npz graph")
+    build.add_argument("osm_path")
+    build.add_argument("graph_path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        router = build_graph(args.osm_path)
+        router.save(args.graph_path)
+        print(f"Saved {router.node_count} nodes / {router.edge_count} edges to {args.graph_path}")
+
+
+if __name__ == "__main__":
+    main()
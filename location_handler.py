@@ -3,8 +3,11 @@ Location Handler for Marketplace CLI
 Converts ZIP codes, city names, and addresses to platform-specific location parameters
 """
 
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, replace
+from functools import lru_cache
+import difflib
+import re
 
 @dataclass
 class LocationParams:
@@ -68,11 +71,157 @@ CITY_TO_LOCATION = {
     }
 }
 
+# Nicknames and alternate spellings that resolve to a CITY_TO_LOCATION key
+CITY_ALIASES = {
+    "phila": "philadelphia",
+    "pinehill": "pine hill",
+}
+
+# Trailing state tokens ("Newark, DE") used to reject matches in the wrong state
+STATE_ALIASES = {
+    "new jersey": "New Jersey",
+    "nj": "New Jersey",
+    "pennsylvania": "Pennsylvania",
+    "pa": "Pennsylvania",
+    "new york": "New York",
+    "ny": "New York",
+    "delaware": "Delaware",
+    "de": "Delaware",
+    "maryland": "Maryland",
+    "md": "Maryland",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _split_state(tokens: List[str]) -> Tuple[List[str], Optional[str]]:
+    """Strip a trailing ZIP/state suffix and return (remaining tokens, state)."""
+    tokens = list(tokens)
+    while tokens and tokens[-1].isdigit():
+        tokens.pop()
+    for width in (2, 1):
+        if len(tokens) > width:
+            tail = " ".join(tokens[-width:])
+            if tail in STATE_ALIASES:
+                return tokens[:-width], STATE_ALIASES[tail]
+    return tokens, None
+
+
+class LocationIndex:
+    """
+    Token index over the bundled place names and aliases.
+
+    Lookups match whole token phrases (longest first), so "pine hill nj" hits
+    "pine hill" while "newarkville" no longer matches "newark". A trailing state
+    that disagrees with the bundled entry rejects the match, and a difflib pass
+    over the indexed phrases catches small misspellings ("philadelpia").
+    """
+
+    def __init__(
+        self,
+        places: Dict[str, Dict],
+        aliases: Optional[Dict[str, str]] = None,
+        fuzzy_cutoff: float = 0.85,
+    ) -> None:
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._phrases: Dict[Tuple[str, ...], Dict] = {}
+        for name, data in places.items():
+            self._phrases[tuple(_tokenize(name))] = data
+        for alias, target in (aliases or {}).items():
+            if target in places:
+                self._phrases[tuple(_tokenize(alias))] = places[target]
+        self._max_width = max((len(p) for p in self._phrases), default=0)
+        self._fuzzy_choices: Dict[str, Tuple[str, ...]] = {
+            " ".join(p): p for p in self._phrases if len(" ".join(p)) >= 4
+        }
+
+    def lookup(self, text: str) -> Optional[Dict]:
+        """Return the bundled location data for free-form text, or None."""
+        tokens, state = _split_state(_tokenize(text))
+        if not tokens:
+            return None
+
+        for width in range(min(self._max_width, len(tokens)), 0, -1):
+            for start in range(len(tokens) - width + 1):
+                data = self._phrases.get(tuple(tokens[start:start + width]))
+                if data is not None and self._state_matches(data, state):
+                    return data
+
+        for width in range(min(self._max_width, len(tokens)), 0, -1):
+            for start in range(len(tokens) - width + 1):
+                phrase = " ".join(tokens[start:start + width])
+                if len(phrase) < 4:
+                    continue
+                matches = difflib.get_close_matches(
+                    phrase, self._fuzzy_choices, n=1, cutoff=self.fuzzy_cutoff
+                )
+                if matches:
+                    data = self._phrases[self._fuzzy_choices[matches[0]]]
+                    if self._state_matches(data, state):
+                        return data
+        return None
+
+    @staticmethod
+    def _state_matches(data: Dict, state: Optional[str]) -> bool:
+        return state is None or data.get("state") == state
+
+
+_location_index: Optional[LocationIndex] = None
+
+
+def rebuild_location_index() -> LocationIndex:
+    """Re-index the hardcoded mappings (call after expanding them at runtime)."""
+    global _location_index
+    _location_index = LocationIndex(CITY_TO_LOCATION, CITY_ALIASES)
+    clear_location_caches()
+    return _location_index
+
+
+def clear_location_caches() -> None:
+    """Drop memoized normalizations and platform parameter bundles."""
+    _resolve_location.cache_clear()
+    _cached_platform_params.cache_clear()
+
+
+def _get_location_index() -> LocationIndex:
+    if _location_index is None:
+        return rebuild_location_index()
+    return _location_index
+
+
+def _params_from_data(data: Dict, radius_miles: int, zip_code: Optional[str] = None) -> LocationParams:
+    return LocationParams(
+        zip_code=zip_code,
+        city=data["city"],
+        state=data["state"],
+        latitude=data["latitude"],
+        longitude=data["longitude"],
+        radius_miles=radius_miles,
+        craigslist_sites=list(data["craigslist_sites"]),
+        craigslist_primary_site=data.get("craigslist_primary_site"),
+        offerup_city=data["offerup_city"],
+        offerup_state=data["offerup_state"],
+        facebook_city_code=data["facebook_city_code"]
+    )
+
+
+def _copy_params(location: LocationParams) -> LocationParams:
+    """Hand out copies so callers can't mutate cached entries."""
+    sites = list(location.craigslist_sites) if location.craigslist_sites is not None else None
+    return replace(location, craigslist_sites=sites)
+
 
 def normalize_location(location_input: str, radius_miles: int = 10) -> LocationParams:
     """
     Convert user's location input (ZIP, city name, or address) to LocationParams.
 
+    Results (including geocoder fallbacks) are memoized per cleaned input and
+    radius, so repeated calls in a long-running process are dictionary lookups.
+
     Args:
         location_input: ZIP code, city name, or full address
         radius_miles: Search radius in miles
@@ -85,28 +234,17 @@ def normalize_location(location_input: str, radius_miles: int = 10) -> LocationP
         normalize_location("Philadelphia, PA", radius_miles=15)
         normalize_location("Pine Hill NJ", radius_miles=5)
     """
+    cleaned = " ".join(location_input.strip().lower().split())
+    return _copy_params(_resolve_location(cleaned, radius_miles))
 
-    # Clean input
-    location_input = location_input.strip().lower()
 
-    # Check if it's a ZIP code
+@lru_cache(maxsize=1024)
+def _resolve_location(location_input: str, radius_miles: int) -> LocationParams:
+    # Check if it's a ZIP code (ZIP+4 resolves by its first five digits)
     if location_input.replace("-", "").isdigit():
-        zip_code = location_input.replace("-", "")
+        zip_code = location_input.split("-")[0]
         if zip_code in ZIP_TO_LOCATION:
-            data = ZIP_TO_LOCATION[zip_code]
-            return LocationParams(
-                zip_code=zip_code,
-                city=data["city"],
-                state=data["state"],
-                latitude=data["latitude"],
-                longitude=data["longitude"],
-                radius_miles=radius_miles,
-                craigslist_sites=data["craigslist_sites"],
-                craigslist_primary_site=data.get("craigslist_primary_site"),
-                offerup_city=data["offerup_city"],
-                offerup_state=data["offerup_state"],
-                facebook_city_code=data["facebook_city_code"]
-            )
+            return _params_from_data(ZIP_TO_LOCATION[zip_code], radius_miles, zip_code=zip_code)
         else:
             # Try geocoding (requires geopy)
             try:
@@ -114,21 +252,10 @@ def normalize_location(location_input: str, radius_miles: int = 10) -> LocationP
             except:
                 raise ValueError(f"ZIP code {zip_code} not in database. Install geopy for automatic geocoding.")
 
-    # Check if it's a known city name
-    for city_key, data in CITY_TO_LOCATION.items():
-        if city_key in location_input:
-            return LocationParams(
-                city=data["city"],
-                state=data["state"],
-                latitude=data["latitude"],
-                longitude=data["longitude"],
-                radius_miles=radius_miles,
-                craigslist_sites=data["craigslist_sites"],
-                craigslist_primary_site=data.get("craigslist_primary_site"),
-                offerup_city=data["offerup_city"],
-                offerup_state=data["offerup_state"],
-                facebook_city_code=data["facebook_city_code"]
-            )
+    # Check if it's a known city name or alias
+    data = _get_location_index().lookup(location_input)
+    if data is not None:
+        return _params_from_data(data, radius_miles)
 
     # Try geocoding as fallback
     try:
@@ -257,6 +384,26 @@ def get_search_params_for_platform(location: LocationParams, platform: str) -> D
         raise ValueError(f"Unknown platform: {platform}")
 
 
+@lru_cache(maxsize=1024)
+def _cached_platform_params(location_input: str, platform: str, radius_miles: int) -> Dict:
+    return get_search_params_for_platform(_resolve_location(location_input, radius_miles), platform)
+
+
+def search_params_for(location_input: str, platform: str, radius_miles: int = 10) -> Dict:
+    """
+    Resolve a raw location string straight to a platform parameter bundle.
+
+    Both the normalization and the per-platform bundle are LRU-cached, so this
+    is cheap enough to call on every request.
+    """
+    cleaned = " ".join(location_input.strip().lower().split())
+    params = dict(_cached_platform_params(cleaned, platform, radius_miles))
+    if params.get("sites") is not None:
+        params["sites"] = list(params["sites"])
+    return params
+
+
+
 # Example usage
 if __name__ == "__main__":
     print("=" * 70)
@@ -0,0 +1,181 @@
+"""
+Streaming NDJSON output for marketplace CLI.
+
+Writes one JSON object per line as results are produced, instead of holding a
+whole run in memory and dumping an indented array at the end:
+  * The first record is flushed immediately, later ones every ``flush_every``
+    records or ``flush_interval`` seconds, so consumers can tail the file
+  * Memory stays constant regardless of run size
+  * A final ``{"type": "summary", ...}`` line records counts, timing and
+    whether the run completed; a crash still leaves every line written so far
+
+Usage:
+    from ndjson_sink import NDJSONSink, read_ndjson
+
+    with NDJSONSink("results.ndjson") as sink:      # or NDJSONSink("-") for stdout
+        for listing in listings:
+            sink.write(listing)
+
+    for record in read_ndjson("results.ndjson"):
+        ...
+"""
+
+from typing import Any, Dict, Iterator, Optional, TextIO, Union
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+import threading
+import time
+
+import serialization
+
+SUMMARY_TYPE = "summary"
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _ends_mid_line(path: Union[str, Path]) -> bool:
+    with open(path, "rb") as handle:
+        handle.seek(0, 2)
+        if handle.tell() == 0:
+            return False
+        handle.seek(-1, 2)
+        return handle.read(1) != b"\n"
+
+
+def dumps_line(record: Any) -> str:
+    """Compact single-line JSON for one record."""
+    return serialization.dumps(record, omit_defaults=False, default=_default).decode("utf-8")
+
+
+class NDJSONSink:
+    def __init__(
+        self,
+        target: Union[str, Path, TextIO] = "-",
+        flush_every: int = 50,
+        flush_interval: float = 1.0,
+        append: bool = False,
+    ) -> None:
+        """Line-per-record JSON writer.
+
+        Args:
+            target: File path, "-" for stdout, or an open text stream
+            flush_every: Flush after this many unflushed records
+            flush_interval: Flush when this many seconds passed since the last flush
+            append: Append to an existing file instead of truncating it
+        """
+        if isinstance(target, (str, Path)):
+            if str(target) == "-":
+                self._handle, self._owns_handle = sys.stdout, False
+            else:
+                self._handle = open(target, "a" if append else "w", encoding="utf-8")
+                self._owns_handle = True
+                if append and _ends_mid_line(target):
+                    # Terminate a crashed writer's partial line so it does not swallow ours.
+                    self._handle.write("\n")
+        else:
+            self._handle, self._owns_handle = target, False
+
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.counts_by_platform: Dict[str, int] = {}
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.monotonic()
+        self._pending = 0
+        self._last_flush = self._started
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def write(self, record: Any) -> None:
+        """Write one record (dict, or any object with ``to_dict()``)."""
+        if hasattr(record, "to_dict"):
+            record = record.to_dict()
+        line = dumps_line(record) + "\n"
+        with self._lock:
+            if self._closed:
+                raise ValueError("write to closed NDJSONSink")
+            self._handle.write(line)
+            self.count += 1
+            platform = record.get("platform") if isinstance(record, dict) else None
+            if platform:
+                self.counts_by_platform[platform] = self.counts_by_platform.get(platform, 0) + 1
+            self._pending += 1
+            now = time.monotonic()
+            # First record goes out at once so consumers can start immediately.
+            if self.count == 1 or self._pending >= self.flush_every or now - self._last_flush >= self.flush_interval:
+                self._flush(now)
+
+    def _flush(self, now: float) -> None:
+        self._handle.flush()
+        self._pending = 0
+        self._last_flush = now
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush(time.monotonic())
+
+    def close(self, summary: Optional[Dict[str, Any]] = None, complete: bool = True) -> None:
+        """Write the summary line and release the file (idempotent)."""
+        with self._lock:
+            if self._closed:
+                return
+            record = {
+                "type": SUMMARY_TYPE,
+                "complete": complete,
+                "count": self.count,
+                "counts_by_platform": self.counts_by_platform,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "elapsed_seconds": round(time.monotonic() - self._started, 3),
+            }
+            if summary:
+                record.update(summary)
+            self._handle.write(dumps_line(record) + "\n")
+            self._flush(time.monotonic())
+            self._closed = True
+            if self._owns_handle:
+                self._handle.close()
+
+    def __enter__(self) -> "NDJSONSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        summary = {"error": f"{exc_type.__name__}: {exc}"} if exc_type else None
+        self.close(summary, complete=exc_type is None)
+
+
+def is_summary(record: Any) -> bool:
+    return isinstance(record, dict) and record.get("type") == SUMMARY_TYPE
+
+
+def read_ndjson(
+    source: Union[str, Path, TextIO],
+    include_summary: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Iterate records from an NDJSON file or stream, skipping blank/truncated lines."""
+    handle = open(source, "r", encoding="utf-8") if isinstance(source, (str, Path)) else source
+    try:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = serialization.loads(line, expand=False)
+            except ValueError:
+                # A crashed writer can leave a partial last line.
+                continue
+            if is_summary(record) and not include_summary:
+                continue
+            yield record
+    finally:
+        if handle is not source:
+            handle.close()
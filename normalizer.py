@@ -0,0 +1,275 @@
+"""
+Listing normalizer for marketplace CLI.
+
+Converts platform-specific listing data (Craigslist `Ad`/`to_dict()` output,
+pyOfferUp posts, Facebook Marketplace scrape rows) into the standardized
+schema from the continuation plan, so downstream tools only deal with one
+shape.
+
+Standardized schema:
+    {
+        "id": "craigslist:7891671290",
+        "platform": "facebook|offerup|craigslist",
+        "native_id": "7891671290",
+        "title": str,
+        "price": float | None,
+        "currency": "USD",
+        "location": str | None,
+        "latitude": float | None,
+        "longitude": float | None,
+        "distance_miles": float | None,
+        "duration_minutes": float | None,
+        "url": str,
+        "image_url": str | None,
+        "image_hashes": [hex dHash, ...] | None,
+        "posted_date": "YYYY-MM-DD" | None,
+        "posted_hours_ago": float | None,
+        "condition": str | None,
+        "captured_at": ISO timestamp,
+        "tier1_data": {...},
+        "tier2_data": {...} | None
+    }
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime, timezone
+from pathlib import Path
+import re
+
+import serialization
+
+PLATFORMS = ("craigslist", "offerup", "facebook")
+
+LISTING_FIELDS = (
+    "id",
+    "platform",
+    "native_id",
+    "title",
+    "price",
+    "currency",
+    "location",
+    "latitude",
+    "longitude",
+    "distance_miles",
+    "duration_minutes",
+    "url",
+    "image_url",
+    "image_hashes",
+    "posted_date",
+    "posted_hours_ago",
+    "condition",
+    "captured_at",
+    "tier1_data",
+    "tier2_data",
+)
+
+_PRICE_PATTERN = re.compile(r"\$?\s*(\d[\d,]*(?:\.\d+)?)")
+_FACEBOOK_ITEM_PATTERN = re.compile(r"/marketplace/item/(\d+)")
+_CRAIGSLIST_PID_PATTERN = re.compile(r"/(\d+)\.html")
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """Parse prices like 250, "100", "$1,234.50" or "$115Nintendo..." into floats."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PRICE_PATTERN.search(str(value))
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _empty_listing(platform: str, captured_at: Optional[str]) -> Dict[str, Any]:
+    listing = {field: None for field in LISTING_FIELDS}
+    listing["platform"] = platform
+    listing["currency"] = "USD"
+    listing["captured_at"] = captured_at or _now_iso()
+    return listing
+
+
+def _normalize_craigslist(raw: Any, listing: Dict[str, Any]) -> None:
+    data = raw.to_dict() if hasattr(raw, "to_dict") else dict(raw)
+    native_id = data.get("d_pid")
+    if native_id is None and data.get("url"):
+        match = _CRAIGSLIST_PID_PATTERN.search(data["url"])
+        native_id = match.group(1) if match else None
+
+    attributes = data.get("attributes") or {}
+    image_urls = data.get("image_urls") or []
+    listing.update({
+        "native_id": str(native_id) if native_id is not None else None,
+        "title": data.get("title"),
+        "price": parse_price(data.get("price")),
+        "location": data.get("location"),
+        "latitude": data.get("latitude"),
+        "longitude": data.get("longitude"),
+        "distance_miles": data.get("drive_distance_miles"),
+        "duration_minutes": data.get("drive_duration_minutes"),
+        "url": data.get("url"),
+        "image_url": image_urls[0] if image_urls else None,
+        "image_hashes": data.get("image_hashes"),
+        "posted_date": data.get("posted_date") or (data.get("posted_at") or "")[:10] or None,
+        "posted_hours_ago": data.get("posted_hours_ago"),
+        "condition": attributes.get("condition"),
+    })
+    listing["tier1_data"] = {"posted_label": data.get("posted_label")}
+    if data.get("description") is not None or attributes:
+        listing["tier2_data"] = {
+            "description": data.get("description"),
+            "attributes": attributes,
+            "image_urls": image_urls,
+            "posted_at": data.get("posted_at"),
+            "updated_at": data.get("updated_at"),
+        }
+
+
+def _normalize_offerup(raw: Dict[str, Any], listing: Dict[str, Any]) -> None:
+    image = raw.get("image") or {}
+    listing.update({
+        "native_id": raw.get("listingId"),
+        "title": raw.get("title"),
+        "price": parse_price(raw.get("price")),
+        "location": raw.get("locationName"),
+        "url": raw.get("listingUrl"),
+        "image_url": image.get("url") if isinstance(image, dict) else image,
+        "condition": raw.get("conditionText"),
+    })
+    listing["tier1_data"] = {
+        "flags": raw.get("flags"),
+        "is_firm_price": raw.get("isFirmPrice"),
+        "vehicle_miles": raw.get("vehicleMiles"),
+    }
+
+
+def _normalize_facebook(raw: Dict[str, Any], listing: Dict[str, Any]) -> None:
+    url = raw.get("url") or ""
+    match = _FACEBOOK_ITEM_PATTERN.search(url)
+    native_id = match.group(1) if match else None
+    if native_id:
+        # Drop tracking query strings so the same item always has one URL.
+        url = f"https://www.facebook.com/marketplace/item/{native_id}/"
+
+    price_text = raw.get("price")
+    title = raw.get("title") or ""
+    # Card text often starts with the price ("$115Nintendo switch ...").
+    if isinstance(price_text, str) and title.startswith(price_text):
+        title = title[len(price_text):].strip()
+
+    listing.update({
+        "native_id": native_id,
+        "title": title or None,
+        "price": parse_price(price_text),
+        "location": raw.get("location"),
+        "latitude": raw.get("latitude"),
+        "longitude": raw.get("longitude"),
+        "url": url or None,
+        "image_url": raw.get("image"),
+        "condition": raw.get("condition"),
+    })
+    listing["tier1_data"] = {"card_text": raw.get("title")}
+
+
+_NORMALIZERS = {
+    "craigslist": _normalize_craigslist,
+    "offerup": _normalize_offerup,
+    "facebook": _normalize_facebook,
+}
+
+
+def normalize_listing(platform: str, raw: Any, captured_at: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Convert platform-specific listing data to the standardized format.
+
+    Args:
+        platform: "craigslist", "offerup", or "facebook"
+        raw: Platform listing (Craigslist Ad or dict, pyOfferUp post, Facebook row)
+        captured_at: ISO capture timestamp (defaults to now)
+
+    Returns:
+        Dictionary with every key in LISTING_FIELDS
+    """
+    try:
+        normalizer = _NORMALIZERS[platform]
+    except KeyError:
+        raise ValueError(f"Unknown platform: {platform}")
+
+    listing = _empty_listing(platform, captured_at)
+    normalizer(raw, listing)
+    native_id = listing["native_id"] or listing["url"]
+    listing["id"] = f"{platform}:{native_id}" if native_id else None
+    return listing
+
+
+def detect_platform(raw: Any) -> Optional[str]:
+    """Best-effort platform guess for a raw (un-normalized) listing."""
+    if hasattr(raw, "to_dict"):
+        return "craigslist"
+    if not isinstance(raw, dict):
+        return None
+    if raw.get("platform") in PLATFORMS:
+        return raw["platform"]
+    if "listingId" in raw:
+        return "offerup"
+    url = raw.get("url") or ""
+    if "d_pid" in raw or "craigslist.org" in url:
+        return "craigslist"
+    if "facebook.com" in url:
+        return "facebook"
+    return None
+
+
+def is_normalized(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("platform") in PLATFORMS and "tier1_data" in item
+
+
+def load_capture(
+    path: Union[str, Path],
+    platform: Optional[str] = None,
+    captured_at: Optional[str] = None,
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Read a JSON capture file into (search name, normalized listings) groups.
+
+    Understands the tier-1 test output (a list of search records each with a
+    ``listings`` array), {"listings": [...]} documents such as CLI output and
+    session tier files, and flat lists of raw or already-normalized listings.
+    Raw listings use ``platform`` or, failing that, detect_platform().
+    """
+    path = Path(path)
+    data = serialization.load(path)
+    if captured_at is None:
+        captured_at = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat(timespec="seconds")
+
+    if isinstance(data, dict):
+        query = data.get("query")
+        name = query.get("query") if isinstance(query, dict) else query
+        groups = [(name or path.stem, data.get("listings") or [])]
+    elif data and isinstance(data[0], dict) and "listings" in data[0]:
+        groups = [
+            (record.get("test_name") or record.get("query") or path.stem, record.get("listings") or [])
+            for record in data
+        ]
+    else:
+        groups = [(path.stem, data or [])]
+
+    result = []
+    for search, items in groups:
+        listings = []
+        for item in items:
+            if is_normalized(item):
+                listings.append(item)
+                continue
+            item_platform = platform or detect_platform(item)
+            if item_platform is None:
+                continue
+            listings.append(normalize_listing(item_platform, item, captured_at=captured_at))
+        result.append((search or path.stem, listings))
+    return result
@@ -0,0 +1,336 @@
+"""
+Velocity-aware polling scheduler for saved searches.
+
+A fixed poll interval wastes requests on quiet searches and misses bursts on
+busy ones. This scheduler runs many watch.Watcher searches and gives each its
+own interval from how fast new listings actually appear:
+  * Posting rate per search is an exponentially decayed estimate (new IDs per
+    hour), seeded from posted_hours_ago on a search's first poll and from the
+    first-seen history in the watch tables after a restart
+  * The next poll is due when about ``target_new_per_poll`` new listings are
+    expected, clamped to [min_interval, max_interval] and jittered so searches
+    never fire in lockstep; failures back off exponentially
+  * Per-host concurrency caps and one global requests-per-minute ceiling
+    (rate_limit.TokenBucket) that every page and detail request draws from
+
+Usage:
+    from poll_scheduler import PollScheduler
+    from watch import Watcher
+
+    scheduler = PollScheduler(max_requests_per_minute=20)
+    scheduler.add(Watcher("nintendo switch", "philadelphia"))
+    scheduler.add(Watcher("ps5", "southjersey", postal="08021", search_distance=25))
+    scheduler.run(on_result=lambda search, result: print(search.key, len(result.new)))
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import heapq
+import itertools
+import random
+import threading
+import time
+import urllib.parse
+
+from rate_limit import TokenBucket
+
+# Ages beyond this say little about the current posting rate.
+SEED_HORIZON_HOURS = 72.0
+
+
+def _parse_utc(text: str) -> datetime:
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class PostingRate:
+    def __init__(
+        self,
+        half_life_hours: float = 24.0,
+        prior_per_hour: float = 0.25,
+        prior_hours: float = 4.0,
+    ) -> None:
+        """
+        Decayed estimate of new listings per hour.
+
+        Args:
+            half_life_hours: Weight of an observation halves over this many hours
+            prior_per_hour: Rate assumed before anything is observed
+            prior_hours: Strength of the prior, in hours of pseudo-observation
+        """
+        self.half_life_hours = half_life_hours
+        self.events = prior_per_hour * prior_hours
+        self.exposure_hours = prior_hours
+        self.observations = 0
+
+    def observe(self, count: float, hours: float) -> None:
+        """Record ``count`` new listings over the last ``hours``."""
+        if hours <= 0:
+            return
+        decay = 0.5 ** (hours / self.half_life_hours)
+        self.events = self.events * decay + count
+        self.exposure_hours = self.exposure_hours * decay + hours
+        self.observations += 1
+
+    def observe_ages(self, ages_hours: List[float]) -> None:
+        """Seed from the posting ages of a first result set (newest first or not)."""
+        ages = [age for age in ages_hours if age is not None and 0 <= age <= SEED_HORIZON_HOURS]
+        if ages:
+            self.observe(len(ages), max(max(ages), 1.0))
+
+    @property
+    def per_hour(self) -> float:
+        return self.events / self.exposure_hours
+
+
+class ScheduledSearch:
+    def __init__(self, watcher: Any, rate: PostingRate, next_due: float) -> None:
+        """One saved search under the scheduler."""
+        self.watcher = watcher
+        self.key: str = watcher.key
+        self.host = urllib.parse.urlsplit(getattr(watcher, "url", "")).netloc or "default"
+        self.rate = rate
+        self.next_due = next_due
+        self.interval: Optional[float] = None
+        # Wall-clock epoch seconds, so it survives restarts via the watch tables.
+        self.last_polled: Optional[float] = None
+        self.failures = 0
+        self.polls = 0
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "host": self.host,
+            "rate_per_hour": round(self.rate.per_hour, 4),
+            "interval_seconds": round(self.interval, 1) if self.interval is not None else None,
+            "polls": self.polls,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        max_requests_per_minute: float = 20.0,
+        max_per_host: int = 2,
+        max_workers: int = 4,
+        target_new_per_poll: float = 1.0,
+        min_interval: float = 120.0,
+        max_interval: float = 6 * 3600.0,
+        jitter: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        """
+        Run saved searches on per-search adaptive intervals.
+
+        Args:
+            max_requests_per_minute: Global ceiling across all searches and hosts
+            max_per_host: Concurrent polls allowed against one host
+            max_workers: Worker threads running polls
+            target_new_per_poll: Expected new listings that make a poll worthwhile
+            min_interval: Shortest gap between polls of one search (seconds)
+            max_interval: Longest gap, also the cap for failure backoff (seconds)
+            jitter: Random +/- fraction applied to every interval
+        """
+        self.bucket = TokenBucket(max_requests_per_minute, capacity=max(1.0, max_requests_per_minute / 4), clock=clock)
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self.target_new_per_poll = target_new_per_poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._searches: Dict[str, ScheduledSearch] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._in_flight: Dict[str, int] = {}
+        self._running: set = set()
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------ searches
+    def add(
+        self,
+        watcher: Any,
+        rate: Optional[PostingRate] = None,
+        start_after: Optional[float] = None,
+    ) -> ScheduledSearch:
+        """
+        Schedule ``watcher`` (anything with ``key``, ``url`` and ``poll()``).
+
+        Args:
+            watcher: The saved search; its ``throttle`` is set to this scheduler's
+            rate: Posting-rate estimate to start from (default: seeded from history)
+            start_after: Seconds until the first poll (default: random 0-5s, so a
+                         batch of searches does not fire at once)
+        """
+        last_polled = None
+        if rate is None:
+            rate = PostingRate()
+            last_polled = self._seed_from_history(watcher, rate)
+        watcher.throttle = self.throttle
+        if start_after is None:
+            start_after = self._rng.uniform(0, 5)
+        search = ScheduledSearch(watcher, rate, self._clock() + start_after)
+        search.last_polled = last_polled
+        with self._cond:
+            self._searches[search.key] = search
+            self._push(search)
+            self._cond.notify_all()
+        return search
+
+    def remove(self, key: str) -> None:
+        with self._cond:
+            self._searches.pop(key, None)
+
+    @property
+    def searches(self) -> List[ScheduledSearch]:
+        return list(self._searches.values())
+
+    def _seed_from_history(self, watcher: Any, rate: PostingRate) -> Optional[float]:
+        """Replay the watch tables' first-seen batches; returns the last poll time (epoch)."""
+        store = getattr(watcher, "store", None)
+        if store is None or not hasattr(store, "poll_history"):
+            return None
+        batches, last_polled = store.poll_history(watcher.key)
+        if not batches or not last_polled:
+            return None
+        now = datetime.now(timezone.utc)
+        # The first batch is the backlog found by the very first poll, not a rate.
+        previous = _parse_utc(batches[0][0])
+        for first_seen, count in batches[1:]:
+            seen_at = _parse_utc(first_seen)
+            if (now - seen_at).total_seconds() <= SEED_HORIZON_HOURS * 3600:
+                rate.observe(count, (seen_at - previous).total_seconds() / 3600)
+            previous = seen_at
+        last_polled_at = _parse_utc(last_polled)
+        rate.observe(0, (last_polled_at - previous).total_seconds() / 3600)
+        return last_polled_at.timestamp()
+
+    def _push(self, search: ScheduledSearch) -> None:
+        heapq.heappush(self._heap, (search.next_due, next(self._counter), search.key))
+
+    # ------------------------------------------------------------ pacing
+    def throttle(self) -> None:
+        """Block until the global request budget allows one more request."""
+        while not self.bucket.try_acquire():
+            time.sleep(max(0.05, self.bucket.time_until_available()))
+
+    def interval_for(self, search: ScheduledSearch) -> float:
+        """Seconds until the next poll of ``search`` (before jitter)."""
+        if search.failures:
+            base = search.interval or self.min_interval
+            return min(self.max_interval, base * 2 ** search.failures)
+        per_hour = search.rate.per_hour
+        if per_hour <= 0:
+            return self.max_interval
+        seconds = self.target_new_per_poll / per_hour * 3600
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def _reschedule(self, search: ScheduledSearch) -> None:
+        interval = self.interval_for(search)
+        if not search.failures:
+            search.interval = interval
+        spread = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        search.next_due = self._clock() + max(self.min_interval * (1 - self.jitter), interval * spread)
+        self._push(search)
+
+    # ------------------------------------------------------------ polling
+    def poll(self, search: ScheduledSearch) -> Any:
+        """Poll one search now and update its rate estimate."""
+        started = time.time()
+        try:
+            result = search.watcher.poll()
+        except Exception as exc:
+            search.failures += 1
+            search.last_error = f"{type(exc).__name__}: {exc}"
+            raise
+        new = list(getattr(result, "new", []) or [])
+        if search.last_polled is None and search.rate.observations == 0:
+            search.rate.observe_ages([getattr(ad, "posted_hours_ago", None) for ad in new])
+        elif search.last_polled is not None:
+            search.rate.observe(len(new), (started - search.last_polled) / 3600)
+        search.last_polled = started
+        search.failures = 0
+        search.last_error = None
+        search.polls += 1
+        return result
+
+    def _dispatchable(self, now: float) -> Tuple[List[ScheduledSearch], Optional[float]]:
+        """Pop due searches whose host has capacity; return them and the next wake-up."""
+        ready: List[ScheduledSearch] = []
+        deferred: List[Tuple[float, int, str]] = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            search = self._searches.get(entry[2])
+            if search is None or search.key in self._running or entry[0] != search.next_due:
+                continue  # Removed, already running, or a stale heap entry
+            if self._in_flight.get(search.host, 0) >= self.max_per_host:
+                deferred.append(entry)
+                continue
+            self._in_flight[search.host] = self._in_flight.get(search.host, 0) + 1
+            self._running.add(search.key)
+            ready.append(search)
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        # Deferred searches wait for a completion, which notifies the condition.
+        wake = None if deferred else (self._heap[0][0] if self._heap else None)
+        return ready, wake
+
+    def run(
+        self,
+        on_result: Optional[Callable[[ScheduledSearch, Any], None]] = None,
+        on_error: Optional[Callable[[ScheduledSearch, Exception], None]] = None,
+        max_polls: Optional[int] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> int:
+        """
+        Poll searches as they fall due until ``stop`` is set or ``max_polls`` polls finished.
+
+        Returns:
+            Number of polls completed (successful or not)
+        """
+        stop = stop or threading.Event()
+        completed = 0
+        submitted = 0
+
+        def work(search: ScheduledSearch) -> None:
+            nonlocal completed
+            try:
+                result = self.poll(search)
+                if on_result is not None:
+                    on_result(search, result)
+            except Exception as exc:
+                if on_error is not None:
+                    on_error(search, exc)
+            finally:
+                with self._cond:
+                    self._in_flight[search.host] -= 1
+                    self._running.discard(search.key)
+                    if search.key in self._searches:
+                        self._reschedule(search)
+                    completed += 1
+                    self._cond.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="poll") as executor:
+            with self._cond:
+                while not stop.is_set() and (max_polls is None or completed < max_polls):
+                    ready, wake = self._dispatchable(self._clock())
+                    if max_polls is not None:
+                        ready, overflow = ready[:max_polls - submitted], ready[max_polls - submitted:]
+                        for search in overflow:
+                            self._in_flight[search.host] -= 1
+                            self._running.discard(search.key)
+                            self._push(search)
+                    for search in ready:
+                        submitted += 1
+                        executor.submit(work, search)
+                    if ready:
+                        continue
+                    timeout = None if wake is None else max(0.0, wake - self._clock())
+                    self._cond.wait(timeout=min(timeout, 1.0) if timeout is not None else 1.0)
+        return completed
@@ -0,0 +1,302 @@
+"""
+Price history per listing for marketplace CLI.
+
+Every capture (tier-1 search results, tier-2 detail fetches, watch polls)
+appends (listing id, time, price, status) observations. Runs of identical
+observations are compacted into intervals as they arrive, so a listing that
+sits at $150 for a month is one row with first_seen/last_seen rather than
+thirty:
+
+    listing_id          first_seen            last_seen             price  status
+    craigslist:7891...  2025-11-01T09:00:00Z  2025-11-20T09:00:00Z  150.0  active
+    craigslist:7891...  2025-11-21T09:00:00Z  2025-11-24T09:00:00Z  120.0  active
+
+Intervals live in the listing database file (see listing_db.py), indexed by
+listing and by time, so "what dropped more than 15% this week" reads only the
+intervals touching that week instead of re-scanning old captures.
+
+Usage:
+    from price_history import PriceHistory
+
+    history = PriceHistory()
+    history.record_listings(listings)                # normalized listings
+    history.import_capture("craigslist_tier1_results.json")
+    history.price_drops(min_drop_pct=15, days=7)
+    history.history("craigslist:7891671290")
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import re
+
+from listing_db import ListingDB
+from normalizer import load_capture
+
+_SESSION_TIER_PATTERN = re.compile(r"tier(\d+)_results\.json$")
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    listing_id TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    platform TEXT,
+    price REAL,
+    status TEXT NOT NULL,
+    observations INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (listing_id, first_seen)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_history_last_seen ON price_history(last_seen);
+"""
+
+# Closest interval starting at or before the observation.
+_PREVIOUS = """
+SELECT first_seen, last_seen, platform, price, status FROM price_history
+WHERE listing_id = ? AND first_seen <= ?
+ORDER BY first_seen DESC LIMIT 1
+"""
+
+_EXTEND = """
+UPDATE price_history
+SET last_seen = MAX(last_seen, ?), observations = observations + 1
+WHERE listing_id = ? AND first_seen = ?
+"""
+
+# Head of a split interval: only its first observation is known to precede the split.
+_TRUNCATE = """
+UPDATE price_history
+SET last_seen = first_seen, observations = MAX(observations - 1, 1)
+WHERE listing_id = ? AND first_seen = ?
+"""
+
+_INSERT = """
+INSERT INTO price_history (listing_id, first_seen, last_seen, platform, price, status)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(listing_id, first_seen) DO UPDATE SET
+    price = excluded.price, status = excluded.status, observations = observations + 1
+"""
+
+Observation = Tuple[str, str, Optional[float], str, Optional[str]]
+
+SOLD_WORDS = ("sold", "closed", "pending")
+
+
+def _iso(value: Union[str, datetime, None]) -> str:
+    """UTC ISO-8601 with seconds, the one format stored (so text order is time order)."""
+    if value is None:
+        moment = datetime.now(timezone.utc)
+    elif isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def listing_status(listing: Dict[str, Any]) -> str:
+    """Map whatever status hints a listing carries to "active", "sold" or "removed"."""
+    status = listing.get("status")
+    if not status:
+        tier2 = listing.get("tier2_data") or {}
+        status = tier2.get("status") or tier2.get("state") or ("sold" if tier2.get("is_sold") else None)
+    text = str(status or "active").lower()
+    if text in ("removed", "deleted", "expired", "flagged"):
+        return "removed"
+    if any(word in text for word in SOLD_WORDS):
+        return "sold"
+    return "active"
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceHistory:
+    def __init__(self, db: Optional[ListingDB] = None) -> None:
+        """Interval-compacted price series, stored in the listing database file."""
+        self.db = db or ListingDB()
+        self.db.conn.executescript(HISTORY_SCHEMA)
+
+    # -------------------------------------------------------------- writes
+    def record(
+        self,
+        listing_id: str,
+        price: Optional[float],
+        status: str = "active",
+        observed_at: Union[str, datetime, None] = None,
+        platform: Optional[str] = None,
+    ) -> None:
+        """Append one observation."""
+        self.record_many([(listing_id, _iso(observed_at), _float(price), status, platform)])
+
+    def record_many(self, observations: Iterable[Observation]) -> int:
+        """
+        Append (listing_id, observed_at, price, status, platform) observations.
+
+        An observation identical in price and status to the interval it falls
+        in (the latest one starting at or before it) only extends that
+        interval; anything else starts a new interval. A late (backfilled)
+        observation that lands inside an interval with a different price or
+        status splits it, so the interval's value seen at its last_seen stays
+        the later one. Observations are sorted first, so one batch may mix
+        listings and times freely.
+
+        Returns:
+            Number of observations applied
+        """
+        rows = sorted(
+            (listing_id, _iso(observed_at), _float(price), status or "active", platform)
+            for listing_id, observed_at, price, status, platform in observations
+            if listing_id
+        )
+        conn = self.db.conn
+        with conn:
+            for listing_id, observed_at, price, status, platform in rows:
+                previous = conn.execute(_PREVIOUS, (listing_id, observed_at)).fetchone()
+                if previous is not None and previous["price"] == price and previous["status"] == status:
+                    conn.execute(_EXTEND, (observed_at, listing_id, previous["first_seen"]))
+                else:
+                    if previous is not None and previous["first_seen"] < observed_at < previous["last_seen"]:
+                        conn.execute(_TRUNCATE, (listing_id, previous["first_seen"]))
+                        conn.execute(_INSERT, (
+                            listing_id, previous["last_seen"], previous["last_seen"],
+                            previous["platform"], previous["price"], previous["status"],
+                        ))
+                    conn.execute(_INSERT, (listing_id, observed_at, observed_at, platform, price, status))
+        return len(rows)
+
+    def record_listings(
+        self,
+        listings: Iterable[Dict[str, Any]],
+        observed_at: Union[str, datetime, None] = None,
+    ) -> int:
+        """Record normalized listings (time from ``observed_at`` or each listing's captured_at)."""
+        return self.record_many(
+            (
+                listing.get("id"),
+                observed_at or listing.get("captured_at"),
+                listing.get("price"),
+                listing_status(listing),
+                listing.get("platform"),
+            )
+            for listing in listings
+        )
+
+    def mark_removed(self, listing_ids: Iterable[str], observed_at: Union[str, datetime, None] = None) -> int:
+        """Record that listings disappeared (e.g. a tier-2 fetch returned 404), keeping their last price."""
+        when = _iso(observed_at)
+        observations = []
+        for listing_id in listing_ids:
+            latest = self.latest(listing_id)
+            price = latest["price"] if latest else None
+            platform = latest["platform"] if latest else None
+            observations.append((listing_id, when, price, "removed", platform))
+        return self.record_many(observations)
+
+    # --------------------------------------------------------------- reads
+    def history(self, listing_id: str) -> List[Dict[str, Any]]:
+        rows = self.db.conn.execute(
+            "SELECT * FROM price_history WHERE listing_id = ? ORDER BY first_seen", (listing_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def latest(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.conn.execute(
+            "SELECT * FROM price_history WHERE listing_id = ? ORDER BY first_seen DESC LIMIT 1",
+            (listing_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def price_drops(
+        self,
+        min_drop_pct: float = 10.0,
+        days: float = 7.0,
+        platform: Optional[str] = None,
+        include_inactive: bool = False,
+        limit: Optional[int] = None,
+        now: Union[str, datetime, None] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Listings whose current price is at least ``min_drop_pct`` below their
+        highest price in the last ``days`` days, biggest drops first.
+
+        Only intervals touching the window, plus the one in effect when it
+        opened, are read (index on last_seen, then primary-key lookups).
+
+        Returns:
+            Dicts with listing_id, platform, previous_price, current_price,
+            drop_pct, changed_at (start of the current price) and last_seen
+        """
+        since = _iso((datetime.fromisoformat(_iso(now))) - timedelta(days=days))
+        sql = """
+            WITH recent AS (
+                SELECT * FROM price_history
+                WHERE last_seen >= :since AND price IS NOT NULL
+            ),
+            in_effect AS (
+                -- The interval current at window start counts even if it was last
+                -- observed earlier (watch mode only records changes).
+                SELECT h.listing_id, h.price FROM price_history h
+                WHERE h.listing_id IN (SELECT listing_id FROM recent)
+                  AND h.price IS NOT NULL
+                  AND h.first_seen = (
+                      SELECT MAX(first_seen) FROM price_history x
+                      WHERE x.listing_id = h.listing_id AND x.first_seen < :since
+                  )
+            ),
+            peak AS (
+                SELECT listing_id, MAX(price) AS previous_price FROM (
+                    SELECT listing_id, price FROM recent
+                    UNION ALL
+                    SELECT listing_id, price FROM in_effect
+                ) GROUP BY listing_id
+            ),
+            current AS (
+                SELECT r.listing_id, r.platform, r.price AS current_price, r.status,
+                       r.first_seen AS changed_at, r.last_seen
+                FROM recent r
+                WHERE r.first_seen = (
+                    SELECT MAX(first_seen) FROM price_history h WHERE h.listing_id = r.listing_id
+                )
+            )
+            SELECT c.listing_id, c.platform, p.previous_price, c.current_price, c.status,
+                   ROUND(100.0 * (p.previous_price - c.current_price) / p.previous_price, 2) AS drop_pct,
+                   c.changed_at, c.last_seen
+            FROM current c JOIN peak p USING (listing_id)
+            WHERE p.previous_price > 0
+              AND c.current_price <= p.previous_price * (1 - :pct / 100.0)
+        """
+        params: Dict[str, Any] = {"since": since, "pct": min_drop_pct}
+        if platform:
+            sql += " AND c.platform = :platform"
+            params["platform"] = platform
+        if not include_inactive:
+            sql += " AND c.status = 'active'"
+        sql += " ORDER BY drop_pct DESC, c.changed_at DESC"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = int(limit)
+        return [dict(row) for row in self.db.conn.execute(sql, params)]
+
+    def count(self) -> int:
+        return self.db.conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+
+    # --------------------------------------------------------------- import
+    def import_capture(self, path: Union[str, Path], platform: Optional[str] = None) -> int:
+        """Record every listing in a JSON capture file (any layout normalizer.load_capture reads)."""
+        return sum(
+            self.record_listings(listings)
+            for _, listings in load_capture(path, platform=platform)
+        )
+
+    def import_session_dir(self, root: Union[str, Path] = "data/sessions") -> int:
+        """Record every ``<root>/<session_id>/tier{n}_results.json`` file, oldest first."""
+        paths = [
+            path for path in Path(root).glob("*/tier*_results.json")
+            if _SESSION_TIER_PATTERN.search(path.name)
+        ]
+        return sum(self.import_capture(path) for path in sorted(paths, key=lambda p: p.stat().st_mtime))
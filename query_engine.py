@@ -0,0 +1,498 @@
+"""
+Vectorized query engine over captured listings.
+
+Loads listings once into typed NumPy columns and answers filter / sort /
+aggregate queries with array operations instead of Python loops over
+``to_dict()`` output:
+  * Numeric columns (price, coordinates, distances, ages, timestamps) are
+    float64 arrays with NaN for missing values; prices are parsed once, at load
+  * Low-cardinality columns (platform, condition, site, search, cluster_id)
+    are dictionary-encoded, so equality/IN filters and group-bys are integer ops
+  * Radius filters use the vectorized haversine from drive_time_estimator
+
+Frames load from normalized or raw listing dicts, any snapshot source
+snapshot_diff understands (NDJSON, JSON captures, Parquet), or straight from a
+columnar_store.ListingStore without building per-listing dicts.
+
+Usage:
+    from query_engine import ListingFrame
+
+    frame = ListingFrame.from_source("results.ndjson")
+    cheap = (frame.query()
+             .where("price", "<=", 200)
+             .where("condition", "in", ["good", "excellent"])
+             .within(39.95, -75.16, miles=15)
+             .sort("price")
+             .limit(20)
+             .rows())
+    frame.query().where("platform", "=", "craigslist").aggregate("site", ["count", "price:median"])
+
+    python cli.py query results.ndjson --where "price<=200" --where "title~switch" --sort price
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+import math
+import re
+import urllib.parse
+
+import numpy as np
+
+from drive_time_estimator import haversine_miles_array
+from normalizer import detect_platform, is_normalized, normalize_listing, parse_price
+
+NUMERIC_COLUMNS = (
+    "price",
+    "latitude",
+    "longitude",
+    "distance_miles",
+    "duration_minutes",
+    "posted_hours_ago",
+    "posted_at",
+    "captured_at",
+    "age_hours",
+)
+CATEGORY_COLUMNS = ("platform", "condition", "site", "search", "cluster_id")
+TEXT_COLUMNS = ("id", "title", "location", "url")
+# Seconds since the epoch; filters on these accept ISO date strings too.
+TIMESTAMP_COLUMNS = ("posted_at", "captured_at")
+
+AGGREGATES = ("count", "sum", "mean", "median", "min", "max")
+
+_ISO_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_EXPRESSION = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|==|=|<|>|!~|~|\s+in\s+|\s+not\s+in\s+)\s*(.*?)\s*$", re.I)
+
+
+def _utc_naive(value: Any) -> Optional[datetime]:
+    """A datetime or ISO-8601 string as naive UTC (naive inputs are taken as UTC), else None."""
+    if isinstance(value, str):
+        if not _ISO_PREFIX.match(value):
+            return None
+        try:
+            # fromisoformat() only accepts a "Z" suffix from Python 3.11 on.
+            value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _epoch_seconds(values: Sequence[Any]) -> np.ndarray:
+    """ISO-8601 strings or datetimes to float epoch seconds, offsets applied; anything else becomes NaN."""
+    parsed: Dict[Any, Any] = {}
+    moments = []
+    for value in values:
+        # Captures repeat the same dates a lot; parse each distinct value once.
+        key = value if isinstance(value, (str, datetime)) else None
+        if key not in parsed:
+            moment = _utc_naive(key)
+            parsed[key] = "NaT" if moment is None else moment
+        moments.append(parsed[key])
+    stamps = np.array(moments, dtype="datetime64[s]")
+    seconds = stamps.astype("int64").astype("float64")
+    seconds[np.isnat(stamps)] = np.nan
+    return seconds
+
+
+def _to_epoch(value: Any) -> float:
+    if isinstance(value, datetime) or (isinstance(value, str) and _ISO_PREFIX.match(value)):
+        seconds = float(_epoch_seconds([value])[0])
+        if math.isnan(seconds):
+            raise ValueError(f"Invalid timestamp: {value!r}")
+        return seconds
+    return float(value)
+
+
+def _float_array(values: Iterable[Any], count: int) -> np.ndarray:
+    return np.fromiter(
+        (np.nan if value is None else value for value in values), dtype="float64", count=count
+    )
+
+
+def _site(url: Optional[str]) -> Optional[str]:
+    """Craigslist site code or bare host ("philadelphia", "offerup.com")."""
+    if not url:
+        return None
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    if host.endswith(".craigslist.org"):
+        return host.split(".", 1)[0]
+    return host[4:] if host.startswith("www.") else host or None
+
+
+class Category:
+    def __init__(self, values: Sequence[Any]) -> None:
+        """Dictionary-encoded column: integer codes into ``labels`` ("" = missing)."""
+        text = np.array(["" if value is None else str(value) for value in values], dtype=object)
+        self.labels, codes = np.unique(text, return_inverse=True) if len(text) else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        self.codes = codes.astype(np.int32)
+
+    def code(self, label: Any) -> int:
+        index = np.searchsorted(self.labels, str(label))
+        if index < len(self.labels) and self.labels[index] == str(label):
+            return int(index)
+        return -1
+
+    def values(self, indices: np.ndarray) -> List[Optional[str]]:
+        return [label or None for label in self.labels[self.codes[indices]]]
+
+
+class ListingFrame:
+    def __init__(
+        self,
+        numeric: Dict[str, np.ndarray],
+        categories: Dict[str, Category],
+        text: Dict[str, np.ndarray],
+        rows: Callable[[np.ndarray], List[Dict[str, Any]]],
+    ) -> None:
+        """Column store for one set of listings; build with a from_* constructor."""
+        self.numeric = numeric
+        self.categories = categories
+        self.text = text
+        self._rows = rows
+        self._lower: Dict[str, np.ndarray] = {}
+        self.size = len(next(iter(numeric.values()))) if numeric else 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    # -------------------------------------------------------- constructors
+    @classmethod
+    def from_listings(
+        cls,
+        listings: Iterable[Dict[str, Any]],
+        platform: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> "ListingFrame":
+        """
+        Build from listing dicts; raw platform records are normalized for the
+        columns but returned unchanged by ``rows()``.
+        """
+        originals = list(listings)
+        normalized = []
+        for record in originals:
+            if is_normalized(record) or (record.get("id") and record.get("platform")):
+                normalized.append(record)
+            else:
+                name = platform or detect_platform(record) or "craigslist"
+                normalized.append(normalize_listing(name, record))
+
+        count = len(normalized)
+
+        def column(name: str) -> List[Any]:
+            return [listing.get(name) for listing in normalized]
+
+        numeric = {
+            name: _float_array(
+                (parse_price(v) for v in column(name)) if name == "price" else column(name), count
+            )
+            for name in ("price", "latitude", "longitude", "distance_miles", "duration_minutes", "posted_hours_ago")
+        }
+        numeric["captured_at"] = _epoch_seconds(column("captured_at"))
+        posted = _epoch_seconds(column("posted_date"))
+        numeric["posted_at"] = np.where(
+            np.isnan(numeric["posted_hours_ago"]),
+            posted,
+            numeric["captured_at"] - numeric["posted_hours_ago"] * 3600,
+        )
+        categories = {
+            "platform": Category(column("platform")),
+            "condition": Category([(v or "").lower() or None for v in column("condition")]),
+            "site": Category([_site(v) for v in column("url")]),
+            "search": Category([listing.get("search") for listing in originals]),
+            "cluster_id": Category(column("cluster_id")),
+        }
+        text = {name: np.array(column(name), dtype=object) for name in TEXT_COLUMNS}
+        frame = cls(numeric, categories, text, lambda indices: [originals[i] for i in indices])
+        frame._add_age(now)
+        return frame
+
+    @classmethod
+    def from_table(cls, table: Any, now: Optional[datetime] = None) -> "ListingFrame":
+        """Build from a pyarrow Table in the columnar_store schema (no per-row dicts)."""
+        from columnar_store import JSON_COLUMNS
+        import json
+
+        names = set(table.column_names)
+
+        def floats(name: str) -> np.ndarray:
+            if name not in names:
+                return np.full(table.num_rows, np.nan)
+            return table.column(name).to_numpy(zero_copy_only=False).astype("float64")
+
+        def objects(name: str) -> np.ndarray:
+            if name not in names:
+                return np.full(table.num_rows, None, dtype=object)
+            return np.array(table.column(name).to_pylist(), dtype=object)
+
+        numeric = {
+            name: floats(name)
+            for name in ("price", "latitude", "longitude", "distance_miles", "duration_minutes", "posted_hours_ago")
+        }
+        numeric["captured_at"] = _epoch_seconds(objects("captured_at"))
+        posted = _epoch_seconds(objects("posted_date"))
+        numeric["posted_at"] = np.where(
+            np.isnan(numeric["posted_hours_ago"]),
+            posted,
+            numeric["captured_at"] - numeric["posted_hours_ago"] * 3600,
+        )
+        categories = {
+            "platform": Category(objects("platform")),
+            "condition": Category([(v or "").lower() or None for v in objects("condition")]),
+            "site": Category([_site(v) for v in objects("url")]),
+            "search": Category(objects("search")),
+            "cluster_id": Category(objects("cluster_id")),
+        }
+        text = {name: objects(name) for name in TEXT_COLUMNS}
+
+        def rows(indices: np.ndarray) -> List[Dict[str, Any]]:
+            records = table.take(indices).to_pylist()
+            for record in records:
+                for field in JSON_COLUMNS:
+                    if record.get(field) is not None:
+                        record[field] = json.loads(record[field])
+            return records
+
+        frame = cls(numeric, categories, text, rows)
+        frame._add_age(now)
+        return frame
+
+    @classmethod
+    def from_source(cls, source: Any, platform: Optional[str] = None) -> "ListingFrame":
+        """Build from a ListingStore (or its directory), a capture/NDJSON/Parquet file, or dicts."""
+        if hasattr(source, "read") and hasattr(source, "dataset"):
+            return cls.from_table(source.read())
+        if isinstance(source, (str, Path)):
+            path = Path(source)
+            if path.is_dir():
+                from columnar_store import ListingStore
+
+                return cls.from_table(ListingStore(path).read())
+            if path.suffix.lower() == ".parquet":
+                import pyarrow.parquet as pq
+
+                return cls.from_table(pq.read_table(path))
+        from snapshot_diff import iter_snapshot
+
+        return cls.from_listings(iter_snapshot(source, platform), platform=platform)
+
+    def _add_age(self, now: Optional[datetime]) -> None:
+        reference = (now or datetime.now(timezone.utc)).timestamp()
+        self.numeric["age_hours"] = (reference - self.numeric["posted_at"]) / 3600
+
+    # -------------------------------------------------------------- access
+    def lowercase(self, name: str) -> np.ndarray:
+        """Lower-cased text column, computed once per frame."""
+        lower = self._lower.get(name)
+        if lower is None:
+            lower = np.array([(value or "").lower() for value in self.text[name]], dtype=object)
+            self._lower[name] = lower
+        return lower
+
+    def query(self) -> "Query":
+        return Query(self)
+
+    def rows(self, indices: np.ndarray) -> List[Dict[str, Any]]:
+        return self._rows(np.asarray(indices, dtype=np.int64))
+
+
+class Query:
+    def __init__(self, frame: ListingFrame) -> None:
+        """Filters, sort keys and limit over a frame; nothing runs until read."""
+        self.frame = frame
+        self._mask = np.ones(len(frame), dtype=bool)
+        self._sort: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+
+    # ------------------------------------------------------------- filters
+    def where(self, field: str, op: str, value: Any) -> "Query":
+        """
+        Add a predicate.
+
+        Args:
+            field: Any numeric, category or text column
+            op: One of = != < <= > >= in "not in" ~ (contains, case-insensitive) !~
+            value: Comparison value; a list for in / not in. Timestamp columns
+                   (posted_at, captured_at) also accept ISO date strings
+        """
+        op = op.strip().lower()
+        if op == "==":
+            op = "="
+        frame = self.frame
+
+        if field in frame.numeric:
+            column = frame.numeric[field]
+            if op in ("in", "not in"):
+                mask = np.isin(column, [float(v) for v in value])
+                mask = ~mask if op == "not in" else mask
+            else:
+                target = _to_epoch(value) if field in TIMESTAMP_COLUMNS else float(value)
+                with np.errstate(invalid="ignore"):
+                    mask = {
+                        "=": column == target,
+                        "!=": column != target,
+                        "<": column < target,
+                        "<=": column <= target,
+                        ">": column > target,
+                        ">=": column >= target,
+                    }[op]
+        elif field in frame.categories and op not in ("~", "!~"):
+            category = frame.categories[field]
+            values = value if op in ("in", "not in") else [value]
+            codes = [category.code(str(v).lower() if field == "condition" else v) for v in values]
+            mask = np.isin(category.codes, codes)
+            if op in ("!=", "not in"):
+                mask = ~mask
+            elif op not in ("=", "in"):
+                raise ValueError(f"Operator {op!r} not supported on category column {field!r}")
+        elif op in ("~", "!~"):
+            lower = frame.lowercase(field) if field in frame.text else np.array(
+                [(v or "").lower() for v in frame.categories[field].labels[frame.categories[field].codes]],
+                dtype=object,
+            )
+            needle = str(value).lower()
+            mask = np.fromiter((needle in text for text in lower), dtype=bool, count=len(lower))
+            if op == "!~":
+                mask = ~mask
+        elif field in frame.text and op in ("=", "!=", "in", "not in"):
+            values = value if op in ("in", "not in") else [value]
+            mask = np.isin(frame.text[field], list(values))
+            if op in ("!=", "not in"):
+                mask = ~mask
+        else:
+            raise ValueError(f"Unknown field or operator: {field} {op}")
+
+        self._mask &= mask
+        return self
+
+    def where_expression(self, expression: str) -> "Query":
+        """Parse and add a predicate like "price<=200", "condition in good,excellent" or "title~switch"."""
+        match = _EXPRESSION.match(expression)
+        if not match:
+            raise ValueError(f"Cannot parse filter: {expression!r}")
+        field, op, raw = match.groups()
+        op = " ".join(op.lower().split())
+        value: Any = [part.strip() for part in raw.split(",")] if op in ("in", "not in") else raw
+        return self.where(field, op, value)
+
+    def within(self, latitude: float, longitude: float, miles: float) -> "Query":
+        """Keep listings whose coordinates lie within ``miles`` (great-circle) of a point."""
+        lat = self.frame.numeric["latitude"]
+        lon = self.frame.numeric["longitude"]
+        with np.errstate(invalid="ignore"):
+            distance = haversine_miles_array(np.float64(latitude), np.float64(longitude), lat, lon)
+            self._mask &= distance <= miles
+        return self
+
+    # ------------------------------------------------------- sort / limit
+    def sort(self, field: str, descending: bool = False) -> "Query":
+        """Add a sort key (earlier keys take precedence); missing values sort last."""
+        self._sort.append((field, descending))
+        return self
+
+    def limit(self, count: int) -> "Query":
+        self._limit = count
+        return self
+
+    def _sort_key(self, field: str, descending: bool, indices: np.ndarray) -> np.ndarray:
+        frame = self.frame
+        if field in frame.numeric:
+            values = frame.numeric[field][indices]
+            key = -values if descending else values.copy()
+            key[np.isnan(key)] = np.inf
+            return key
+        if field in frame.categories:
+            # Labels are sorted, so codes order like the labels themselves.
+            category = frame.categories[field]
+            codes = category.codes[indices]
+            missing = category.labels[codes] == ""
+            ranks = codes
+        else:
+            values = frame.lowercase(field)[indices]
+            missing = values == ""
+            ranks = np.unique(values, return_inverse=True)[1].reshape(-1)
+        key = (-ranks if descending else ranks).astype(np.float64)
+        key[missing] = np.inf
+        return key
+
+    # ---------------------------------------------------------------- read
+    def mask(self) -> np.ndarray:
+        return self._mask
+
+    def count(self) -> int:
+        return int(self._mask.sum())
+
+    def indices(self) -> np.ndarray:
+        """Row indices of matches, sorted and limited."""
+        selected = np.flatnonzero(self._mask)
+        if self._sort:
+            keys = [self._sort_key(field, desc, selected) for field, desc in self._sort]
+            if len(keys) == 1 and self._limit is not None and self._limit < len(selected):
+                # Partial sort: only the first ``limit`` rows need ordering.
+                top = np.argpartition(keys[0], self._limit - 1)[:self._limit] if self._limit > 0 else np.array([], dtype=np.int64)
+                order = top[np.argsort(keys[0][top], kind="stable")]
+            else:
+                # np.lexsort treats the last key as primary.
+                order = np.lexsort(keys[::-1])
+            selected = selected[order]
+        if self._limit is not None:
+            selected = selected[:self._limit]
+        return selected
+
+    def rows(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        rows = self.frame.rows(self.indices())
+        if fields:
+            return [{field: row.get(field) for field in fields} for row in rows]
+        return rows
+
+    def column(self, field: str) -> np.ndarray:
+        """Values of one numeric column for the matches (sorted and limited)."""
+        return self.frame.numeric[field][self.indices()]
+
+    def aggregate(self, by: Optional[str], metrics: Sequence[str] = ("count",)) -> List[Dict[str, Any]]:
+        """
+        Group matches by a category column and compute metrics per group.
+
+        Args:
+            by: Category column to group on (None for one overall group)
+            metrics: "count" or "<column>:<func>" with func in sum/mean/median/min/max,
+                     e.g. ["count", "price:median", "distance_miles:min"]
+
+        Returns:
+            One dict per group, largest groups first
+        """
+        selected = np.flatnonzero(self._mask)
+        if by is None:
+            codes = np.zeros(len(selected), dtype=np.int64)
+            labels = np.array([None], dtype=object)
+        else:
+            category = self.frame.categories[by]
+            codes = category.codes[selected].astype(np.int64)
+            labels = np.array([label or None for label in category.labels], dtype=object)
+
+        counts = np.bincount(codes, minlength=len(labels))
+        groups = np.flatnonzero(counts)
+        results = [{by or "group": labels[g], "count": int(counts[g])} for g in groups]
+
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.searchsorted(codes[order], groups)
+        for metric in metrics:
+            if metric == "count":
+                continue
+            field, _, func = metric.partition(":")
+            if func not in AGGREGATES or field not in self.frame.numeric:
+                raise ValueError(f"Unknown metric {metric!r}")
+            values = self.frame.numeric[field][selected][order]
+            for result, chunk in zip(results, np.split(values, boundaries[1:])):
+                chunk = chunk[~np.isnan(chunk)]
+                if func == "count":
+                    value: Optional[float] = float(len(chunk))
+                elif not len(chunk):
+                    value = None
+                else:
+                    value = float(getattr(np, func)(chunk))
+                result[metric] = round(value, 2) if value is not None else None
+
+        results.sort(key=lambda result: -result["count"])
+        return results
@@ -0,0 +1,66 @@
+"""
+Rate limiting primitives for marketplace CLI.
+
+Provides a small thread-safe token bucket shared by the routing key scheduler
+and the polling scheduler. Buckets never block on their own; callers decide
+whether to wait (``time_until_available``) or move on.
+
+Usage:
+    from rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate_per_minute=40)
+    if bucket.try_acquire():
+        ...
+"""
+
+from typing import Callable, Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` if available right now; never blocks."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def time_until_available(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` could be acquired (0.0 if available now)."""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate_per_second)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
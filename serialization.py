@@ -0,0 +1,244 @@
+"""
+Schema-aware JSON serialization for marketplace CLI.
+
+Search, capture and session dumps are mostly ``null``: a tier-1 Ad has 18 keys
+and usually fewer than half are set. This module writes records against a
+known field schema so that:
+  * Compact mode drops every schema field still at its default (null, "USD"...)
+    and uses no whitespace; pretty mode indents for humans
+  * Decoding restores the omitted fields in schema order, so a compact file
+    loads back identical to the original ``to_dict()`` output
+  * Encoding uses the fastest library available: msgspec, then orjson, then
+    the stdlib json module
+
+Records are objects positively identified as a raw Ad (Search.to_dict) or a
+normalized listing (normalizer.py), at the top level or as items of
+"ads"/"listings" arrays; each has its own schema. A compact write tags the
+arrays it compacted under "_compacted", and only those are expanded on load,
+so arrays of other rows (e.g. ``query --fields`` projections) load back as
+written. Every other dict, such as session metadata or job parameters,
+passes through unchanged.
+
+Usage:
+    from serialization import dump, load
+
+    dump(search.to_dict(), "search.json")            # compact, nulls omitted
+    dump(results, "results.json", pretty=True)
+    data = load("search.json")                       # omitted fields restored
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+from pathlib import Path
+import json
+
+Default = Optional[Callable[[Any], Any]]
+
+try:
+    import msgspec
+
+    BACKEND = "msgspec"
+
+    def _encode(obj: Any, pretty: bool, default: Default) -> bytes:
+        data = msgspec.json.encode(obj, enc_hook=default)
+        return msgspec.json.format(data, indent=2) if pretty else data
+
+    def _decode(data: Union[bytes, str]) -> Any:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as exc:
+            # Match orjson/json, whose decode errors are ValueErrors.
+            raise ValueError(str(exc)) from exc
+except ImportError:
+    try:
+        import orjson
+
+        BACKEND = "orjson"
+
+        def _encode(obj: Any, pretty: bool, default: Default) -> bytes:
+            option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0)
+            return orjson.dumps(obj, default=default, option=option)
+
+        _decode = orjson.loads
+    except ImportError:
+        BACKEND = "json"
+
+        def _encode(obj: Any, pretty: bool, default: Default) -> bytes:
+            if pretty:
+                text = json.dumps(obj, indent=2, ensure_ascii=False, default=default)
+            else:
+                text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default)
+            return text.encode("utf-8")
+
+        _decode = json.loads
+
+
+class RecordSchema:
+    def __init__(self, name: str, fields: Iterable[Union[str, Tuple[str, Any]]]) -> None:
+        """Ordered record fields with their default values (None unless given)."""
+        self.name = name
+        self.defaults: Dict[str, Any] = {}
+        for field in fields:
+            key, default = (field, None) if isinstance(field, str) else field
+            self.defaults[key] = default
+
+    def compact(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop schema fields that hold their default; keep everything else."""
+        defaults = self.defaults
+        missing = object()
+        return {
+            key: value for key, value in record.items()
+            if defaults.get(key, missing) is missing or value != defaults[key]
+        }
+
+    def expand(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Restore omitted schema fields in schema order, extras after."""
+        full = {key: record.get(key, default) for key, default in self.defaults.items()}
+        for key, value in record.items():
+            if key not in full:
+                full[key] = value
+        return full
+
+
+# Mirrors craigslist_scraper_patched.ad.Ad.to_dict()
+AD_SCHEMA = RecordSchema("ad", [
+    "url", "price", "title", "d_pid", "description", "image_urls", "attributes",
+    "posted_at", "updated_at", "posted_label", "posted_hours_ago", "posted_date",
+    "location", "latitude", "longitude", "drive_distance_miles",
+    "drive_duration_minutes", "image_hashes",
+])
+
+# Mirrors normalizer.LISTING_FIELDS
+LISTING_SCHEMA = RecordSchema("listing", [
+    "id", "platform", "native_id", "title", "price", ("currency", "USD"), "location",
+    "latitude", "longitude", "distance_miles", "duration_minutes", "url", "image_url",
+    "image_hashes", "posted_date", "posted_hours_ago", "condition", "captured_at",
+    "tier1_data", "tier2_data",
+])
+
+RECORD_ARRAY_KEYS = ("ads", "listings")
+
+# Lists the record arrays of a document that a compact write stripped of defaults.
+COMPACTED_KEY = "_compacted"
+
+
+def schema_for(record: Dict[str, Any]) -> Optional[RecordSchema]:
+    """
+    Schema of a record positively identified as a listing or a raw Ad, else None.
+
+    Normalized listings carry "platform" plus their capture fields (captured_at
+    is always set); raw Ads carry a "url" and nothing outside AD_SCHEMA. Any
+    other dict (session metadata, job params, summaries) is not a record.
+    """
+    if "platform" in record and ("captured_at" in record or "tier1_data" in record):
+        return LISTING_SCHEMA
+    if "url" in record and "platform" not in record and record.keys() <= AD_SCHEMA.defaults.keys():
+        return AD_SCHEMA
+    return None
+
+
+def _array_schema(record: Dict[str, Any]) -> RecordSchema:
+    # Only arrays listed under COMPACTED_KEY get here, and the writer compacted
+    # their items with exactly this choice.
+    return LISTING_SCHEMA if "platform" in record else AD_SCHEMA
+
+
+def _compact_arrays(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact record arrays whose items are all whole records; tag them for expansion."""
+    out = dict(document)
+    compacted = []
+    for key in RECORD_ARRAY_KEYS:
+        items = document.get(key)
+        if not isinstance(items, list) or not items:
+            continue
+        schemas = [schema_for(item) if isinstance(item, dict) else None for item in items]
+        # Every schema field present, so expanding restores exactly what compact drops.
+        if all(schema and item.keys() >= schema.defaults.keys() for schema, item in zip(schemas, items)):
+            out[key] = [schema.compact(item) for schema, item in zip(schemas, items)]
+            compacted.append(key)
+    if compacted:
+        out[COMPACTED_KEY] = compacted
+    return out
+
+
+def _expand_arrays(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore the arrays a compact write tagged; anything else (e.g. projected rows) is left alone."""
+    out = dict(document)
+    for key in out.pop(COMPACTED_KEY, None) or []:
+        if isinstance(out.get(key), list):
+            out[key] = [_array_schema(item).expand(item) if isinstance(item, dict) else item for item in out[key]]
+    return out
+
+
+def _map_records(
+    obj: Any,
+    transform: Callable[[RecordSchema, Dict[str, Any]], Dict[str, Any]],
+    arrays: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> Any:
+    def record(item: Any) -> Any:
+        if not isinstance(item, dict):
+            return item
+        schema = schema_for(item)
+        return item if schema is None else transform(schema, item)
+
+    if isinstance(obj, list):
+        if obj and isinstance(obj[0], dict) and not any(key in obj[0] for key in RECORD_ARRAY_KEYS):
+            return [record(item) for item in obj]
+        return [_map_records(item, transform, arrays) for item in obj]
+    if isinstance(obj, dict):
+        if not any(isinstance(obj.get(key), list) for key in RECORD_ARRAY_KEYS):
+            return record(obj)
+        return arrays(obj)
+    return obj
+
+
+def _to_plain(obj: Any) -> Any:
+    """Turn Ad/Search objects (anything with to_dict) into plain data."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, list) and obj and hasattr(obj[0], "to_dict"):
+        return [item.to_dict() for item in obj]
+    return obj
+
+
+def dumps(
+    obj: Any,
+    pretty: bool = False,
+    omit_defaults: bool = True,
+    default: Default = None,
+) -> bytes:
+    """
+    Encode to UTF-8 JSON bytes.
+
+    Args:
+        obj: Plain data, or an Ad/Search (anything with ``to_dict()``)
+        pretty: Indent with two spaces instead of the compact form
+        omit_defaults: Drop record fields still at their schema default
+        default: Called for values the encoder cannot handle natively
+    """
+    obj = _to_plain(obj)
+    if omit_defaults:
+        obj = _map_records(obj, lambda schema, item: schema.compact(item), _compact_arrays)
+    return _encode(obj, pretty, default)
+
+
+def loads(data: Union[bytes, str], expand: bool = True) -> Any:
+    """Decode JSON (ValueError if malformed); with ``expand`` omitted schema fields are restored."""
+    obj = _decode(data)
+    if expand:
+        obj = _map_records(obj, lambda schema, item: schema.expand(item), _expand_arrays)
+    return obj
+
+
+def dump(obj: Any, path: Union[str, Path], pretty: bool = False, omit_defaults: bool = True) -> int:
+    """Write ``obj`` to ``path``; returns bytes written."""
+    data = dumps(obj, pretty=pretty, omit_defaults=omit_defaults)
+    if pretty:
+        data += b"\n"
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return len(data)
+
+
+def load(path: Union[str, Path], expand: bool = True) -> Any:
+    with open(path, "rb") as handle:
+        return loads(handle.read(), expand=expand)
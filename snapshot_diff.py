@@ -0,0 +1,218 @@
+"""
+Snapshot diff between two capture runs.
+
+Compares an old and a new capture by stable listing ID plus a content
+fingerprint and reports what changed:
+  * added / removed listings
+  * price_changed: same listing, different price (flagged ``edited`` too if
+    the content also changed)
+  * edited: same listing and price, different title/location/photo/condition
+
+The old side is reduced to a small index (id -> price, fingerprint, title,
+url); the new side is streamed against it, so neither capture is ever held
+in memory as full listings and the diff is linear in the number of rows.
+Sources may be legacy JSON captures, NDJSON runs (ndjson_sink.py), Parquet
+files or a columnar_store.ListingStore, or any iterable of listing dicts.
+
+Usage:
+    from snapshot_diff import diff_snapshots, summarize
+
+    changes = list(diff_snapshots("run-monday.ndjson", "run-tuesday.ndjson"))
+    summarize(changes)         # {"added": 12, "removed": 7, "price_changed": 3, "edited": 1}
+
+    python cli.py diff old.json new.ndjson --only added price_changed
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+from pathlib import Path
+import hashlib
+
+from ndjson_sink import read_ndjson
+from normalizer import detect_platform, is_normalized, load_capture, normalize_listing
+
+CHANGE_TYPES = ("added", "removed", "price_changed", "edited")
+
+# Fields whose change counts as an edit. Volatile fields (captured_at,
+# posted_hours_ago, distances) and price (reported separately) are excluded.
+FINGERPRINT_FIELDS = ("title", "location", "image_url", "condition", "latitude", "longitude")
+
+# Columns read from Parquet sources; everything else stays on disk.
+DIFF_COLUMNS = ["id", "platform", "price", "url", *FINGERPRINT_FIELDS]
+
+Source = Union[str, Path, Iterable[Dict[str, Any]], Any]
+IndexEntry = Tuple[Optional[float], str, Optional[str], Optional[str], Optional[str]]
+
+
+def fingerprint(listing: Dict[str, Any]) -> str:
+    """Content hash of the edit-relevant fields of a normalized listing."""
+    parts = []
+    for field in FINGERPRINT_FIELDS:
+        value = listing.get(field)
+        if isinstance(value, float):
+            value = round(value, 5)
+        parts.append("" if value is None else str(value).strip())
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _normalized(records: Iterable[Dict[str, Any]], platform: Optional[str]) -> Iterator[Dict[str, Any]]:
+    for record in records:
+        if is_normalized(record) or (record.get("id") and record.get("platform")):
+            yield record
+            continue
+        name = platform or detect_platform(record)
+        if name:
+            yield normalize_listing(name, record)
+
+
+def _iter_parquet_batches(batches: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    for batch in batches:
+        yield from batch.to_pylist()
+
+
+def iter_snapshot(source: Source, platform: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream normalized listings from any supported capture source.
+
+    Args:
+        source: .ndjson/.jsonl/.json/.parquet path, ListingStore directory or
+                instance, or an iterable of listing dicts
+        platform: Platform for raw listings when it cannot be detected
+    """
+    if hasattr(source, "iter_batches") and hasattr(source, "dataset"):
+        return _iter_parquet_batches(source.iter_batches(columns=DIFF_COLUMNS))
+    if not isinstance(source, (str, Path)):
+        return _normalized(source, platform)
+
+    path = Path(source)
+    suffix = path.suffix.lower()
+    if path.is_dir() or suffix == ".parquet":
+        from columnar_store import ListingStore
+
+        if path.is_dir():
+            return _iter_parquet_batches(ListingStore(path).iter_batches(columns=DIFF_COLUMNS))
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in DIFF_COLUMNS if name in parquet.schema_arrow.names]
+        return _iter_parquet_batches(parquet.iter_batches(columns=columns))
+    if suffix in (".ndjson", ".jsonl"):
+        return _normalized(read_ndjson(path), platform)
+    # Legacy single-document captures have to be parsed whole.
+    return (
+        listing
+        for _, listings in load_capture(path, platform=platform)
+        for listing in listings
+    )
+
+
+def build_index(source: Source, platform: Optional[str] = None) -> Dict[str, IndexEntry]:
+    """id -> (price, fingerprint, title, url, platform) for one snapshot."""
+    index: Dict[str, IndexEntry] = {}
+    for listing in iter_snapshot(source, platform):
+        listing_id = listing.get("id")
+        if listing_id:
+            index[listing_id] = (
+                _price(listing.get("price")),
+                fingerprint(listing),
+                listing.get("title"),
+                listing.get("url"),
+                listing.get("platform"),
+            )
+    return index
+
+
+def _change(kind: str, listing_id: str, **fields: Any) -> Dict[str, Any]:
+    return dict({"change": kind, "id": listing_id}, **fields)
+
+
+def diff_snapshots(
+    old: Source,
+    new: Source,
+    platform: Optional[str] = None,
+    include_listing: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield change records for ``new`` relative to ``old``.
+
+    Changes for the new side are yielded while it streams; removals follow
+    once it is exhausted. Each record has ``change`` (one of CHANGE_TYPES),
+    ``id``, ``platform``, ``title``, ``url``; price changes add old_price,
+    new_price, price_delta and price_change_pct.
+
+    Args:
+        old, new: Snapshot sources (see iter_snapshot)
+        platform: Platform for raw listings when it cannot be detected
+        include_listing: Attach the full new-side listing as ``listing``
+    """
+    index = build_index(old, platform)
+    emitted = set()
+
+    for listing in iter_snapshot(new, platform):
+        listing_id = listing.get("id")
+        if not listing_id or listing_id in emitted:
+            continue
+        emitted.add(listing_id)
+        base = {
+            "platform": listing.get("platform"),
+            "title": listing.get("title"),
+            "url": listing.get("url"),
+        }
+        if include_listing:
+            base["listing"] = listing
+
+        previous = index.pop(listing_id, None)
+        if previous is None:
+            yield _change("added", listing_id, new_price=_price(listing.get("price")), **base)
+            continue
+
+        old_price, old_print = previous[0], previous[1]
+        new_price = _price(listing.get("price"))
+        edited = fingerprint(listing) != old_print
+        if old_price != new_price:
+            delta = round(new_price - old_price, 2) if None not in (old_price, new_price) else None
+            pct = round(100.0 * delta / old_price, 2) if delta is not None and old_price else None
+            yield _change(
+                "price_changed",
+                listing_id,
+                old_price=old_price,
+                new_price=new_price,
+                price_delta=delta,
+                price_change_pct=pct,
+                edited=edited,
+                **base,
+            )
+        elif edited:
+            yield _change("edited", listing_id, new_price=new_price, **base)
+
+    for listing_id, (old_price, _, title, url, listing_platform) in index.items():
+        yield _change("removed", listing_id, platform=listing_platform, title=title, url=url, old_price=old_price)
+
+
+def summarize(changes: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {kind: 0 for kind in CHANGE_TYPES}
+    for change in changes:
+        counts[change["change"]] += 1
+    return counts
+
+
+def filter_changes(
+    changes: Iterable[Dict[str, Any]],
+    only: Optional[Sequence[str]] = None,
+    min_drop_pct: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Keep change types in ``only``; with ``min_drop_pct`` keep only price drops at least that big."""
+    for change in changes:
+        if only and change["change"] not in only:
+            continue
+        if min_drop_pct is not None:
+            pct = change.get("price_change_pct")
+            if change["change"] != "price_changed" or pct is None or -pct < min_drop_pct:
+                continue
+        yield change
@@ -0,0 +1,226 @@
+"""
+In-memory spatial index over listing coordinates.
+
+Listings are bucketed into a multi-level geohash grid as they arrive, so
+"what's within 5 miles of X" only looks at a handful of nearby cells instead of
+every listing collected in the session.
+
+Supports:
+- Radius queries around arbitrary points
+- Bounding-box queries
+- k-nearest queries (expanding search radius)
+- Per-cell counts at any geohash precision for density overviews
+
+Usage:
+    from spatial_index import SpatialIndex
+
+    index = SpatialIndex()
+    index.insert_many(listings)                   # dicts or Ad objects with latitude/longitude
+    index.within_radius((39.78, -74.99), 5)       # -> [(distance_miles, item), ...]
+    index.nearest((39.95, -75.16), k=10)
+    index.cell_counts(precision=5)
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import math
+import threading
+
+Coords = Tuple[float, float]
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 6) -> str:
+    """Standard base32 geohash of a coordinate."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) of a geohash cell in degrees."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def haversine_miles(a: Coords, b: Coords) -> float:
+    phi1, phi2 = math.radians(a[0]), math.radians(b[0])
+    dphi = phi2 - phi1
+    dlmb = math.radians(b[1] - a[1])
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(min(1.0, h)))
+
+
+def _listing_coords(listing: Any) -> Optional[Coords]:
+    if isinstance(listing, dict):
+        lat, lon = listing.get("latitude"), listing.get("longitude")
+    else:
+        lat, lon = getattr(listing, "latitude", None), getattr(listing, "longitude", None)
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
+def _listing_id(listing: Any) -> Hashable:
+    if isinstance(listing, dict):
+        for key in ("id", "d_pid", "listingId", "url"):
+            if listing.get(key) is not None:
+                return listing[key]
+    else:
+        for key in ("d_pid", "url"):
+            value = getattr(listing, key, None)
+            if value is not None:
+                return value
+    return id(listing)
+
+
+class SpatialIndex:
+    def __init__(self, precision: int = 7) -> None:
+        """Multi-level geohash index.
+
+        Args:
+            precision: Finest geohash level kept (7 ≈ 150 m cells)
+        """
+        self.precision = precision
+        self._points: Dict[Hashable, Tuple[Coords, Any, str]] = {}
+        # One prefix -> ids map per level so coarse queries don't enumerate fine cells.
+        self._levels: List[Dict[str, Set[Hashable]]] = [dict() for _ in range(precision + 1)]
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._points
+
+    # ---------------------------------------------------------- maintenance
+    def insert(self, item_id: Hashable, lat: float, lon: float, item: Any = None) -> None:
+        """Add or move an item."""
+        code = geohash_encode(lat, lon, self.precision)
+        with self._lock:
+            if item_id in self._points:
+                self._unlink(item_id)
+            self._points[item_id] = ((lat, lon), item, code)
+            for level in range(1, self.precision + 1):
+                self._levels[level].setdefault(code[:level], set()).add(item_id)
+
+    def insert_listing(self, listing: Any, item_id: Optional[Hashable] = None) -> bool:
+        """Index a listing dict or Ad; returns False when it has no coordinates."""
+        coords = _listing_coords(listing)
+        if coords is None:
+            return False
+        self.insert(item_id if item_id is not None else _listing_id(listing), coords[0], coords[1], listing)
+        return True
+
+    def insert_many(self, listings: Iterable[Any]) -> int:
+        return sum(1 for listing in listings if self.insert_listing(listing))
+
+    def remove(self, item_id: Hashable) -> bool:
+        with self._lock:
+            if item_id not in self._points:
+                return False
+            self._unlink(item_id)
+            del self._points[item_id]
+            return True
+
+    def _unlink(self, item_id: Hashable) -> None:
+        code = self._points[item_id][2]
+        for level in range(1, self.precision + 1):
+            bucket = self._levels[level].get(code[:level])
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._levels[level][code[:level]]
+
+    # -------------------------------------------------------------- queries
+    def _level_for_span(self, lat_span: float, lon_span: float) -> int:
+        """Finest level whose cells still cover the span with a small grid."""
+        for level in range(self.precision, 0, -1):
+            height, width = geohash_cell_size(level)
+            if lat_span / height <= 8 and lon_span / width <= 8:
+                return level
+        return 1
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> Set[Hashable]:
+        level = self._level_for_span(north - south, east - west)
+        height, width = geohash_cell_size(level)
+        cells = self._levels[level]
+        found: Set[Hashable] = set()
+        lat = south
+        while lat <= north + height:
+            lon = west
+            while lon <= east + width:
+                bucket = cells.get(geohash_encode(min(lat, 89.999999), min(lon, 179.999999), level))
+                if bucket:
+                    found.update(bucket)
+                lon += width
+            lat += height
+        return found
+
+    def within_bbox(self, south: float, west: float, north: float, east: float) -> List[Any]:
+        """Items whose coordinates fall inside the box."""
+        with self._lock:
+            result = []
+            for item_id in self._candidates(south, west, north, east):
+                (lat, lon), item, _ = self._points[item_id]
+                if south <= lat <= north and west <= lon <= east:
+                    result.append(item if item is not None else item_id)
+            return result
+
+    def within_radius(self, center: Coords, radius_miles: float) -> List[Tuple[float, Any]]:
+        """(distance_miles, item) pairs within ``radius_miles``, nearest first."""
+        lat_delta = radius_miles / MILES_PER_DEGREE_LAT
+        lon_delta = radius_miles / (MILES_PER_DEGREE_LAT * max(0.01, math.cos(math.radians(center[0]))))
+        with self._lock:
+            result = []
+            for item_id in self._candidates(
+                center[0] - lat_delta, center[1] - lon_delta, center[0] + lat_delta, center[1] + lon_delta
+            ):
+                coords, item, _ = self._points[item_id]
+                distance = haversine_miles(center, coords)
+                if distance <= radius_miles:
+                    result.append((distance, item if item is not None else item_id))
+            result.sort(key=lambda pair: pair[0])
+            return result
+
+    def nearest(self, center: Coords, k: int = 10, start_radius_miles: float = 1.0) -> List[Tuple[float, Any]]:
+        """The ``k`` closest items, found by doubling the search radius."""
+        with self._lock:
+            if not self._points:
+                return []
+            radius = start_radius_miles
+            while True:
+                hits = self.within_radius(center, radius)
+                if len(hits) >= k or len(hits) == len(self._points) or radius > 2 * math.pi * EARTH_RADIUS_MILES:
+                    return hits[:k]
+                radius *= 2
+
+    def cell_counts(self, precision: int = 5) -> Dict[str, int]:
+        """Listing count per geohash cell at ``precision`` (for density overviews)."""
+        precision = max(1, min(precision, self.precision))
+        with self._lock:
+            return {cell: len(ids) for cell, ids in self._levels[precision].items()}
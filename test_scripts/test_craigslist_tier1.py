@@ -6,6 +6,7 @@ Tests CraigslistScraper with multiple queries, categories, and locations
 
 import sys
 import json
+import argparse
 from pathlib import Path
 
 # Add patched CraigslistScraper to path (handles missing prices & advanced filters)
@@ -15,6 +16,90 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'craigslist-tools' / 'Crai
 from search import fetch_search, Search
 CRAIGSLIST_CONDITION_CODES = getattr(Search, "CONDITION_MAP", {})
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from ndjson_sink import NDJSONSink
+import serialization
+from normalizer import normalize_listing
+
+arg_parser = argparse.ArgumentParser(description=__doc__)
+arg_parser.add_argument(
+    "--ndjson",
+    help="Also stream each normalized listing to this NDJSON file as it is found ('-' for stdout; the report then goes to stderr)",
+)
+arg_parser.add_argument(
+    "--job",
+    help="Checkpoint each fetched results page under this job name; rerun with the same name to resume",
+)
+arg_parser.add_argument("--db", help="Listing database for --job checkpoints (default: MARKETPLACE_DB)")
+arg_parser.add_argument("--pages", type=int, default=1, help="Results pages to fetch per search (default: 1)")
+arg_parser.add_argument(
+    "--max-attempts", type=int, default=3, help="Attempts per page before --job gives up on it (default: 3)"
+)
+cli_args, _ = arg_parser.parse_known_args()
+ndjson_sink = NDJSONSink(cli_args.ndjson) if cli_args.ndjson else None
+if cli_args.ndjson == "-":
+    # The sink already holds the real stdout; keep the report off the NDJSON stream.
+    sys.stdout = sys.stderr
+
+# Craigslist result offset parameter and its page size (as in watch.py).
+PAGE_PARAM = "s"
+PAGE_SIZE = 120
+
+job = None
+if cli_args.job:
+    from batch_jobs import BatchJob
+    from listing_db import ListingDB
+
+    job = BatchJob(cli_args.job, db=ListingDB(cli_args.db), kind="tier1")
+    done_pages = job.status()["done"]
+    if done_pages:
+        print(f"Resuming job {cli_args.job}: {done_pages} pages already fetched")
+
+
+def fetch_page(config, page):
+    """Fetch one results page of a test search; raises on a non-200 response so it is retried."""
+    extra_params = dict(config.get('extra_params') or {})
+    if page:
+        extra_params[PAGE_PARAM] = page * PAGE_SIZE
+    search = fetch_search(
+        query=config['query'],
+        city=config['city'],
+        category=config['category'],
+        postal=config.get('postal'),
+        search_distance=config.get('search_distance'),
+        min_price=config.get('min_price'),
+        max_price=config.get('max_price'),
+        conditions=config.get('conditions'),
+        extra_params=extra_params or None
+    )
+    status_code = search.request.status_code
+    if status_code != 200:
+        raise RuntimeError(f"HTTP {status_code} for {search.url}")
+    return {"url": search.url, "listings": search.to_dict()['ads']}
+
+
+def run_page(config, page):
+    """
+    One results page, through the job's checkpoint (retried with backoff, skipped
+    if already fetched) when --job is set.
+
+    Returns:
+        (page dict, restored from checkpoint)
+    """
+    if job is None:
+        return fetch_page(config, page), False
+    key = f"{config['name']}#page={page}"
+    outcome = {}
+    units = [(key, (config, page))]
+    for _, result in job.run(
+        units,
+        lambda payload: fetch_page(*payload),
+        max_attempts=cli_args.max_attempts,
+        on_result=lambda _key, _result, resumed: outcome.setdefault("resumed", resumed),
+    ):
+        return result, outcome["resumed"]
+    raise RuntimeError(f"{key} failed {job.attempts(key)} times; giving up (see job status)")
+
 print("=" * 70)
 print("CRAIGSLIST TIER 1 TEST - SEARCH RESULTS VALIDATION")
 print("=" * 70)
@@ -121,42 +206,49 @@ for i, config in enumerate(test_configs, 1):
         print(f"Extra params: {config['extra_params']}")
 
     try:
-        # Perform search
+        # Perform search, one results page (and one checkpoint) at a time
         print(f"\n[1/2] Executing search...")
-        search = fetch_search(
-            query=config['query'],
-            city=config['city'],
-            category=config['category'],
-            postal=config.get('postal'),
-            search_distance=config.get('search_distance'),
-            min_price=config.get('min_price'),
-            max_price=config.get('max_price'),
-            conditions=config.get('conditions'),
-            extra_params=config.get('extra_params')
-        )
+        listings = []
+        seen_urls = set()
+        search_url = None
+        for page in range(max(1, cli_args.pages)):
+            page_result, resumed = run_page(config, page)
+            search_url = search_url or page_result['url']
+            fresh = [ad for ad in page_result['listings'] if ad.get('url') not in seen_urls]
+            if resumed:
+                print(f"✓ Restored page {page + 1} ({len(fresh)} listings) from checkpoint")
+            if not fresh:
+                break  # Past the last page, or the offset was ignored
+            seen_urls.update(ad.get('url') for ad in fresh)
+            listings.extend(fresh)
 
         # Extract results
-        results_count = len(search.ads)
+        results_count = len(listings)
         print(f"✓ Found {results_count} listings")
 
+        if ndjson_sink is not None:
+            for ad in listings:
+                listing = normalize_listing("craigslist", ad)
+                listing["search"] = config['name']
+                ndjson_sink.write(listing)
+
         # Display sample results
         if results_count > 0:
             print(f"\n[2/2] Sample listings:")
-            for j, ad in enumerate(search.ads[:3], 1):
+            for j, ad in enumerate(listings[:3], 1):
                 print(f"\n  Listing {j}:")
-                print(f"    Title: {ad.title[:60]}...")
-                if getattr(ad, 'posted_hours_ago', None) is not None:
-                    print(f"    Posted: {ad.posted_hours_ago}h ago (raw: {ad.posted_label})")
-                elif getattr(ad, 'posted_date', None):
-                    print(f"    Posted: {ad.posted_date} (raw: {ad.posted_label})")
-                print(f"    Price: ${ad.price}" if ad.price else "    Price: Not listed")
-                print(f"    URL: {ad.url}")
+                print(f"    Title: {(ad.get('title') or '')[:60]}...")
+                if ad.get('posted_hours_ago') is not None:
+                    print(f"    Posted: {ad['posted_hours_ago']}h ago (raw: {ad.get('posted_label')})")
+                elif ad.get('posted_date'):
+                    print(f"    Posted: {ad['posted_date']} (raw: {ad.get('posted_label')})")
+                print(f"    Price: ${ad['price']}" if ad.get('price') else "    Price: Not listed")
+                print(f"    URL: {ad.get('url')}")
 
             if results_count > 3:
                 print(f"\n  ... and {results_count - 3} more listings")
 
         # Store full results
-        search_dict = search.to_dict()
         all_results.append({
             "test_name": config['name'],
             "query": config['query'],
@@ -169,8 +261,8 @@ for i, config in enumerate(test_configs, 1):
             "conditions": config.get('conditions'),
             "extra_params": config.get('extra_params'),
             "results_count": results_count,
-            "url": search.url,
-            "listings": search_dict['ads']
+            "url": search_url,
+            "listings": listings
         })
 
         # Validation
@@ -199,10 +291,12 @@ for i, config in enumerate(test_configs, 1):
             "error": str(e)
         })
 
+if ndjson_sink is not None:
+    ndjson_sink.close({"tests": test_summary})
+
 # Save all results
 output_file = Path(__file__).parent.parent / 'craigslist_tier1_results.json'
-with open(output_file, 'w') as f:
-    json.dump(all_results, f, indent=2)
+serialization.dump(all_results, output_file, pretty=True, omit_defaults=False)
 
 print(f"\n{'=' * 70}")
 print("SUMMARY")
@@ -10,6 +10,10 @@ import json
 import time
 import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_engine import ListingFrame
 
 def scrape_facebook_marketplace_automated(query, location, max_price=None):
     """
@@ -164,15 +168,8 @@ def scrape_facebook_marketplace_automated(query, location, max_price=None):
 
             # Filter by max_price if specified
             if max_price:
-                filtered_results = []
-                for item in results:
-                    try:
-                        price_str = item['price'].replace('$', '').replace(',', '')
-                        if price_str.isdigit() and int(price_str) <= max_price:
-                            filtered_results.append(item)
-                    except:
-                        continue
-                results = filtered_results
+                frame = ListingFrame.from_listings(results, platform='facebook')
+                results = frame.query().where('price', '<=', max_price).rows()
 
             print(f"✓ Parsed {len(results)} listings")
 
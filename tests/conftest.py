@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+for path in (ROOT, ROOT / "craigslist_scraper_patched"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_files(tmp_path, monkeypatch):
+    """Keep route logs, ORS usage and isochrone caches out of the home directory."""
+    import distance_utils
+    import drive_time_estimator
+
+    monkeypatch.setenv("MARKETPLACE_ROUTE_LOG", str(tmp_path / "ors_routes.jsonl"))
+    monkeypatch.setenv("MARKETPLACE_ORS_USAGE_FILE", str(tmp_path / "ors_usage.json"))
+    monkeypatch.setenv("MARKETPLACE_ISOCHRONE_CACHE", str(tmp_path / "isochrones"))
+    monkeypatch.setattr(distance_utils, "_ors_scheduler", None)
+    monkeypatch.setattr(drive_time_estimator, "_default_estimator", None)
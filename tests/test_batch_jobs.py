@@ -0,0 +1,87 @@
+import json
+
+import cli
+import tier2_scheduler
+from batch_jobs import BatchJob
+from listing_db import ListingDB
+from normalizer import normalize_listing
+
+
+def test_resume_skips_done_units_and_failed_ones(tmp_path):
+    db = ListingDB(tmp_path / "jobs.db")
+    calls = []
+
+    def worker(payload):
+        calls.append(payload)
+        if payload == "b":
+            raise RuntimeError("boom")
+        return {"value": payload.upper()}
+
+    units = [("a", "a"), ("b", "b"), ("c", "c")]
+    first = dict(BatchJob("sweep", db=db).run(units, worker, max_attempts=2, backoff_seconds=0))
+    assert first == {"a": {"value": "A"}, "c": {"value": "C"}}
+    assert calls == ["a", "b", "b", "c"]
+
+    calls.clear()
+    job = BatchJob("sweep", db=db)
+    resumed = []
+    second = list(job.run(units, worker, on_result=lambda key, result, was_restored: resumed.append(was_restored)))
+    assert calls == []
+    assert [key for key, _ in second] == ["a", "c"]
+    assert resumed == [True, True]
+    assert job.status() == {"pending": 0, "done": 2, "failed": 1}
+    assert job.attempts("b") == 2
+
+
+def test_retry_counts_attempts_across_runs(tmp_path):
+    db = ListingDB(tmp_path / "jobs.db")
+    failures = iter([True, True, False])
+
+    def flaky(payload):
+        if next(failures):
+            raise RuntimeError("throttled")
+        return payload
+
+    assert list(BatchJob("j", db=db).run([("u", 1)], flaky, max_attempts=1)) == []
+    job = BatchJob("j", db=db)
+    assert job.status()["failed"] == 1
+    job.reset_failed()
+    assert list(job.run([("u", 1)], flaky, max_attempts=2, backoff_seconds=0)) == [("u", 1)]
+    assert job.status()["done"] == 1
+
+
+def test_details_job_checkpoints_postings_and_failures(tmp_path, monkeypatch):
+    source = tmp_path / "tier1.ndjson"
+    listings = [
+        normalize_listing("craigslist", {"url": f"https://sfbay.craigslist.org/sss/d/item/{pid}.html",
+                                         "title": f"item {pid}", "price": 10 * (i + 1)})
+        for i, pid in enumerate((7000000001, 7000000002, 7000000003))
+    ]
+    source.write_text("".join(json.dumps(listing) + "\n" for listing in listings))
+    bad = listings[1]["id"]
+    fetched = []
+
+    def fetcher(listing):
+        fetched.append(listing["id"])
+        if listing["id"] == bad:
+            raise RuntimeError("HTTP 503")
+        return dict(listing, description="details")
+
+    monkeypatch.setattr(tier2_scheduler, "DEFAULT_FETCHERS", {"craigslist": fetcher})
+    argv = [
+        "details", str(source), "--top", "3", "--job", "tier2", "--db", str(tmp_path / "jobs.db"),
+        "--max-attempts", "1", "--workers", "1", "--output", str(tmp_path / "out.ndjson"),
+    ]
+    assert cli.main(argv) == 0
+    assert sorted(fetched) == sorted(listing["id"] for listing in listings)
+    job = BatchJob("tier2", db=ListingDB(tmp_path / "jobs.db"))
+    assert job.status() == {"pending": 0, "done": 2, "failed": 1}
+    assert "HTTP 503" in job.db.conn.execute(
+        "SELECT error FROM batch_units WHERE unit_key = ?", (bad,)
+    ).fetchone()[0]
+
+    fetched.clear()
+    assert cli.main(argv) == 0
+    assert fetched == []
+    written = [json.loads(line) for line in (tmp_path / "out.ndjson").read_text().splitlines()]
+    assert sum(1 for record in written if record.get("description") == "details") == 2
@@ -0,0 +1,10 @@
+import cli
+import images
+
+
+def test_image_hashes_without_pillow_fails_before_searching(monkeypatch, capsys):
+    monkeypatch.setattr(images, "Image", None)
+    monkeypatch.setattr(cli, "default_adapters", lambda: (_ for _ in ()).throw(AssertionError("searched")))
+
+    assert cli.main(["search", "--query", "switch", "--location", "08021", "--image-hashes"]) == 2
+    assert "pip install Pillow" in capsys.readouterr().err
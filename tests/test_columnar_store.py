@@ -0,0 +1,55 @@
+from columnar_store import ListingStore, search_slug
+
+
+def listing(id, platform, price, captured_at, **extra):
+    return dict(id=id, platform=platform, title=f"item {id}", price=price, captured_at=captured_at, **extra)
+
+
+LISTINGS = [
+    listing("cl-1", "craigslist", 150, "2025-11-01T10:00:00+00:00", tier1_data={"d_pid": 1, "tags": ["a"]}),
+    listing("cl-2", "craigslist", 250, "2025-11-02T10:00:00+00:00", image_hashes=["ff00"]),
+    listing("fb-1", "facebook", 90, "2025-11-02T11:00:00+00:00", tier2_data={"seller": "x"}),
+]
+
+
+def test_partitioned_write_reads_back_with_pruning_and_projection(tmp_path):
+    store = ListingStore(tmp_path / "store")
+    assert store.read().num_rows == 0
+    assert store.write(LISTINGS, search="Nintendo Switch, <$300") == 3
+    assert store.write([listing("cl-3", "craigslist", 50, "2025-11-02T12:00:00+00:00")], search="ps5") == 1
+
+    partitions = sorted(
+        str(path.parent.relative_to(tmp_path / "store")) for path in (tmp_path / "store").rglob("*.parquet")
+    )
+    assert partitions == [
+        "platform=craigslist/capture_date=2025-11-01/search=nintendo-switch-300",
+        "platform=craigslist/capture_date=2025-11-02/search=nintendo-switch-300",
+        "platform=craigslist/capture_date=2025-11-02/search=ps5",
+        "platform=facebook/capture_date=2025-11-02/search=nintendo-switch-300",
+    ]
+
+    table = store.read(
+        columns=["id", "price"],
+        filters=[("platform", "=", "craigslist"), ("price", "<", 200)],
+    )
+    assert table.column_names == ["id", "price"]
+    assert sorted(table.to_pylist(), key=lambda row: row["id"]) == [
+        {"id": "cl-1", "price": 150.0},
+        {"id": "cl-3", "price": 50.0},
+    ]
+
+    batches = list(store.iter_batches(columns=["id"], filters=[("search", "=", search_slug("Nintendo Switch, <$300"))], batch_size=1))
+    assert sorted(row["id"] for batch in batches for row in batch.to_pylist()) == ["cl-1", "cl-2", "fb-1"]
+
+
+def test_read_listings_round_trips_json_and_list_columns(tmp_path):
+    store = ListingStore(tmp_path / "store")
+    store.write(LISTINGS, search="switch")
+    records = {record["id"]: record for record in store.read_listings()}
+
+    assert records["cl-1"]["tier1_data"] == {"d_pid": 1, "tags": ["a"]}
+    assert records["cl-1"]["capture_date"] == "2025-11-01"
+    assert records["cl-2"]["price"] == 250.0
+    assert records["cl-2"]["image_hashes"] == ["ff00"]
+    assert records["fb-1"]["tier2_data"] == {"seller": "x"} and records["fb-1"]["tier1_data"] is None
+    assert {record["search"] for record in records.values()} == {"switch"}
@@ -0,0 +1,55 @@
+import pytest
+
+from deal_scoring import DealScorer, condition_code
+
+
+@pytest.mark.parametrize("text, code", [
+    ("New", 10),
+    ("Used - Like New", 20),
+    ("like-new", 20),
+    ("Excellent condition", 30),
+    ("open box", 20),
+    ("Used", 40),
+    ("for parts only", 60),
+    ("40", 40),
+    ("Renewed", None),
+    ("newer model", None),
+    ("goodwill find", None),
+    ("", None),
+])
+def test_condition_code_matches_whole_words(text, code):
+    assert condition_code(text) == code
+
+
+def listing(pid, price, title="Nintendo Switch OLED console"):
+    return {
+        "id": f"craigslist:{pid}",
+        "url": f"https://philadelphia.craigslist.org/vgm/d/switch/{pid}.html",
+        "title": title,
+        "price": price,
+    }
+
+
+def test_scores_against_comparables_and_flags_bait_prices():
+    market = [listing(pid, price) for pid, price in enumerate([250, 260, 270, 280, 290, 300, 310])]
+    scorer = DealScorer(min_comparables=5)
+    scorer.update(market)
+
+    cheap, bait, pricey = scorer.assign([listing(100, 255), listing(101, 40), listing(102, 2000)], update=False)
+    assert cheap["market_median"] == 280.0
+    assert cheap["deal_score"] > 70 and cheap["deal_flag"] is None
+    assert bait["deal_flag"] == "scam_suspect"
+    assert pricey["deal_flag"] == "overpriced" and pricey["deal_score"] < 10
+
+
+def test_repriced_listing_replaces_its_price():
+    scorer = DealScorer(min_comparables=1)
+    scorer.update([listing(1, 100)])
+    scorer.update([listing(1, 300)])
+    assert scorer.stats(listing(2, 0))["median"] == 300.0
+
+
+def test_too_few_comparables_leaves_listing_unscored():
+    scorer = DealScorer(min_comparables=5)
+    (result,) = scorer.score([listing(1, 200)])
+    assert result["deal_score"] is None and result["comparables"] == 0
@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+
+from dedupe import (
+    Deduplicator,
+    MinHasher,
+    _UnionFind,
+    assign_clusters,
+    hamming_distance,
+    normalize_title,
+    representatives,
+    title_shingles,
+)
+
+CHERRY_HILL = (39.9348, -75.0307)
+PITTSBURGH = (40.4406, -79.9959)
+
+
+def listing(id, title, price, coords=CHERRY_HILL, **extra):
+    return dict(id=id, title=title, price=price, latitude=coords[0], longitude=coords[1], **extra)
+
+
+def test_minhash_estimates_jaccard_and_batches_match_single_signatures():
+    hasher = MinHasher(num_perm=256)
+    a = title_shingles("Nintendo Switch OLED console white")
+    b = title_shingles("Nintendo Switch OLED console black")
+    jaccard = len(a & b) / len(a | b)
+    sa, sb = hasher.signature(a), hasher.signature(b)
+    assert abs((sa == sb).mean() - jaccard) < 0.1
+
+    batch, has_signature = hasher.signatures([a, set(), b], chunk_shingles=7)
+    assert has_signature.tolist() == [True, False, True]
+    assert np.array_equal(batch[0], sa) and np.array_equal(batch[2], sb)
+    assert normalize_title("Nintendo Switch - like NEW, cash only!") == "nintendo switch new"
+
+
+def test_lsh_buckets_near_duplicate_titles_only():
+    dedupe = Deduplicator()
+    titles = [
+        "Nintendo Switch OLED with dock",
+        "nintendo switch OLED w/ dock - obo",
+        "Kitchen table and four chairs",
+        "Trek mountain bike 21 speed",
+    ]
+    signatures, has_signature = dedupe.hasher.signatures([title_shingles(t) for t in titles])
+    assert dedupe._title_candidates(signatures, has_signature) == {(0, 1)}
+
+
+def test_image_segments_catch_every_hash_within_the_hamming_limit():
+    dedupe = Deduplicator(image_hamming=6)
+    rng = random.Random(3)
+    base = rng.getrandbits(64)
+    near, far = [], []
+    for _ in range(200):
+        flipped = base
+        for bit in rng.sample(range(64), rng.randint(0, 6)):
+            flipped ^= 1 << bit
+        near.append(f"{flipped:016x}")
+        far.append(f"{rng.getrandbits(64):016x}")
+    for other in near:
+        assert hamming_distance(f"{base:016x}", other) <= 6
+        assert (0, 1) in dedupe._image_candidates([[f"{base:016x}"], [other]])
+    # Unrelated 64-bit hashes rarely share a 9-bit segment by chance.
+    hits = sum((0, 1) in dedupe._image_candidates([[f"{base:016x}"], [other]]) for other in far)
+    assert hits < len(far) // 2
+
+
+def test_union_find_keeps_lowest_index_as_root():
+    forest = _UnionFind(5)
+    forest.union(3, 4)
+    forest.union(4, 1)
+    forest.union(2, 0)
+    assert [forest.find(i) for i in range(5)] == [0, 1, 0, 1, 1]
+
+
+def test_assign_clusters_merges_cross_posts_and_keeps_distinct_listings_apart():
+    listings = [
+        listing("cl-1", "Nintendo Switch OLED with dock", 300),
+        listing("fb-1", "nintendo switch OLED w/ dock - obo", 290, description="barely used"),
+        listing("ou-1", "Nintendo Switch OLED with dock!!", 305),
+        listing("cl-2", "Nintendo Switch OLED with dock", 300, coords=PITTSBURGH),  # Too far
+        listing("cl-3", "Nintendo Switch OLED with dock", 120),  # Price too different
+        listing("cl-4", "Kitchen table and four chairs", 80),
+        listing("cl-5", "Retro game lot", 60, image_hashes=["ffff0000ffff0000"]),
+        listing("fb-5", "Retro video games lot", 60, image_hashes=["ffff0000ffff0003"]),
+    ]
+    assign_clusters(listings)
+    by_id = {item["id"]: item for item in listings}
+
+    assert {by_id[i]["cluster_id"] for i in ("cl-1", "fb-1", "ou-1")} == {"fb-1"}
+    assert by_id["fb-1"]["is_representative"] and by_id["fb-1"]["cluster_size"] == 3
+    assert by_id["cl-5"]["cluster_id"] == by_id["fb-5"]["cluster_id"] == "cl-5"
+    for lone in ("cl-2", "cl-3", "cl-4"):
+        assert by_id[lone]["cluster_id"] == lone and by_id[lone]["cluster_size"] == 1
+    assert [item["id"] for item in representatives(listings)] == ["fb-1", "cl-2", "cl-3", "cl-4", "cl-5"]
+
+
+def test_distinct_listings_stay_singletons():
+    listings = [
+        listing("a", "Nintendo Switch Lite", 150),
+        listing("b", "PlayStation 5 digital", 400),
+        listing("c", "Xbox Series X", 380),
+        listing("d", None, 20),
+    ]
+    assign_clusters(listings)
+    assert [item["cluster_size"] for item in listings] == [1, 1, 1, 1]
+    assert all(item["is_representative"] for item in listings)
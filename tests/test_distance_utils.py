@@ -0,0 +1,71 @@
+import pytest
+
+import distance_utils
+from drive_time_estimator import DriveTimeEstimator
+
+CHERRY_HILL = (39.9348, -75.0307)
+PINE_HILL = (39.7837, -74.9927)
+
+
+def test_geodesic_fallback_keeps_straight_line_and_adds_estimate():
+    straight = distance_utils.geodesic_distance_miles(CHERRY_HILL, PINE_HILL)
+    # One calibrated trip: 15 road miles in 20 minutes (45 mph).
+    estimator = DriveTimeEstimator(min_samples=1).fit([
+        {"origin": CHERRY_HILL, "destination": PINE_HILL, "distance_miles": 15.0, "duration_minutes": 20.0},
+    ])
+    metrics = distance_utils.compute_drive_metrics(
+        None, PINE_HILL, origin_coords=CHERRY_HILL, attempt_routing=False, estimator=estimator
+    )
+
+    assert metrics["fallback"] == "geodesic"
+    assert metrics["distance_miles"] == pytest.approx(straight)
+    assert metrics["duration_minutes"] is None
+    assert metrics["estimated_distance_miles"] == pytest.approx(15.0)
+    assert metrics["estimated_duration_minutes"] == pytest.approx(20.0)
+    assert metrics["estimate_confidence"] == "high"
+
+
+def test_geodesic_fallback_without_estimate_is_straight_line():
+    metrics = distance_utils.compute_drive_metrics(
+        None, PINE_HILL, origin_coords=CHERRY_HILL, attempt_routing=False, estimate_duration=False
+    )
+    assert metrics["distance_miles"] == pytest.approx(distance_utils.geodesic_distance_miles(CHERRY_HILL, PINE_HILL))
+    assert metrics["duration_minutes"] is None
+    assert "estimated_distance_miles" not in metrics
+
+
+def scheduler(tmp_path, keys=("pooled",), per_minute=2):
+    return distance_utils.ORSKeyScheduler(
+        keys=list(keys), quotas={"directions": (per_minute, 100)}, usage_path=tmp_path / "usage.json",
+        clock=lambda: 0.0, persist_interval=3600,
+    )
+
+
+def test_preferred_key_is_paced_and_cooled_down_like_pooled_keys(tmp_path):
+    pool = scheduler(tmp_path)
+    assert pool.acquire(prefer="mine") == "mine"
+    assert pool.acquire(prefer="mine") == "mine"
+    assert pool.acquire(prefer="mine") == "pooled"  # "mine" is out of per-minute tokens
+    pool.report("mine", 429, retry_after=600)
+    assert pool.usage()[distance_utils._key_fingerprint("mine")]["directions"] == 2
+    assert pool.acquire(prefer="mine", exclude={"pooled"}) is None
+
+
+def test_explicit_key_still_uses_local_router(monkeypatch):
+    class Router:
+        def route(self, origin, destination):
+            return {"distance_miles": 1.0, "distance_km": 1.6, "duration_minutes": 2.0}
+
+    monkeypatch.setattr(distance_utils, "get_local_router", lambda: Router())
+    monkeypatch.setattr(distance_utils.requests, "post", lambda *a, **k: pytest.fail("ORS called"))
+    metrics = distance_utils.ors_drive_metrics(CHERRY_HILL, PINE_HILL, api_key="mine")
+    assert metrics["backend"] == "local"
+
+
+def test_one_exit_hook_flushes_every_scheduler(tmp_path):
+    first, second = scheduler(tmp_path / "a"), scheduler(tmp_path / "b")
+    first.acquire()
+    second.acquire()
+    assert not (tmp_path / "a" / "usage.json").exists()
+    distance_utils._flush_schedulers()
+    assert (tmp_path / "a" / "usage.json").exists() and (tmp_path / "b" / "usage.json").exists()
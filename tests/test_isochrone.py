@@ -0,0 +1,84 @@
+import requests
+
+import isochrone
+from isochrone import BORDERLINE, INSIDE, OUTSIDE, IsochroneFilter
+
+ORIGIN = (39.80, -75.00)
+# A ~0.2 degree square around the origin, as ORS serves it: [(lon, lat), ...].
+SQUARE = [[(-75.1, 39.7), (-74.9, 39.7), (-74.9, 39.9), (-75.1, 39.9), (-75.1, 39.7)]]
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, endpoint, exclude=(), prefer=None):
+        self.acquired += 1
+        return None if "key" in exclude else "key"
+
+    def report(self, key, status, retry_after=None):
+        pass
+
+
+def test_classify_against_fixed_polygon():
+    iso = IsochroneFilter(ORIGIN, minutes=20, margin_miles=1.0, rings=SQUARE)
+    states = iso.classify([(39.80, -75.00), (40.50, -75.00), (39.899, -75.00), None])
+    assert states.tolist() == [INSIDE, OUTSIDE, BORDERLINE, OUTSIDE]
+
+
+def test_within_without_refinement_keeps_borderline(monkeypatch):
+    monkeypatch.setattr(isochrone, "ors_drive_metrics", lambda *a, **k: 1 / 0)
+    iso = IsochroneFilter(ORIGIN, minutes=20, rings=SQUARE, refine_borderline=False)
+    assert iso.within([(39.80, -75.00), (39.899, -75.00), (40.50, -75.00)]) == [True, True, False]
+
+
+def test_failed_fetch_is_cached_and_fallback_routing_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setenv("MARKETPLACE_ISOCHRONE_CACHE", str(tmp_path))
+    monkeypatch.setattr(isochrone, "_failures", {})
+    monkeypatch.setattr(isochrone, "_memory_cache", {})
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(isochrone, "get_ors_scheduler", lambda: scheduler)
+    posts = []
+
+    def failing_post(*args, **kwargs):
+        posts.append(args)
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(isochrone.requests, "post", failing_post)
+    routed = []
+    monkeypatch.setattr(
+        isochrone, "ors_drive_metrics",
+        lambda origin, destination, **kwargs: routed.append(destination) or {"duration_minutes": 1.0},
+    )
+
+    iso = IsochroneFilter(ORIGIN, minutes=20, max_routed=5)
+    points = [(39.80 + i * 0.01, -75.00) for i in range(60)]
+    decisions = iso.within(points)
+    iso.within(points)
+
+    assert iso.rings is None
+    assert len(posts) == 1
+    assert len(routed) == 10
+    assert decisions[0] is True and decisions[-1] is False  # far points decided by the estimate
+
+
+def test_failure_expires(monkeypatch, tmp_path):
+    monkeypatch.setenv("MARKETPLACE_ISOCHRONE_CACHE", str(tmp_path))
+    monkeypatch.setattr(isochrone, "_failures", {})
+    monkeypatch.setattr(isochrone, "_memory_cache", {})
+    monkeypatch.setattr(isochrone, "get_ors_scheduler", FakeScheduler)
+    monkeypatch.setattr(isochrone.requests, "post", lambda *a, **k: (_ for _ in ()).throw(requests.Timeout()))
+    assert isochrone.fetch_isochrone(ORIGIN, 15) is None
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"features": [{"geometry": {"type": "Polygon", "coordinates": SQUARE}}]}
+
+    monkeypatch.setattr(isochrone.requests, "post", lambda *a, **k: Response())
+    assert isochrone.fetch_isochrone(ORIGIN, 15) is None  # still inside the retry window
+    key = isochrone._cache_key(ORIGIN, 15, "driving-car")
+    isochrone._failures[key] = 0.0
+    assert isochrone.fetch_isochrone(ORIGIN, 15) == [list(SQUARE[0])]
+    assert key not in isochrone._failures
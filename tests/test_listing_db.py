@@ -0,0 +1,62 @@
+import pytest
+
+from listing_db import ListingDB
+from normalizer import normalize_listing
+
+URL = "https://philadelphia.craigslist.org/vgm/d/switch/7891671290.html"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return ListingDB(tmp_path / "listings.db")
+
+
+def listing(**fields):
+    raw = dict({"url": URL, "title": "Nintendo Switch", "price": 200, "d_pid": 7891671290}, **fields)
+    return normalize_listing("craigslist", raw, captured_at="2025-11-20T10:00:00+00:00")
+
+
+def test_round_trip(db):
+    stored = listing()
+    db.upsert([stored])
+    loaded = db.get(stored["id"])
+    assert loaded["price"] == 200 and loaded["title"] == "Nintendo Switch"
+    assert db.seen("craigslist", 7891671290)
+
+
+def test_tier1_refresh_updates_price_inside_tier2_data(db):
+    detailed = listing(description="Barely used")
+    detailed["tier2_data"] = {"description": "Barely used"}
+    db.upsert([detailed], tier=2)
+    db.upsert([listing(price=150)], tier=1)
+
+    loaded = db.get(detailed["id"])
+    assert loaded["price"] == 150
+    assert loaded["tier2_data"] == {"description": "Barely used"}
+    row = db.conn.execute("SELECT price, tier FROM listings").fetchone()
+    assert (row["price"], row["tier"]) == (150, 2)
+
+
+def test_conflict_on_native_id_updates_existing_row(db):
+    db.upsert([listing()])
+    renamed = dict(listing(price=120), id="craigslist:legacy-id")
+    db.upsert([renamed])
+    rows = db.conn.execute("SELECT id, price FROM listings").fetchall()
+    assert [(row["id"], row["price"]) for row in rows] == [("craigslist:7891671290", 120)]
+
+
+def test_session_links_the_stored_row_when_ids_share_a_native_id(db):
+    db.upsert([listing()])
+    session = db.create_session("second run")
+    db.upsert([dict(listing(price=120), id="craigslist:legacy-id")], session_id=session)
+
+    linked = db.conn.execute("SELECT listing_id FROM session_listings").fetchall()
+    assert [row[0] for row in linked] == ["craigslist:7891671290"]
+    assert [(item["id"], item["price"]) for item in db.query(session_id=session)] == [
+        ("craigslist:7891671290", 120)
+    ]
+
+
+def test_full_text_search(db):
+    db.upsert([listing(title="Nintendo Switch OLED")])
+    assert [item["title"] for item in db.search("oled")] == ["Nintendo Switch OLED"]
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+import pytest
+
+from local_routing import ASTAR_MAX_TARGETS, LocalRouter, _haversine_m
+
+SPACING_DEGREES = 0.005  # ~500 m blocks
+
+
+def grid_router(size, arterial_every=10, island=False, landmarks=False):
+    """Square street grid; every ``arterial_every``-th row/column is a faster road."""
+    rows, cols = np.divmod(np.arange(size * size), size)
+    lat = 39.0 + rows * SPACING_DEGREES
+    lon = -75.0 + cols * SPACING_DEGREES
+    sources, targets, speeds = [], [], []
+    for d_row, d_col in ((0, 1), (1, 0)):
+        ok = (rows + d_row < size) & (cols + d_col < size)
+        a = np.flatnonzero(ok)
+        b = a + d_row * size + d_col
+        fast = (rows[a] % arterial_every == 0) if d_row == 0 else (cols[a] % arterial_every == 0)
+        speed = np.where(fast, 70.0, 35.0) / 3.6
+        sources += [a, b]
+        targets += [b, a]
+        speeds += [speed, speed]
+    if island:
+        # Two nodes joined to each other but not to the grid.
+        lat = np.concatenate([lat, [38.995, 38.995]])
+        lon = np.concatenate([lon, [-75.0, -75.0 + SPACING_DEGREES]])
+        n = size * size
+        sources += [np.array([n]), np.array([n + 1])]
+        targets += [np.array([n + 1]), np.array([n])]
+        speeds += [np.array([10.0]), np.array([10.0])]
+    src, dst, mps = np.concatenate(sources), np.concatenate(targets), np.concatenate(speeds)
+    meters = _haversine_m(lat[src], lon[src], lat[dst], lon[dst])
+    order = np.argsort(src, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=lat.shape[0]))])
+    router = LocalRouter(
+        node_lat=lat,
+        node_lon=lon,
+        indptr=indptr,
+        indices=dst[order].astype(np.int32),
+        seconds=(meters / mps)[order].astype(np.float32),
+        meters=meters[order].astype(np.float32),
+    )
+    if landmarks:
+        router.add_landmarks()
+    return router
+
+
+def node_coords(router, node):
+    return float(router.node_lat[node]), float(router.node_lon[node])
+
+
+@pytest.mark.parametrize("landmarks", [False, True])
+def test_astar_matches_dijkstra(landmarks):
+    router = grid_router(40, landmarks=landmarks)
+    rng = np.random.default_rng(7)
+    # More targets than ASTAR_MAX_TARGETS switches to plain Dijkstra.
+    extra = list(range(1, ASTAR_MAX_TARGETS + 1))
+    for origin, target in rng.integers(0, router.node_count, size=(10, 2)).tolist():
+        astar = router._search(origin, [target])[target]
+        dijkstra = router._search(origin, [target] + extra)[target]
+        assert astar[0] == pytest.approx(dijkstra[0], rel=1e-6)
+
+
+def test_unreachable_destination_is_not_snapped():
+    router = grid_router(20, island=True)
+    island = node_coords(router, router.node_count - 1)
+    assert not router.component[-1]
+    result = router.one_to_many(node_coords(router, 0), [island, node_coords(router, 5)])
+    assert result[1] is not None
+    # The island point snaps to the grid instead of a node it can never reach.
+    assert result[0] is not None
+
+
+def test_save_and_load_keep_component_and_landmarks(tmp_path):
+    router = grid_router(10, island=True, landmarks=True)
+    path = tmp_path / "graph.npz"
+    router.save(path)
+    loaded = LocalRouter.load(path)
+    assert np.array_equal(loaded.component, router.component)
+    assert np.array_equal(loaded.landmarks, router.landmarks)
+    assert np.array_equal(loaded.landmark_to, router.landmark_to)
+
+
+def test_regional_route_under_a_second():
+    # 250,000 intersections / ~1M directed edges, about the size of a contracted
+    # NJ/PA extract's urban core; route corner to corner (~250 km). Plain
+    # Dijkstra settles the whole graph for this route (~0.5 s); A* with
+    # landmarks settles about a thousand nodes.
+    router = grid_router(500, landmarks=True)
+    origin = node_coords(router, 0)
+    destination = node_coords(router, router.node_count - 1)
+    started = time.perf_counter()
+    result = router.route(origin, destination)
+    elapsed = time.perf_counter() - started
+    assert result is not None and result["distance_miles"] > 150
+    assert elapsed < 0.25
@@ -0,0 +1,43 @@
+import pytest
+
+from location_handler import CITY_ALIASES, CITY_TO_LOCATION, LocationIndex
+
+
+@pytest.fixture
+def index():
+    return LocationIndex(CITY_TO_LOCATION, CITY_ALIASES)
+
+
+def city(data):
+    return data["city"] if data else None
+
+
+def test_public_mapping_keeps_the_philly_key():
+    assert CITY_TO_LOCATION["philly"] is CITY_TO_LOCATION["philadelphia"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Pine Hill, NJ 08021", "Pine Hill"),
+    ("philly", "Philadelphia"),
+    ("Phila, PA", "Philadelphia"),
+    ("pinehill", "Pine Hill"),
+    ("downtown newark", "Newark"),
+])
+def test_whole_phrases_and_aliases_match(index, text, expected):
+    assert city(index.lookup(text)) == expected
+
+
+def test_fuzzy_matching_catches_small_misspellings_only(index):
+    assert city(index.lookup("philadelpia")) == "Philadelphia"
+    assert city(index.lookup("pine hil")) == "Pine Hill"
+    assert index.lookup("newarkville") is None
+    assert index.lookup("pittsburgh") is None
+    assert LocationIndex(CITY_TO_LOCATION, fuzzy_cutoff=0.99).lookup("philadelpia") is None
+
+
+def test_state_suffix_rejects_matches_in_another_state(index):
+    assert city(index.lookup("Newark, NJ")) == "Newark"
+    assert city(index.lookup("Newark New Jersey")) == "Newark"
+    assert index.lookup("Newark, DE") is None
+    assert index.lookup("Philadelphia, New York") is None
+    assert index.lookup("philadelpia, MD") is None
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from ndjson_sink import NDJSONSink, read_ndjson
+
+
+class Listing:
+    def __init__(self, id):
+        self.id = id
+
+    def to_dict(self):
+        return {"id": self.id, "platform": "offerup", "tags": ("a", "b")}
+
+
+def test_sink_round_trips_records_and_writes_a_summary(tmp_path):
+    path = tmp_path / "out.ndjson"
+    with NDJSONSink(path, flush_every=2, flush_interval=3600) as sink:
+        sink.write({"id": "cl-1", "platform": "craigslist", "price": 150.0, "tier1_data": None})
+        # The first record is flushed at once so the file can be tailed.
+        assert path.read_text().count("\n") == 1
+        sink.write({"id": "cl-2", "platform": "craigslist", "price": None})
+        sink.write(Listing("ou-1"))
+        sink.flush()
+        assert path.read_text().count("\n") == 3
+
+    records = list(read_ndjson(path))
+    assert records == [
+        {"id": "cl-1", "platform": "craigslist", "price": 150.0, "tier1_data": None},
+        {"id": "cl-2", "platform": "craigslist", "price": None},
+        {"id": "ou-1", "platform": "offerup", "tags": ["a", "b"]},
+    ]
+    summary = list(read_ndjson(path, include_summary=True))[-1]
+    assert summary["type"] == "summary" and summary["complete"]
+    assert summary["count"] == 3
+    assert summary["counts_by_platform"] == {"craigslist": 2, "offerup": 1}
+
+    with pytest.raises(ValueError):
+        sink.write({"id": "late"})
+
+
+def test_failed_run_is_marked_incomplete_and_partial_lines_are_skipped(tmp_path):
+    path = tmp_path / "out.ndjson"
+    with pytest.raises(RuntimeError):
+        with NDJSONSink(path) as sink:
+            sink.write({"id": 1})
+            raise RuntimeError("boom")
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"id": 2, "tru')
+
+    summary = list(read_ndjson(path, include_summary=True))[-1]
+    assert summary["complete"] is False and summary["error"] == "RuntimeError: boom"
+    assert list(read_ndjson(path)) == [{"id": 1}]
+
+    with NDJSONSink(path, append=True) as sink:
+        sink.write({"id": 3})
+    assert [record["id"] for record in read_ndjson(path)] == [1, 3]
+
+
+def test_sink_writes_to_an_open_stream_without_closing_it():
+    stream = io.StringIO()
+    with NDJSONSink(stream) as sink:
+        sink.write({"id": 1})
+    assert not stream.closed
+    stream.seek(0)
+    assert list(read_ndjson(stream)) == [{"id": 1}]
@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import poll_scheduler
+from poll_scheduler import PollScheduler, PostingRate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def watcher(key, host="philadelphia.craigslist.org", poll=None):
+    return SimpleNamespace(key=key, url=f"https://{host}/search/sss", poll=poll or (lambda: SimpleNamespace(new=[])))
+
+
+def scheduler(clock, **kwargs):
+    return PollScheduler(clock=clock, rng=random.Random(7), **kwargs)
+
+
+def test_posting_rate_decays_old_observations():
+    rate = PostingRate(half_life_hours=24.0, prior_per_hour=0.25, prior_hours=4.0)
+    assert rate.per_hour == pytest.approx(0.25)
+    rate.observe(10, 24.0)
+    assert rate.per_hour == pytest.approx((1 * 0.5 + 10) / (4 * 0.5 + 24))
+    rate.observe(0, 24.0)
+    assert rate.per_hour == pytest.approx(5.25 / 37)
+    rate.observe(5, 0)  # No elapsed time, nothing learned
+    assert rate.observations == 2
+
+    seeded = PostingRate()
+    seeded.observe_ages([0.5, 2.0, 3.0, 500.0, None])
+    decay = 0.5 ** (3.0 / 24.0)  # Three ages inside the horizon, spanning 3 hours
+    assert seeded.per_hour == pytest.approx((1 * decay + 3) / (4 * decay + 3.0))
+
+
+def test_interval_follows_rate_and_jitter_stays_in_bounds():
+    clock = FakeClock()
+    sched = scheduler(clock, min_interval=120.0, max_interval=6 * 3600.0, jitter=0.2)
+    search = sched.add(watcher("a"), rate=PostingRate(prior_per_hour=0.5), start_after=0)
+    assert sched.interval_for(search) == pytest.approx(2 * 3600)
+
+    search.rate = PostingRate(prior_per_hour=600.0)
+    assert sched.interval_for(search) == 120.0  # Clamped to min_interval
+    search.rate = PostingRate(prior_per_hour=0.01)
+    assert sched.interval_for(search) == 6 * 3600.0  # Clamped to max_interval
+
+    search.rate = PostingRate(prior_per_hour=0.5)
+    for _ in range(200):
+        sched._reschedule(search)
+        assert 0.8 * 7200 <= search.next_due - clock.now <= 1.2 * 7200
+    assert search.interval == pytest.approx(7200)
+
+    search.failures = 1
+    assert sched.interval_for(search) == pytest.approx(7200 * 2)
+    search.failures = 5
+    assert sched.interval_for(search) == 6 * 3600.0
+
+
+def test_per_host_cap_defers_due_searches():
+    clock = FakeClock()
+    sched = scheduler(clock, max_per_host=2)
+    for key in "abc":
+        sched.add(watcher(key), start_after=0)
+    sched.add(watcher("d", host="newyork.craigslist.org"), start_after=0)
+
+    ready, wake = sched._dispatchable(clock())
+    assert sorted(search.key for search in ready) == ["a", "b", "d"]
+    assert wake is None  # "c" waits for a completion, not a timer
+    assert sched._dispatchable(clock())[0] == []
+
+    sched._in_flight["philadelphia.craigslist.org"] -= 1
+    sched._running.discard("a")
+    assert [search.key for search in sched._dispatchable(clock())[0]] == ["c"]
+
+
+def test_run_never_exceeds_per_host_cap():
+    clock = FakeClock()
+    sched = scheduler(clock, max_per_host=2, max_workers=6)
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def poll():
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return SimpleNamespace(new=[])
+
+    for key in "abcdef":
+        sched.add(watcher(key, poll=poll), start_after=0)
+    assert sched.run(max_polls=6) == 6
+    assert active["peak"] == 2
+    assert all(search.polls == 1 for search in sched.searches)
+
+
+def test_global_token_bucket_caps_requests(monkeypatch):
+    clock = FakeClock()
+    sched = scheduler(clock, max_requests_per_minute=20)
+    assert sched.bucket.capacity == 5.0
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.advance(seconds)
+
+    monkeypatch.setattr(poll_scheduler.time, "sleep", fake_sleep)
+    started = clock()
+    for _ in range(5 + 20):
+        sched.throttle()
+    # The burst is free; the next 20 requests take one minute at 20/min.
+    assert clock() - started == pytest.approx(60.0)
+    assert all(seconds >= 0.05 for seconds in sleeps)
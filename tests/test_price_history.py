@@ -0,0 +1,53 @@
+import pytest
+
+from listing_db import ListingDB
+from price_history import PriceHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return PriceHistory(ListingDB(tmp_path / "listings.db"))
+
+
+def intervals(history, listing_id):
+    return [(row["first_seen"][:16], row["last_seen"][:16], row["price"]) for row in history.history(listing_id)]
+
+
+def test_identical_observations_compact_into_one_interval(history):
+    for day in (1, 2, 3):
+        history.record("a", 150, observed_at=f"2025-11-0{day}T09:00:00Z")
+    history.record("a", 120, observed_at="2025-11-04T09:00:00Z")
+    assert intervals(history, "a") == [
+        ("2025-11-01T09:00", "2025-11-03T09:00", 150.0),
+        ("2025-11-04T09:00", "2025-11-04T09:00", 120.0),
+    ]
+    assert history.history("a")[0]["observations"] == 3
+
+
+def test_price_drop_detected(history):
+    history.record("a", 200, observed_at="2025-11-10T09:00:00Z", platform="craigslist")
+    history.record("a", 150, observed_at="2025-11-12T09:00:00Z", platform="craigslist")
+    history.record("b", 100, observed_at="2025-11-12T09:00:00Z", platform="craigslist")
+    drops = history.price_drops(min_drop_pct=20, days=7, now="2025-11-13T00:00:00Z")
+    assert [(d["listing_id"], d["previous_price"], d["current_price"]) for d in drops] == [("a", 200.0, 150.0)]
+
+
+def test_late_observation_splits_interval(history):
+    history.record("b", 100, observed_at="2025-10-15T00:00:00Z")
+    history.record("b", 100, observed_at="2025-10-16T00:00:00Z")
+    history.record("b", 80, observed_at="2025-10-15T12:00:00Z")
+
+    assert intervals(history, "b") == [
+        ("2025-10-15T00:00", "2025-10-15T00:00", 100.0),
+        ("2025-10-15T12:00", "2025-10-15T12:00", 80.0),
+        ("2025-10-16T00:00", "2025-10-16T00:00", 100.0),
+    ]
+    assert history.latest("b")["price"] == 100.0
+    assert history.price_drops(min_drop_pct=1, days=7, now="2025-10-17T00:00:00Z") == []
+
+
+def test_late_observation_with_same_price_extends(history):
+    history.record("c", 90, observed_at="2025-10-15T00:00:00Z")
+    history.record("c", 90, observed_at="2025-10-17T00:00:00Z")
+    history.record("c", 90, observed_at="2025-10-16T00:00:00Z")
+    assert intervals(history, "c") == [("2025-10-15T00:00", "2025-10-17T00:00", 90.0)]
@@ -0,0 +1,68 @@
+import pytest
+
+from query_engine import ListingFrame
+
+
+def listing(pid, price, condition=None, title=None, latitude=None, longitude=None, site="philadelphia"):
+    return {
+        "id": f"craigslist:{pid}",
+        "platform": "craigslist",
+        "url": f"https://{site}.craigslist.org/vgm/d/item/{pid}.html",
+        "title": title,
+        "price": price,
+        "condition": condition,
+        "latitude": latitude,
+        "longitude": longitude,
+        "captured_at": "2025-11-20T09:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def frame():
+    return ListingFrame.from_listings([
+        listing(1, 180, "Good", "Nintendo Switch", 39.95, -75.16),
+        listing(2, 90, None, None, 40.71, -74.01, site="newyork"),
+        listing(3, 250, "excellent", "switch oled", 39.93, -75.03),
+        listing(4, None, "fair", "Switch lite"),
+    ])
+
+
+def ids(query):
+    return [row["id"].split(":")[1] for row in query.rows()]
+
+
+def test_filters_and_numeric_sort(frame):
+    assert ids(frame.query().where("price", "<=", 200).sort("price")) == ["2", "1"]
+    assert ids(frame.query().where("condition", "in", ["good", "excellent"]).sort("price", descending=True)) == ["3", "1"]
+    assert ids(frame.query().within(39.95, -75.16, miles=15).sort("price")) == ["1", "3"]
+    assert ids(frame.query().sort("price", descending=True)) == ["3", "1", "2", "4"]
+
+
+@pytest.mark.parametrize("field, ascending, descending", [
+    ("condition", ["3", "4", "1", "2"], ["1", "4", "3", "2"]),
+    ("title", ["1", "4", "3", "2"], ["3", "4", "1", "2"]),
+])
+def test_missing_category_and_text_values_sort_last(frame, field, ascending, descending):
+    assert ids(frame.query().sort(field)) == ascending
+    assert ids(frame.query().sort(field, descending=True)) == descending
+    assert ids(frame.query().sort(field).limit(3)) == ascending[:3]
+
+
+def test_aggregate_by_site(frame):
+    groups = frame.query().aggregate("site", ["count", "price:median"])
+    assert groups[0] == {"site": "philadelphia", "count": 3, "price:median": 215.0}
+
+
+def test_timestamps_apply_utc_offsets_for_strings_and_datetimes():
+    from datetime import datetime, timedelta, timezone
+
+    captures = ["2025-11-20T09:00:00+00:00", "2025-11-20T06:00:00-05:00", "2025-11-20T10:30:00Z", "2025-11-20T08:00:00"]
+    rows = [dict(listing(pid, 100), captured_at=captured) for pid, captured in enumerate(captures, 1)]
+    frame = ListingFrame.from_listings(rows)
+
+    # 06:00-05:00 is 11:00 UTC, the latest of the four.
+    assert ids(frame.query().sort("captured_at")) == ["4", "1", "3", "2"]
+    assert ids(frame.query().where("captured_at", ">=", "2025-11-20T05:45:00-05:00")) == ["2"]
+    eastern = datetime(2025, 11, 20, 5, 45, tzinfo=timezone(timedelta(hours=-5)))
+    assert ids(frame.query().where("captured_at", ">=", eastern)) == ["2"]
+    assert ids(frame.query().where("captured_at", ">=", datetime(2025, 11, 20, 10, 30))) == ["2", "3"]
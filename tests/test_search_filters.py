@@ -0,0 +1,151 @@
+import asyncio
+
+from aggregator import MarketplaceAggregator, PlatformAdapter, SearchQuery, _matches_filters
+from search import SearchFilters, SearchParser
+
+CHERRY_HILL = (39.9348, -75.0307)
+NEW_YORK = (40.7128, -74.0060)
+
+
+def card(pid, title, price, label="2h ago", location="cherry hill"):
+    return (
+        '<li class="cl-static-search-result">'
+        f'<a href="https://philadelphia.craigslist.org/vgm/d/item/{pid}.html">'
+        f'<div class="title">{title}</div><div class="price">${price}</div>'
+        f'<div class="meta">{label}<span>{location}</span></div></a></li>'
+    )
+
+
+PAGE = "<ol>" + "".join([
+    card(1, "Nintendo Switch", 180),
+    card(2, "Nintendo Switch broken", 40),
+    card(3, "Nintendo Switch OLED", 900),
+    card(4, "Nintendo Switch Lite", 120, label="3d ago"),
+    card(5, "Nintendo Switch bundle", 200, location="manhattan"),
+]) + "</ol>"
+
+GEO_CACHE = {"cherry hill": (CHERRY_HILL, "geocode"), "manhattan": (NEW_YORK, "geocode")}
+
+
+def parse(filters):
+    parser = SearchParser(PAGE, geo_cache=dict(GEO_CACHE), filters=filters)
+    return parser, [ad.d_pid for ad in parser.ads]
+
+
+def test_no_filters_keeps_every_card():
+    _, pids = parse(None)
+    assert pids == [1, 2, 3, 4, 5]
+
+
+def test_filters_drop_cards_before_ads_are_built():
+    filters = SearchFilters(
+        max_price=500,
+        max_hours_old=24,
+        max_distance_miles=25,
+        exclude_terms=["broken"],
+        origin_coords=CHERRY_HILL,
+    )
+    parser, pids = parse(filters)
+    assert pids == [1]
+    assert parser.rejected == {"title": 1, "price": 1, "age": 1, "distance": 1}
+
+
+def test_site_centroids_do_not_decide_distance():
+    # Without network geocoding an unknown neighborhood falls back to the site
+    # centroid (New York here); that says nothing about the card itself.
+    page = "<ol>" + card(7, "Nintendo Switch", 150, location="somewhere in jersey") + "</ol>"
+    filters = SearchFilters(max_distance_miles=25, origin_coords=CHERRY_HILL)
+    parser = SearchParser(page, geo_cache={}, site_code="newyork", filters=filters)
+    assert [ad.d_pid for ad in parser.ads] == [7]
+    assert parser.rejected["distance"] == 0
+
+    strict = SearchFilters(max_distance_miles=25, origin_coords=CHERRY_HILL, keep_unknown=False)
+    assert SearchParser(page, geo_cache={}, site_code="newyork", filters=strict).ads == []
+
+
+def test_unknown_values_follow_keep_unknown():
+    assert SearchFilters(max_hours_old=1).accepts_age(None)
+    assert not SearchFilters(max_hours_old=1, keep_unknown=False).accepts_age(None)
+    assert not SearchFilters(include_terms=["oled"]).accepts_title("Nintendo Switch")
+
+
+def test_matches_filters_uses_straight_line_distance():
+    query = SearchQuery("switch", "08021", max_distance_miles=25)
+    near = {"title": "Switch", "latitude": CHERRY_HILL[0], "longitude": CHERRY_HILL[1], "distance_miles": 40}
+    far = {"title": "Switch", "latitude": NEW_YORK[0], "longitude": NEW_YORK[1]}
+    assert _matches_filters(near, query, CHERRY_HILL)
+    assert not _matches_filters(far, query, CHERRY_HILL)
+    assert _matches_filters({"title": "Switch"}, query, CHERRY_HILL)
+
+
+class FakeAdapter(PlatformAdapter):
+    def __init__(self, name, items, filters_cards):
+        super().__init__()
+        self.name = name
+        self.items = items
+        self.filters_cards = filters_cards
+
+    def units(self, query, params):
+        return [lambda: self.items]
+
+
+def test_aggregator_skips_filters_for_platforms_that_parse_with_them():
+    raw = {"title": "Switch broken", "price": "$50", "url": "https://example.org/1"}
+    query = SearchQuery("switch", "08021", exclude_terms=["broken"])
+    adapters = {
+        "craigslist": FakeAdapter("craigslist", [dict(raw, url="https://x.craigslist.org/a/1.html")], True),
+        "facebook": FakeAdapter("facebook", [raw], False),
+    }
+
+    async def collect():
+        aggregator = MarketplaceAggregator(adapters)
+        return [listing async for listing in aggregator.stream(query)]
+
+    platforms = [listing["platform"] for listing in asyncio.run(collect())]
+    assert platforms == ["craigslist"]
+
+
+def test_ads_with_pending_enrichment_pickle_and_copy():
+    import copy
+    import pickle
+
+    parser = SearchParser(PAGE, origin_coords=CHERRY_HILL, geo_cache=dict(GEO_CACHE))
+    ad = parser.ads[0]
+    assert ad.enrichment_pending
+
+    for clone in (pickle.loads(pickle.dumps(ad)), copy.deepcopy(ad)):
+        assert not clone.enrichment_pending
+        assert (clone.url, clone.price, clone.title) == (ad.url, ad.price, ad.title)
+    assert ad.enrichment_pending
+
+
+def test_origin_resolves_while_adapters_fetch(monkeypatch):
+    import threading
+
+    import aggregator
+
+    fetching = threading.Event()
+    seen = {}
+
+    def slow_origin(query):
+        seen["adapter_started_first"] = fetching.wait(timeout=5)
+        return CHERRY_HILL
+
+    class SignallingAdapter(FakeAdapter):
+        def units(self, query, params):
+            def unit():
+                fetching.set()
+                return self.items
+            return [unit]
+
+    monkeypatch.setattr(aggregator, "_origin_coords", slow_origin)
+    near = {"title": "Switch", "url": "https://example.org/1", "latitude": CHERRY_HILL[0], "longitude": CHERRY_HILL[1]}
+    far = {"title": "Switch", "url": "https://example.org/2", "latitude": NEW_YORK[0], "longitude": NEW_YORK[1]}
+    query = SearchQuery("switch", "08021", max_distance_miles=25)
+
+    async def collect():
+        aggregator_ = MarketplaceAggregator({"facebook": SignallingAdapter("facebook", [near, far], False)})
+        return [listing async for listing in aggregator_.stream(query)]
+
+    assert [listing["url"] for listing in asyncio.run(collect())] == ["https://example.org/1"]
+    assert seen["adapter_started_first"]
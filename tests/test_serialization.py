@@ -0,0 +1,84 @@
+import serialization
+from normalizer import normalize_listing
+
+AD = {
+    "url": "https://philadelphia.craigslist.org/vgm/d/switch/7891671290.html",
+    "price": 180,
+    "title": "Nintendo Switch",
+    "d_pid": "7891671290",
+    "description": None,
+    "image_urls": None,
+    "attributes": None,
+    "posted_at": None,
+    "updated_at": None,
+    "posted_label": "2h ago",
+    "posted_hours_ago": 2.0,
+    "posted_date": None,
+    "location": "Cherry Hill",
+    "latitude": None,
+    "longitude": None,
+    "drive_distance_miles": None,
+    "drive_duration_minutes": None,
+    "image_hashes": None,
+}
+
+
+def test_search_document_round_trip_omits_nulls():
+    document = {"query": "switch", "url": "https://example.org", "ads": [AD]}
+    data = serialization.dumps(document)
+    assert b"null" not in data
+    assert serialization.loads(data) == document
+
+
+def test_listing_round_trip():
+    listing = normalize_listing("craigslist", AD, captured_at="2025-11-20T10:00:00+00:00")
+    data = serialization.dumps([listing])
+    assert b'"currency"' not in data
+    assert serialization.loads(data) == [listing]
+
+
+def test_top_level_ad_round_trip():
+    assert serialization.loads(serialization.dumps(AD)) == AD
+
+
+def test_non_record_documents_pass_through():
+    documents = [
+        {"query": "x", "platforms": {}},
+        {"session": "a", "max_price": None, "title": None},
+        [{"test": "switch", "results": 0, "error": None}],
+        {"url": "https://example.org", "status": "ok"},
+        {"platform": "craigslist", "enabled": True},
+    ]
+    for document in documents:
+        assert serialization.loads(serialization.dumps(document)) == document
+
+
+def test_lossless_mode_keeps_nulls():
+    data = serialization.dumps({"ads": [AD]}, omit_defaults=False)
+    assert serialization.loads(data, expand=False) == {"ads": [AD]}
+
+
+def test_compact_arrays_are_tagged_and_others_load_as_written():
+    listing = normalize_listing("craigslist", AD, captured_at="2025-11-20T10:00:00+00:00")
+    document = {"query": "switch", "listings": [listing], "ads": [AD]}
+    data = serialization.dumps(document)
+    assert serialization.loads(data, expand=False)["_compacted"] == ["ads", "listings"]
+    assert serialization.loads(data) == document
+
+    # Rows that are not whole records are neither compacted nor padded on load.
+    for rows in ([{"id": "cl-1", "price": None}], [{"url": AD["url"], "price": 180}]):
+        projected = {"count": 1, "listings": rows}
+        assert serialization.loads(serialization.dumps(projected)) == projected
+        assert serialization.loads(serialization.dumps(projected, pretty=True, omit_defaults=False)) == projected
+
+
+def test_query_fields_output_loads_back_as_projected(tmp_path):
+    import cli
+
+    capture = tmp_path / "capture.json"
+    listing = normalize_listing("craigslist", AD, captured_at="2025-11-20T10:00:00+00:00")
+    serialization.dump({"listings": [listing]}, capture)
+    output = tmp_path / "rows.json"
+    args = ["query", str(capture), "--fields", "id", "price", "--format", "json", "--output", str(output)]
+    assert cli.main(args) == 0
+    assert serialization.load(output)["listings"] == [{"id": listing["id"], "price": 180}]
@@ -0,0 +1,52 @@
+import json
+
+from snapshot_diff import diff_snapshots, filter_changes, summarize
+
+
+def listing(pid, price, title="Nintendo Switch", **fields):
+    return dict({
+        "id": f"craigslist:{pid}",
+        "platform": "craigslist",
+        "url": f"https://philadelphia.craigslist.org/vgm/d/item/{pid}.html",
+        "title": title,
+        "price": price,
+        "location": "cherry hill",
+    }, **fields)
+
+
+OLD = [listing(1, 200), listing(2, 150), listing(3, 80), listing(4, 50)]
+NEW = [
+    listing(1, 200, posted_hours_ago=30),        # volatile field only
+    listing(2, 120, title="Switch + 3 games"),   # price drop and edit
+    listing(3, 80, location="pine hill"),        # edit
+    listing(5, 300),                             # added
+    listing(5, 300),                             # duplicate row
+]
+
+
+def test_diff_reports_each_kind_once():
+    changes = {change["id"]: change for change in diff_snapshots(OLD, NEW, include_listing=False)}
+    assert summarize(changes.values()) == {"added": 1, "removed": 1, "price_changed": 1, "edited": 1}
+    drop = changes["craigslist:2"]
+    assert (drop["old_price"], drop["new_price"], drop["price_delta"], drop["price_change_pct"]) == (150, 120, -30, -20.0)
+    assert drop["edited"] is True
+    assert changes["craigslist:3"]["change"] == "edited"
+    assert changes["craigslist:4"] == {
+        "change": "removed", "id": "craigslist:4", "platform": "craigslist",
+        "title": "Nintendo Switch", "url": OLD[3]["url"], "old_price": 50,
+    }
+    assert "craigslist:1" not in changes
+
+
+def test_filter_changes_by_kind_and_drop():
+    changes = list(diff_snapshots(OLD, NEW, include_listing=False))
+    assert [c["id"] for c in filter_changes(changes, only=["added"])] == ["craigslist:5"]
+    assert [c["id"] for c in filter_changes(changes, min_drop_pct=15)] == ["craigslist:2"]
+    assert list(filter_changes(changes, min_drop_pct=25)) == []
+
+
+def test_diff_reads_ndjson_files(tmp_path):
+    old, new = tmp_path / "old.ndjson", tmp_path / "new.ndjson"
+    old.write_text("".join(json.dumps(item) + "\n" for item in OLD))
+    new.write_text("".join(json.dumps(item) + "\n" for item in NEW))
+    assert summarize(diff_snapshots(old, new)) == summarize(diff_snapshots(OLD, NEW))
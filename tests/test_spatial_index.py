@@ -0,0 +1,98 @@
+import asyncio
+import random
+
+import pytest
+
+from aggregator import MarketplaceAggregator, PlatformAdapter, SearchQuery
+from spatial_index import SpatialIndex, geohash_encode, haversine_miles
+
+CENTER = (39.85, -75.05)
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(7)
+    return [
+        {"id": f"p{i}", "latitude": CENTER[0] + rng.uniform(-0.6, 0.6), "longitude": CENTER[1] + rng.uniform(-0.8, 0.8)}
+        for i in range(2000)
+    ]
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    index = SpatialIndex()
+    assert index.insert_many(points + [{"id": "no-coords"}]) == len(points)
+    return index
+
+
+def coords(point):
+    return point["latitude"], point["longitude"]
+
+
+@pytest.mark.parametrize("radius", [0.5, 3, 12, 40])
+def test_radius_matches_brute_force(index, points, radius):
+    expected = sorted(
+        (haversine_miles(CENTER, coords(p)), p["id"]) for p in points if haversine_miles(CENTER, coords(p)) <= radius
+    )
+    hits = index.within_radius(CENTER, radius)
+    assert [item["id"] for _, item in hits] == [pid for _, pid in expected]
+    assert [d for d, _ in hits] == sorted(d for d, _ in hits)
+
+
+def test_bbox_matches_brute_force(index, points):
+    box = (39.7, -75.3, 39.95, -74.9)
+    expected = {
+        p["id"] for p in points if box[0] <= p["latitude"] <= box[2] and box[1] <= p["longitude"] <= box[3]
+    }
+    assert {item["id"] for item in index.within_bbox(*box)} == expected
+
+
+def test_nearest_matches_brute_force(index, points):
+    origin = (39.9, -75.1)
+    expected = sorted(points, key=lambda p: haversine_miles(origin, coords(p)))[:15]
+    assert [item["id"] for _, item in index.nearest(origin, k=15)] == [p["id"] for p in expected]
+
+
+def test_cell_counts_match_geohash_prefixes(index, points):
+    expected = {}
+    for p in points:
+        cell = geohash_encode(p["latitude"], p["longitude"], 4)
+        expected[cell] = expected.get(cell, 0) + 1
+    assert index.cell_counts(precision=4) == expected
+    assert sum(index.cell_counts(precision=6).values()) == len(points)
+
+
+def test_moving_and_removing_items():
+    index = SpatialIndex()
+    index.insert("a", *CENTER)
+    index.insert("a", 40.71, -74.01)
+    assert index.within_radius(CENTER, 5) == []
+    assert index.remove("a") and len(index) == 0 and index.cell_counts() == {}
+
+
+class CoordsAdapter(PlatformAdapter):
+    name = "facebook"
+
+    def __init__(self, items):
+        super().__init__()
+        self.items = items
+
+    def units(self, query, params):
+        return [lambda: self.items[:2], lambda: self.items[2:]]
+
+
+def test_aggregator_indexes_listings_as_they_stream():
+    items = [
+        {"title": f"Switch {i}", "price": "$100", "url": f"https://example.org/{i}",
+         "latitude": lat, "longitude": lon}
+        for i, (lat, lon) in enumerate([(39.94, -75.03), (39.78, -74.99), (40.71, -74.01), (None, None)])
+    ]
+    aggregator = MarketplaceAggregator({"facebook": CoordsAdapter(items)})
+
+    async def collect():
+        return [listing async for listing in aggregator.stream(SearchQuery("switch", "08021"))]
+
+    streamed = asyncio.run(collect())
+    assert len(streamed) == 4 and len(aggregator.index) == 3
+    nearby = [listing["url"] for _, listing in aggregator.index.within_radius((39.86, -75.0), 15)]
+    assert sorted(nearby) == ["https://example.org/0", "https://example.org/1"]
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from tier2_scheduler import Budget, Tier2Scheduler, weighted_score
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, listing):
+        with self.lock:
+            self.calls.append(listing["id"])
+        return dict(listing, description=f"details of {listing['id']}")
+
+
+def listings():
+    return [
+        {"id": f"cl-{priority}", "platform": "craigslist", "url": f"https://x.org/{priority}", "priority": priority,
+         "deal_score": None}
+        for priority in (2, 9, 5, 7)
+    ] + [{"id": "fb-1", "platform": "facebook", "url": "https://fb.example/1", "priority": 10, "deal_score": None}]
+
+
+def scheduler(fetcher, **kwargs):
+    return Tier2Scheduler(
+        score=lambda listing: listing["priority"], fetchers={"craigslist": fetcher}, max_workers=1, **kwargs
+    )
+
+
+def test_run_fetches_best_first_within_the_request_budget():
+    fetcher = FakeFetcher()
+    with scheduler(fetcher) as tier2:
+        assert tier2.submit(listings()) == ["cl-9", "cl-7", "cl-5", "cl-2"]
+        results = tier2.run(max_requests=2)
+        assert [result["id"] for result in results] == ["cl-9", "cl-7"]
+        assert fetcher.calls == ["cl-9", "cl-7"]
+        # Candidates the budget cut off stay available for a later run.
+        assert tier2.ranked() == ["cl-5", "cl-2"]
+        assert [result["id"] for result in tier2.run()] == ["cl-9", "cl-7", "cl-5", "cl-2"]
+        assert fetcher.calls == ["cl-9", "cl-7", "cl-5", "cl-2"]
+
+
+def test_fetch_returns_prefetched_results_without_a_second_request():
+    fetcher = FakeFetcher()
+    with scheduler(fetcher) as tier2:
+        tier2.submit(listings())
+        futures = tier2.prefetch(max_requests=2)
+        assert [future.result(5)["id"] for future in futures] == ["cl-9", "cl-7"]
+        assert fetcher.calls == ["cl-9", "cl-7"]
+
+        detailed = tier2.fetch(["cl-7", "cl-2", "fb-1"])
+        assert detailed[0]["description"] == "details of cl-7"
+        assert detailed[1]["id"] == "cl-2" and detailed[2] is None
+        assert fetcher.calls == ["cl-9", "cl-7", "cl-2"]
+        assert [listing["id"] for listing in tier2.fetched()] == ["cl-9", "cl-7", "cl-2"]
+
+
+def test_failed_fetches_are_retried_by_a_later_fetch():
+    attempts = []
+
+    def flaky(listing):
+        attempts.append(listing["id"])
+        if len(attempts) == 1:
+            raise RuntimeError("HTTP 503")
+        return dict(listing, status="ok")
+
+    with scheduler(flaky) as tier2:
+        tier2.submit(listings())
+        with pytest.raises(RuntimeError):
+            tier2.fetch(["cl-5"])
+        assert tier2.fetch(["cl-5"])[0]["status"] == "ok"
+        assert attempts == ["cl-5", "cl-5"]
+
+
+def test_budget_and_weighted_score():
+    budget = Budget(max_requests=2)
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+    assert budget.exhausted and budget.remaining_seconds is None
+    assert Budget(max_seconds=0).exhausted
+
+    score = weighted_score({"deal": 1.0, "distance": 1.0}, query="switch")
+    assert score({"deal_score": 80, "distance_miles": None}) == pytest.approx(0.8)
+    assert score({"deal_score": 80, "distance_miles": 15.0}) == pytest.approx((0.8 + 0.5) / 2)
+    assert score({"deal_score": 80, "deal_flag": "scam_suspect"}) == 0.0
+    with pytest.raises(ValueError):
+        weighted_score({"price": 1.0})
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import search
+import topk
+from topk import Ranker, TopK, craigslist_top_k
+
+
+class Card:
+    """Ad stand-in whose drive distance counts how often it is computed."""
+
+    routed = 0
+
+    def __init__(self, url, price, miles=None, hours=None):
+        self.url = url
+        self.price = price
+        self.posted_hours_ago = hours
+        self._miles = miles
+
+    @property
+    def drive_distance_miles(self):
+        Card.routed += 1
+        return self._miles
+
+
+def test_keeps_k_best_by_price():
+    heap = TopK(3, Ranker("price"))
+    for price in [50, 10, 40, 30, None, 20]:
+        heap.push({"price": price})
+    assert [item["price"] for item in heap.items()] == [10, 20, 30]
+
+
+def test_missing_rank_values_sort_last():
+    heap = TopK(2, Ranker("recency"))
+    heap.push({"id": "unknown"})
+    heap.push({"id": "old", "posted_hours_ago": 48})
+    heap.push({"id": "new", "posted_hours_ago": 1})
+    assert [item["id"] for item in heap.items()] == ["new", "old"]
+
+
+def test_straight_line_floor_skips_enrichment():
+    Card.routed = 0
+    heap = TopK(2, Ranker("distance"))
+    cards = [(Card("a", 10, miles=3), 2), (Card("b", 10, miles=5), 4), (Card("c", 10, miles=40), 30)]
+    for card, straight in cards:
+        heap.push(card, straight)
+    assert [card.url for card in heap.items()] == ["a", "b"]
+    assert heap.skipped == 1
+    assert Card.routed == 2
+
+
+def test_composite_lower_bound_never_exceeds_rank():
+    ranker = Ranker("score", per_mile=2.0, per_hour=0.5)
+    card = Card("a", 100, miles=12, hours=4)
+    assert ranker.lower_bound(card, straight_miles=10) == 100 + 20 + 2
+    assert ranker.lower_bound(card, straight_miles=10) <= ranker.rank(card)
+
+
+def test_craigslist_top_k_stops_paging_at_the_cut_off(monkeypatch):
+    calls = []
+    prices = list(range(1, 1201))  # ten pages in ascending price order
+
+    def fake_fetch_search(**kwargs):
+        calls.append(kwargs)
+        offset = kwargs["extra_params"].get(topk.PAGE_PARAM, 0)
+        page = prices[offset:offset + topk.PAGE_SIZE]
+        ads = [Card(f"https://x.craigslist.org/{price}.html", price) for price in page]
+        return SimpleNamespace(ads=ads, enricher=None)
+
+    monkeypatch.setattr(search, "fetch_search", fake_fetch_search)
+    result = craigslist_top_k(20, "switch", "philadelphia", by="price", origin_location="08021")
+
+    assert [ad.price for ad in result.items] == list(range(1, 21))
+    assert result.pages == 1 and result.stopped_early
+    assert calls[0]["extra_params"]["sort"] == "priceasc"
+    # Survivors keep lazy enrichment even when the ranking does not need distance.
+    assert calls[0]["compute_distances"] is True
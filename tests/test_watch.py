@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from listing_db import ListingDB
+from watch import PAGE_PARAM, PAGE_SIZE, BloomFilter, SeenStore, Watcher
+
+
+def ad(pid, price=100, title=None):
+    return SimpleNamespace(d_pid=pid, title=title or f"item {pid}", price=price, location="cherry hill")
+
+
+class FakeSite:
+    """Serves ``pages`` (lists of ads, newest first) and counts requests."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+        self.enriched = []
+
+    def fetch_search(self, extra_params=None, **kwargs):
+        page = (extra_params or {}).get(PAGE_PARAM, 0) // PAGE_SIZE
+        self.requested.append(page)
+        ads = self.pages[page] if page < len(self.pages) else []
+        return SimpleNamespace(ads=list(ads), enrich_distances=lambda ads: self.enriched.extend(ads))
+
+
+def watcher(site, db_path):
+    w = Watcher("switch", "southjersey", name="switch", store=SeenStore(ListingDB(db_path)))
+    w._fetch_search = site.fetch_search
+    return w
+
+
+def test_bloom_filter_has_no_false_negatives_and_round_trips():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for key in range(0, 2000, 2):
+        bloom.add(key)
+    assert all(key in bloom for key in range(0, 2000, 2))
+    false_positives = sum(key in bloom for key in range(1, 20000, 2))
+    assert false_positives / 10000 < 0.03
+
+    copy = BloomFilter(capacity=1000, error_rate=0.01, data=bloom.to_bytes())
+    assert all(key in copy for key in range(0, 2000, 2))
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, data=bloom.to_bytes())
+
+
+def test_first_poll_reads_until_an_empty_page(tmp_path):
+    site = FakeSite([[ad(9), ad(8)], [ad(7)]])
+    result = watcher(site, tmp_path / "w.db").poll()
+    assert [a.d_pid for a in result.new] == [9, 8, 7]
+    assert site.requested == [0, 1, 2]
+    assert [a.d_pid for a in site.enriched] == [9, 8, 7]
+
+
+def test_later_polls_stop_at_first_fully_seen_page_and_persist(tmp_path):
+    site = FakeSite([[ad(9), ad(8)], [ad(7), ad(6)]])
+    watcher(site, tmp_path / "w.db").poll()
+
+    # New process: a new post on top, one repriced post, then old pages.
+    site.pages = [[ad(10), ad(9, price=80)], [ad(8), ad(7)], [ad(6)]]
+    site.requested.clear()
+    site.enriched.clear()
+    result = watcher(site, tmp_path / "w.db").poll()
+
+    assert [a.d_pid for a in result.new] == [10]
+    assert [a.d_pid for a in result.changed] == [9]
+    assert site.requested == [0, 1]  # page 1 was all seen, so page 2 is never fetched
+    assert [a.d_pid for a in site.enriched] == [10, 9]
+
+    site.requested.clear()
+    quiet = watcher(site, tmp_path / "w.db").poll()
+    assert (quiet.new, quiet.changed, site.requested) == ([], [], [0])
+
+
+def test_poll_history_groups_new_ids_per_poll(tmp_path):
+    store = SeenStore(ListingDB(tmp_path / "w.db"))
+    bloom = store.load_bloom("k", "https://example.org")
+    store.record("k", [(1, "a"), (2, "b")], bloom)
+    batches, last_polled = store.poll_history("k")
+    assert [count for _, count in batches] == [2] and last_polled is not None
+    store.forget("k")
+    assert store.poll_history("k") == ([], None)
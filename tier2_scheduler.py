@@ -0,0 +1,409 @@
+"""
+Prioritized tier-2 (detail page) scheduler for marketplace CLI.
+
+Tier 2 used to mean picking listing indices by hand and fetching them one by
+one. The scheduler takes tier-1 results and fetches details best-first:
+  * Listings are ranked by a pluggable score: deal score / price percentile
+    (deal_scoring), distance, recency and title match quality, combined with
+    configurable weights, or any callable
+  * ``run()`` fetches in priority order until a budget of requests or seconds
+    is spent
+  * ``prefetch()`` speculatively fetches the next-most-likely candidates at
+    low priority while tier-1 output is still being reviewed; an explicit
+    ``fetch()`` jumps ahead of speculative work and returns immediately for
+    anything already prefetched. Prefetch is a library API for interactive
+    front ends; the one-shot ``details`` command has no review step to
+    overlap it with and uses run() / fetch() only
+  * Per-platform fetchers (Craigslist built in); a shared throttle such as a
+    rate_limit.TokenBucket paces every request
+
+Usage:
+    from tier2_scheduler import Tier2Scheduler
+
+    scheduler = Tier2Scheduler(query="nintendo switch", max_requests=20)
+    scheduler.submit(tier1_listings)
+    scheduler.prefetch(max_requests=10)            # background, low priority
+    details = scheduler.fetch([listing_id])        # instant if already prefetched
+    everything = scheduler.run(max_seconds=30)     # best-first within budget
+    scheduler.close()
+
+    python cli.py details results.json --top 10 --max-seconds 30
+    python cli.py details results.json --indices 1 5 12
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+import itertools
+import math
+import queue
+import sys
+import threading
+import time
+
+from dedupe import normalize_title
+from normalizer import normalize_listing
+
+_CRAIGSLIST_DIR = Path(__file__).resolve().parent / "craigslist_scraper_patched"
+
+# Work classes: explicit requests always run before speculative prefetch.
+FOREGROUND = 0
+SPECULATIVE = 1
+
+DEFAULT_WEIGHTS = {"deal": 0.5, "distance": 0.2, "recency": 0.2, "match": 0.1}
+
+Fetcher = Callable[[Dict[str, Any]], Dict[str, Any]]
+ScoreFn = Callable[[Dict[str, Any]], float]
+
+
+# --------------------------------------------------------------- scoring
+def deal_component(listing: Dict[str, Any]) -> Optional[float]:
+    """Deal score (0-100, from deal_scoring) as 0-1; scam suspects score zero."""
+    if listing.get("deal_flag") == "scam_suspect":
+        return 0.0
+    score = listing.get("deal_score")
+    return None if score is None else score / 100.0
+
+
+def distance_component(listing: Dict[str, Any], scale_miles: float = 15.0) -> Optional[float]:
+    miles = listing.get("distance_miles")
+    return None if miles is None else 1.0 / (1.0 + float(miles) / scale_miles)
+
+
+def recency_component(listing: Dict[str, Any], half_life_hours: float = 48.0) -> Optional[float]:
+    hours = listing.get("posted_hours_ago")
+    return None if hours is None else 0.5 ** (float(hours) / half_life_hours)
+
+
+def match_component(listing: Dict[str, Any], query: Optional[str]) -> Optional[float]:
+    """Share of the query's words found in the title."""
+    words = set(normalize_title(query).split())
+    if not words:
+        return None
+    title = set(normalize_title(listing.get("title")).split())
+    return len(words & title) / len(words)
+
+
+def weighted_score(
+    weights: Optional[Dict[str, float]] = None,
+    query: Optional[str] = None,
+) -> ScoreFn:
+    """
+    Score function combining deal/distance/recency/match components.
+
+    Missing components are left out and the remaining weights renormalized,
+    so a listing without a distance is not penalized for it.
+    """
+    weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+    components: Dict[str, Callable[[Dict[str, Any]], Optional[float]]] = {
+        "deal": deal_component,
+        "distance": distance_component,
+        "recency": recency_component,
+        "match": lambda listing: match_component(listing, query),
+    }
+    unknown = set(weights) - set(components)
+    if unknown:
+        raise ValueError(f"Unknown score components: {sorted(unknown)}")
+
+    def score(listing: Dict[str, Any]) -> float:
+        total = weight_sum = 0.0
+        for name, weight in weights.items():
+            value = components[name](listing)
+            if value is not None and weight:
+                total += weight * value
+                weight_sum += weight
+        return total / weight_sum if weight_sum else 0.0
+
+    return score
+
+
+# -------------------------------------------------------------- fetchers
+def fetch_craigslist_details(listing: Dict[str, Any], timeout: float = 20.0) -> Dict[str, Any]:
+    """Fetch a Craigslist ad page and merge its details into the tier-1 listing."""
+    if str(_CRAIGSLIST_DIR) not in sys.path:
+        sys.path.insert(0, str(_CRAIGSLIST_DIR))
+    from ad import Ad
+
+    ad = Ad(url=listing["url"], price=listing.get("price"), title=listing.get("title"))
+    status = ad.fetch(timeout=timeout)
+    if status in (404, 410):
+        return dict(listing, status="removed")
+    if status != 200:
+        raise RuntimeError(f"HTTP {status} for {listing['url']}")
+
+    detailed = normalize_listing("craigslist", ad.to_dict())
+    merged = dict(listing)
+    for key, value in detailed.items():
+        if value is not None and key not in ("id", "captured_at", "tier1_data"):
+            merged[key] = value
+    merged["tier2_captured_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return merged
+
+
+DEFAULT_FETCHERS: Dict[str, Fetcher] = {"craigslist": fetch_craigslist_details}
+
+
+# ---------------------------------------------------------------- budget
+class Budget:
+    def __init__(self, max_requests: Optional[int] = None, max_seconds: Optional[float] = None) -> None:
+        """Request-count and wall-clock allowance; None means unlimited."""
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.used = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.exhausted:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_requests is not None and self.used >= self.max_requests:
+            return True
+        return self.max_seconds is not None and time.monotonic() - self.started >= self.max_seconds
+
+    @property
+    def remaining_seconds(self) -> Optional[float]:
+        if self.max_seconds is None:
+            return None
+        return max(0.0, self.max_seconds - (time.monotonic() - self.started))
+
+
+# ------------------------------------------------------------- scheduler
+class Tier2Scheduler:
+    def __init__(
+        self,
+        score: Optional[ScoreFn] = None,
+        query: Optional[str] = None,
+        fetchers: Optional[Dict[str, Fetcher]] = None,
+        max_requests: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        max_workers: int = 2,
+        throttle: Optional[Callable[[], None]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        """
+        Fetch tier-2 details for tier-1 listings, best candidates first.
+
+        Args:
+            score: Priority function (higher first); default weighted_score(query=query)
+            query: Search text for the default score's match component
+            fetchers: Platform -> fetcher (default: DEFAULT_FETCHERS); listings on
+                      other platforms are skipped
+            max_requests, max_seconds: Default budget for run()
+            max_workers: Concurrent detail fetches
+            throttle: Called (and may block) before every request
+            on_result: Called with each fetched listing (from worker threads)
+        """
+        self.score = score or weighted_score(query=query)
+        self.fetchers = dict(DEFAULT_FETCHERS if fetchers is None else fetchers)
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.throttle = throttle
+        self.on_result = on_result
+
+        self.listings: Dict[str, Dict[str, Any]] = {}
+        self.priorities: Dict[str, float] = {}
+        self._futures: Dict[str, Future] = {}
+        self._queue: "queue.PriorityQueue[Tuple[int, float, int, Optional[str], Optional[Budget]]]" = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"tier2-{index}", daemon=True)
+            for index in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # ------------------------------------------------------------ ranking
+    def submit(self, listings: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Add tier-1 listings and (re)rank them.
+
+        Listings without a deal score are scored against each other with
+        deal_scoring first, so the deal component has something to use.
+
+        Returns:
+            Fetchable listing IDs, best first
+        """
+        batch = [listing for listing in listings if listing.get("id") and listing.get("url")]
+        if batch and any("deal_score" not in listing for listing in batch):
+            from deal_scoring import DealScorer
+
+            unscored = [listing for listing in batch if "deal_score" not in listing]
+            DealScorer().assign(unscored)
+        with self._lock:
+            for listing in batch:
+                self.listings[listing["id"]] = listing
+                self.priorities[listing["id"]] = self.score(listing)
+        return self.ranked()
+
+    def ranked(self) -> List[str]:
+        """IDs of listings with a fetcher that are not fetched or in flight, best first."""
+        with self._lock:
+            candidates = [
+                listing_id for listing_id, listing in self.listings.items()
+                if listing_id not in self._futures and listing.get("platform") in self.fetchers
+            ]
+            return sorted(candidates, key=lambda listing_id: -self.priorities[listing_id])
+
+    # ----------------------------------------------------------- fetching
+    def _enqueue(self, listing_id: str, work_class: int, budget: Optional[Budget]) -> Future:
+        """Queue a fetch (or promote a queued one); returns its future."""
+        with self._lock:
+            future = self._futures.get(listing_id)
+            if future is None:
+                future = self._futures[listing_id] = Future()
+            elif work_class == SPECULATIVE or future.done() or future.running():
+                return future
+            # A second, higher-priority entry; the worker skips whichever comes second.
+            self._queue.put((work_class, -self.priorities.get(listing_id, 0.0), next(self._counter), listing_id, budget))
+        return future
+
+    def _work(self) -> None:
+        while True:
+            work_class, _, _, listing_id, budget = self._queue.get()
+            if listing_id is None:
+                return
+            with self._lock:
+                future = self._futures.get(listing_id)
+                # Already running/fetched through a higher-priority entry, or cancelled.
+                if future is None or future.running() or future.done():
+                    continue
+                future.set_running_or_notify_cancel()
+            if budget is not None and not budget.try_spend():
+                # Out of budget: give the slot back so a later request can take it.
+                with self._lock:
+                    self._futures.pop(listing_id, None)
+                future.set_result(None)
+                continue
+            listing = self.listings[listing_id]
+            try:
+                if self.throttle is not None:
+                    self.throttle()
+                result = self.fetchers[listing["platform"]](listing)
+            except Exception as exc:
+                # Forget the failure so a later fetch() (e.g. a retry) goes back to the network.
+                with self._lock:
+                    self._futures.pop(listing_id, None)
+                future.set_exception(exc)
+                continue
+            with self._lock:
+                self.listings[listing_id] = result
+            future.set_result(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+    def fetch(
+        self,
+        listing_ids: Sequence[str],
+        timeout: Optional[float] = None,
+        raise_errors: bool = True,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch specific listings now (ahead of speculative work); prefetched ones return at once.
+
+        Args:
+            listing_ids: IDs of submitted listings
+            timeout: Seconds to wait for each result
+            raise_errors: Raise the first fetch error instead of returning None for it
+
+        Returns:
+            Detailed listings in request order (None for platforms without a fetcher)
+        """
+        supported = [
+            listing_id in self.listings and self.listings[listing_id].get("platform") in self.fetchers
+            for listing_id in listing_ids
+        ]
+        futures = [
+            self._enqueue(listing_id, FOREGROUND, None) if ok else None
+            for listing_id, ok in zip(listing_ids, supported)
+        ]
+        results = []
+        for listing_id, future in zip(listing_ids, futures):
+            try:
+                result = future.result(timeout) if future is not None else None
+                if future is not None and result is None:
+                    # Lost a race with a speculative entry whose budget ran out; fetch it again.
+                    result = self._enqueue(listing_id, FOREGROUND, None).result(timeout)
+            except Exception:
+                if raise_errors:
+                    raise
+                result = None
+            results.append(result)
+        return results
+
+    def prefetch(self, max_requests: Optional[int] = 10, max_seconds: Optional[float] = None) -> List[Future]:
+        """Speculatively queue the best unfetched candidates at low priority (non-blocking)."""
+        budget = Budget(max_requests, max_seconds)
+        limit = max_requests if max_requests is not None else len(self.listings)
+        return [self._enqueue(listing_id, SPECULATIVE, budget) for listing_id in self.ranked()[:limit]]
+
+    def run(
+        self,
+        max_requests: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch best-first until the budget (or the candidates) run out.
+
+        Already prefetched listings are included without spending budget.
+
+        Returns:
+            Fetched listings in priority order
+        """
+        budget = Budget(
+            max_requests if max_requests is not None else self.max_requests,
+            max_seconds if max_seconds is not None else self.max_seconds,
+        )
+        candidates = sorted(self.listings, key=lambda listing_id: -self.priorities.get(listing_id, 0.0))
+        futures = [
+            self._enqueue(listing_id, FOREGROUND, budget)
+            for listing_id in candidates
+            if self.listings[listing_id].get("platform") in self.fetchers
+        ]
+        results = []
+        for future in futures:
+            try:
+                result = future.result(budget.remaining_seconds)
+            except Exception:
+                continue
+            if result is not None:
+                results.append(result)
+        return results
+
+    def fetched(self) -> List[Dict[str, Any]]:
+        """Listings with completed detail fetches, in priority order."""
+        with self._lock:
+            done = [
+                listing_id for listing_id, future in self._futures.items()
+                if future.done() and not future.cancelled() and future.exception() is None and future.result()
+            ]
+        done.sort(key=lambda listing_id: -self.priorities.get(listing_id, 0.0))
+        return [self.listings[listing_id] for listing_id in done]
+
+    def close(self, cancel_pending: bool = True) -> None:
+        """Stop the workers; queued speculative work is cancelled by default."""
+        if self._closed:
+            return
+        self._closed = True
+        if cancel_pending:
+            with self._lock:
+                for future in self._futures.values():
+                    future.cancel()
+        for _ in self._workers:
+            self._queue.put((math.inf, 0.0, next(self._counter), None, None))
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self) -> "Tier2Scheduler":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,317 @@
+"""
+Top-K search mode for marketplace CLI.
+
+Most searches are really "the 20 cheapest / nearest / newest matching
+listings". Instead of fetching, parsing and enriching everything and sorting
+at the end, top-K mode keeps a bounded heap of the best K candidates so far
+and uses its worst entry as a cut-off:
+  * Ranking by price, distance, recency or a composite cost score
+    (price + $/mile * distance + $/hour * age)
+  * The bound is pushed down to page fetching: Craigslist is asked for results
+    in rank order (sort=priceasc / sort=date) and paging stops as soon as the
+    heap's worst entry beats everything the next page could hold
+  * Candidates are first ranked on fields the search card already has (the
+    card's straight-line distance is a floor on its drive distance); drive
+    distance (lazy enrichment) stays attached to every ad but is only computed
+    for ones that can still make the cut, or when the caller reads it
+  * One heap can be shared by several searches (e.g. each Craigslist site of a
+    metro area), so every site stops at the global cut-off
+
+Usage:
+    from topk import Ranker, TopK, craigslist_top_k
+
+    result = craigslist_top_k(20, "nintendo switch", "philadelphia", by="price")
+    for ad in result.items:
+        print(ad.price, ad.title)
+
+    best = TopK(20, Ranker("score", per_mile=2.0))
+    for listing in listings:
+        best.push(listing)
+    best.items()
+
+    python cli.py search --query "nintendo switch" --location 08021 --top-k 20 --rank-by price
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from pathlib import Path
+import heapq
+import itertools
+import math
+import sys
+import threading
+import time
+
+_CRAIGSLIST_DIR = Path(__file__).resolve().parent / "craigslist_scraper_patched"
+
+RANK_FIELDS = ("price", "distance", "recency", "score")
+
+# Craigslist result order matching each ranking; "score" pages by price, its floor.
+PUSHDOWN_SORT = {"price": "priceasc", "score": "priceasc", "recency": "date"}
+
+# Craigslist result offset parameter and its page size (as in watch.py).
+PAGE_PARAM = "s"
+PAGE_SIZE = 120
+
+
+def _value(item: Any, key: str, attribute: Optional[str] = None) -> Optional[float]:
+    """Read a field from a normalized listing dict or a Craigslist Ad."""
+    if isinstance(item, dict):
+        value = item.get(key)
+    else:
+        value = getattr(item, attribute or key, None)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class Ranker:
+    def __init__(self, by: str = "price", per_mile: float = 1.0, per_hour: float = 0.25) -> None:
+        """
+        Rank function for top-K selection (lower rank is better).
+
+        Args:
+            by: One of RANK_FIELDS
+            per_mile: Composite score dollars per mile of drive distance
+            per_hour: Composite score dollars per hour of listing age
+        """
+        if by not in RANK_FIELDS:
+            raise ValueError(f"Unknown rank field {by!r}; expected one of {RANK_FIELDS}")
+        self.by = by
+        self.per_mile = per_mile
+        self.per_hour = per_hour
+
+    @property
+    def needs_distance(self) -> bool:
+        return self.by in ("distance", "score")
+
+    def _distance(self, item: Any) -> Optional[float]:
+        return _value(item, "distance_miles", "drive_distance_miles")
+
+    def lower_bound(self, item: Any, straight_miles: Optional[float] = None) -> float:
+        """
+        Best rank ``item`` could have, from fields that cost nothing to read.
+
+        ``straight_miles`` is the straight-line distance to the item, which its
+        drive distance cannot beat; without it the distance floor is zero.
+        """
+        if self.by in ("price", "recency"):
+            return self.rank(item)
+        miles = straight_miles or 0.0
+        if self.by == "distance":
+            return miles
+        price = _value(item, "price")
+        if price is None:
+            return math.inf
+        hours = _value(item, "posted_hours_ago")
+        return price + self.per_mile * miles + self.per_hour * (hours or 0.0)
+
+    def rank(self, item: Any) -> float:
+        """Rank of ``item``; missing values rank last. May trigger drive-distance enrichment."""
+        if self.by == "price":
+            value = _value(item, "price")
+        elif self.by == "recency":
+            value = _value(item, "posted_hours_ago")
+        elif self.by == "distance":
+            value = self._distance(item)
+        else:
+            price = _value(item, "price")
+            if price is None:
+                return math.inf
+            distance = self._distance(item)
+            hours = _value(item, "posted_hours_ago")
+            value = price + self.per_mile * (distance or 0.0) + self.per_hour * (hours or 0.0)
+        return math.inf if value is None else value
+
+
+class TopK:
+    def __init__(self, k: int, ranker: Optional[Ranker] = None) -> None:
+        """Bounded max-heap of the ``k`` best-ranked items; thread-safe so searches can share one."""
+        self.k = k
+        self.ranker = ranker or Ranker()
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.pushed = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    @property
+    def bound(self) -> float:
+        """Rank a candidate has to beat (infinity until the heap is full)."""
+        with self._lock:
+            return -self._heap[0][0] if len(self._heap) >= self.k else math.inf
+
+    def push(self, item: Any, straight_miles: Optional[float] = None) -> bool:
+        """Offer ``item`` (see Ranker.lower_bound); returns True if it is (for now) among the best k."""
+        if self.k <= 0:
+            return False
+        # Cheap check first, so hopeless candidates are never enriched.
+        if self.ranker.lower_bound(item, straight_miles) >= self.bound:
+            self.skipped += 1
+            return False
+        rank = self.ranker.rank(item)
+        with self._lock:
+            self.pushed += 1
+            entry = (-rank, next(self._counter), item)
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+                return True
+            if rank < -self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+                return True
+            return False
+
+    def items(self) -> List[Any]:
+        """Kept items, best first (ties in arrival order)."""
+        with self._lock:
+            entries = sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))
+        return [entry[2] for entry in entries]
+
+
+@dataclass
+class TopKResult:
+    items: List[Any] = field(default_factory=list)
+    pages: int = 0
+    scanned: int = 0
+    stopped_early: bool = False
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "returned": len(self.items),
+            "pages": self.pages,
+            "scanned": self.scanned,
+            "stopped_early": self.stopped_early,
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+def _page_floor(ads: List[Any], by: str) -> Optional[float]:
+    """Pushed-down sort value of the last ad on a page, which later pages cannot beat."""
+    field_name = "posted_hours_ago" if by == "recency" else "price"
+    values = [_value(ad, field_name) for ad in ads]
+    values = [value for value in values if value is not None]
+    return values[-1] if values else None
+
+
+def _straight_line(search: Any) -> Optional[Callable[[Any], Optional[float]]]:
+    """Straight-line miles from the search origin to an ad's card location, if known."""
+    enricher = getattr(search, "enricher", None)
+    if enricher is None or not enricher.origin_coords:
+        return None
+    from distance_utils import geodesic_distance_miles
+
+    def miles(ad: Any) -> Optional[float]:
+        coords = enricher.locate(ad)
+        if not coords or coords[0] is None or coords[1] is None:
+            return None
+        return geodesic_distance_miles(enricher.origin_coords, coords)
+
+    return miles
+
+
+def craigslist_top_k(
+    k: int,
+    query: str,
+    city: str,
+    by: str = "price",
+    category: str = "sss",
+    postal: Optional[str] = None,
+    search_distance: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    conditions: Optional[List] = None,
+    extra_params: Optional[Dict] = None,
+    origin_location: Optional[str] = None,
+    per_mile: float = 1.0,
+    per_hour: float = 0.25,
+    max_pages: int = 10,
+    request_timeout: float = 20.0,
+    throttle: Optional[Callable[[], None]] = None,
+    filters: Any = None,
+    heap: Optional[TopK] = None,
+) -> TopKResult:
+    """
+    Best ``k`` ads of a Craigslist search, fetching only the pages that can contribute.
+
+    Args:
+        k: Number of ads wanted
+        query, city, category, postal, search_distance, min_price, max_price,
+        conditions, extra_params, origin_location: As for fetch_search(); with
+            origin_location every ad keeps lazy drive-distance enrichment
+        by: Ranking, one of RANK_FIELDS ("distance" and "score" need origin_location)
+        per_mile, per_hour: Composite score weights
+        max_pages: Hard page cap
+        request_timeout: Per-request timeout in seconds
+        throttle: Called (and may block) before every request
+        filters: search.SearchFilters applied to cards before they are ranked
+        heap: Shared TopK across several searches (default: a private one)
+
+    Returns:
+        TopKResult whose items are this search's ads still in the heap, best first
+    """
+    if str(_CRAIGSLIST_DIR) not in sys.path:
+        sys.path.insert(0, str(_CRAIGSLIST_DIR))
+    from search import fetch_search
+
+    started = time.monotonic()
+    heap = heap if heap is not None else TopK(k, Ranker(by, per_mile=per_mile, per_hour=per_hour))
+    ranker = heap.ranker
+    sort = PUSHDOWN_SORT.get(ranker.by)
+    params = dict(extra_params or {})
+    if sort:
+        params["sort"] = sort
+    # Enrichment stays lazy: only ads the ranking or the caller reads get routed.
+    compute_distances = bool(origin_location)
+
+    result = TopKResult()
+    own: List[Any] = []
+    seen = set()
+    for page in range(max_pages):
+        page_params = dict(params)
+        if page:
+            page_params[PAGE_PARAM] = page * PAGE_SIZE
+        if throttle is not None:
+            throttle()
+        search = fetch_search(
+            query=query,
+            city=city,
+            category=category,
+            postal=postal,
+            search_distance=search_distance,
+            min_price=min_price,
+            max_price=max_price,
+            conditions=conditions,
+            extra_params=page_params,
+            origin_location=origin_location,
+            compute_distances=compute_distances,
+            filters=filters,
+            timeout=request_timeout,
+        )
+        result.pages += 1
+        ads = [ad for ad in getattr(search, "ads", []) if ad.url not in seen]
+        if not ads:
+            break  # Past the last page, or the offset was ignored
+        seen.update(ad.url for ad in ads)
+        result.scanned += len(ads)
+        straight = _straight_line(search) if ranker.needs_distance else None
+        own.extend(ad for ad in ads if heap.push(ad, straight(ad) if straight else None))
+
+        if sort and heap.full:
+            floor = _page_floor(ads, ranker.by)
+            if floor is not None and floor >= heap.bound:
+                result.stopped_early = page + 1 < max_pages
+                break
+
+    mine = {id(ad) for ad in own}
+    result.items = [ad for ad in heap.items() if id(ad) in mine]
+    result.elapsed_seconds = round(time.monotonic() - started, 3)
+    return result
@@ -0,0 +1,366 @@
+"""
+Watch mode for saved Craigslist searches.
+
+Re-running a search on a schedule normally re-parses and re-enriches every
+result. A watch remembers which posting IDs (d_pid) each saved search has
+already produced, so a poll only pays for what is new:
+  * Results are requested newest first (sort=date) and pages are fetched until
+    the first page made entirely of already-seen IDs, so a steady-state poll
+    costs about one page
+  * Seen IDs live in a durable table next to the listing database, fronted by
+    a per-search Bloom filter: a Bloom miss is new without touching SQLite,
+    only Bloom hits are checked against the table
+  * Each seen ID keeps a fingerprint of its title/price/location, so edited
+    and repriced posts come back as "changed"
+  * Only new and changed ads are enriched (drive distance, optional detail
+    fetch) and returned; everything else is dropped straight after parsing
+
+Usage:
+    from watch import Watcher
+
+    watcher = Watcher("nintendo switch", "southjersey", postal="08021", search_distance=25)
+    result = watcher.poll()
+    for ad in result.new + result.changed:
+        print(ad.title, ad.price, ad.url)
+
+    watcher.run(interval=900, on_result=handle)      # poll until interrupted
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import math
+import sys
+import time
+
+from listing_db import ListingDB
+
+_CRAIGSLIST_DIR = Path(__file__).resolve().parent / "craigslist_scraper_patched"
+
+# Craigslist result offset parameter and its page size.
+PAGE_PARAM = "s"
+PAGE_SIZE = 120
+
+WATCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watch_searches (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_polled_at TEXT,
+    bloom BLOB,
+    bloom_capacity INTEGER
+);
+CREATE TABLE IF NOT EXISTS watch_seen (
+    search_key TEXT NOT NULL,
+    d_pid INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (search_key, d_pid)
+) WITHOUT ROWID;
+"""
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 20000, error_rate: float = 0.001, data: Optional[bytes] = None) -> None:
+        """
+        Fixed-size Bloom filter over integer IDs.
+
+        Args:
+            capacity: Expected number of members before the error rate degrades
+            error_rate: Target false-positive probability at ``capacity``
+            data: Bit array from ``to_bytes()`` of a filter with the same parameters
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        size = (self.num_bits + 7) // 8
+        if data is not None and len(data) != size:
+            raise ValueError(f"Bloom filter data is {len(data)} bytes, expected {size}")
+        self.bits = bytearray(data) if data is not None else bytearray(size)
+
+    def _positions(self, key: int) -> Iterable[int]:
+        # Double hashing: k positions from one 128-bit digest.
+        digest = hashlib.blake2b(str(key).encode("ascii"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: int) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
+
+
+def fingerprint(ad: Any) -> str:
+    """Content fingerprint of a search card; changes when a post is edited or repriced."""
+    text = "\x1f".join(str(value or "") for value in (ad.title, ad.price, ad.location))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SeenStore:
+    def __init__(self, db: Optional[ListingDB] = None) -> None:
+        """Durable per-search seen IDs, stored in the listing database file."""
+        self.db = db or ListingDB()
+        self.db.conn.executescript(WATCH_SCHEMA)
+
+    def load_bloom(self, key: str, url: str, expected: int = 20000) -> BloomFilter:
+        """Bloom filter for saved search ``key``, rebuilt from the table if missing or full."""
+        conn = self.db.conn
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO watch_searches (key, url, created_at) VALUES (?, ?, ?)",
+                (key, url, _utc_now()),
+            )
+        row = conn.execute(
+            "SELECT bloom, bloom_capacity FROM watch_searches WHERE key = ?", (key,)
+        ).fetchone()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM watch_seen WHERE search_key = ?", (key,)
+        ).fetchone()[0]
+
+        capacity = row["bloom_capacity"] or expected
+        if row["bloom"] is not None and count <= capacity:
+            return BloomFilter(capacity, data=row["bloom"])
+
+        # Missing or over capacity: size for twice the current population and refill.
+        bloom = BloomFilter(max(expected, count * 2))
+        for (d_pid,) in conn.execute("SELECT d_pid FROM watch_seen WHERE search_key = ?", (key,)):
+            bloom.add(d_pid)
+        return bloom
+
+    def fingerprints(self, key: str, d_pids: Sequence[int]) -> Dict[int, str]:
+        if not d_pids:
+            return {}
+        placeholders = ",".join("?" * len(d_pids))
+        rows = self.db.conn.execute(
+            f"SELECT d_pid, fingerprint FROM watch_seen WHERE search_key = ? AND d_pid IN ({placeholders})",
+            (key, *d_pids),
+        )
+        return {row["d_pid"]: row["fingerprint"] for row in rows}
+
+    def record(self, key: str, items: Sequence[Tuple[int, str]], bloom: BloomFilter) -> None:
+        """Store (d_pid, fingerprint) pairs and the updated Bloom filter in one transaction."""
+        now = _utc_now()
+        conn = self.db.conn
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO watch_seen (search_key, d_pid, fingerprint, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(search_key, d_pid) DO UPDATE SET
+                    fingerprint = excluded.fingerprint, last_seen = excluded.last_seen
+                """,
+                [(key, d_pid, digest, now, now) for d_pid, digest in items],
+            )
+            conn.execute(
+                "UPDATE watch_searches SET bloom = ?, bloom_capacity = ?, last_polled_at = ? WHERE key = ?",
+                (bloom.to_bytes(), bloom.capacity, now, key),
+            )
+
+    def poll_history(self, key: str) -> Tuple[List[Tuple[str, int]], Optional[str]]:
+        """
+        New-ID counts per poll for ``key`` and its last poll time.
+
+        Every ID recorded by one poll shares that poll's first_seen timestamp,
+        so grouping by it yields (poll time, new IDs) pairs, oldest first.
+        """
+        conn = self.db.conn
+        batches = [
+            (row[0], row[1])
+            for row in conn.execute(
+                "SELECT first_seen, COUNT(*) FROM watch_seen WHERE search_key = ? "
+                "GROUP BY first_seen ORDER BY first_seen",
+                (key,),
+            )
+        ]
+        row = conn.execute("SELECT last_polled_at FROM watch_searches WHERE key = ?", (key,)).fetchone()
+        return batches, row[0] if row else None
+
+    def forget(self, key: str) -> None:
+        """Drop a saved search and its seen IDs (the next poll starts fresh)."""
+        with self.db.conn:
+            self.db.conn.execute("DELETE FROM watch_seen WHERE search_key = ?", (key,))
+            self.db.conn.execute("DELETE FROM watch_searches WHERE key = ?", (key,))
+
+
+@dataclass
+class WatchResult:
+    key: str
+    new: List[Any] = field(default_factory=list)
+    changed: List[Any] = field(default_factory=list)
+    pages: int = 0
+    scanned: int = 0
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "pages": self.pages,
+            "scanned": self.scanned,
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+class Watcher:
+    def __init__(
+        self,
+        query: str,
+        city: str,
+        category: str = "sss",
+        postal: Optional[str] = None,
+        search_distance: Optional[int] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        conditions: Optional[List] = None,
+        extra_params: Optional[Dict] = None,
+        origin_location: Optional[str] = None,
+        name: Optional[str] = None,
+        store: Optional[SeenStore] = None,
+        max_pages: int = 5,
+        compute_distances: bool = True,
+        fetch_details: bool = False,
+        request_timeout: float = 20.0,
+        throttle: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        A saved Craigslist search polled for new postings.
+
+        Args:
+            query, city, category, postal, search_distance, min_price, max_price,
+            conditions, extra_params, origin_location: As for fetch_search()
+            name: Saved-search key (default: the search URL)
+            store: Seen-ID store (default: one in the default listing database)
+            max_pages: Page cap per poll, mainly for the first poll of a new search
+            compute_distances: Enrich new/changed ads with drive metrics
+            fetch_details: Also fetch each new/changed ad page (description, images)
+            request_timeout: Per-request timeout in seconds
+            throttle: Called (and may block) before every HTTP request, e.g. a
+                      shared rate limiter from poll_scheduler
+        """
+        if str(_CRAIGSLIST_DIR) not in sys.path:
+            sys.path.insert(0, str(_CRAIGSLIST_DIR))
+        from search import fetch_search
+        from utils import build_url
+
+        self._fetch_search = fetch_search
+        self.search_kwargs = {
+            "query": query,
+            "city": city,
+            "category": category,
+            "postal": postal,
+            "search_distance": search_distance,
+            "min_price": min_price,
+            "max_price": max_price,
+            "conditions": conditions,
+        }
+        self.extra_params = dict(extra_params or {}, sort="date")
+        self.url = build_url(extra_params=self.extra_params, **self.search_kwargs)
+        self.key = name or self.url
+        self.origin_location = origin_location
+        self.store = store or SeenStore()
+        self.max_pages = max_pages
+        self.compute_distances = compute_distances
+        self.fetch_details = fetch_details
+        self.request_timeout = request_timeout
+        self.throttle = throttle
+
+    def _fetch_page(self, page: int) -> Any:
+        extra = dict(self.extra_params)
+        if page:
+            extra[PAGE_PARAM] = page * PAGE_SIZE
+        if self.throttle is not None:
+            self.throttle()
+        return self._fetch_search(
+            extra_params=extra,
+            origin_location=self.origin_location if self.compute_distances else None,
+            compute_distances=self.compute_distances,
+            timeout=self.request_timeout,
+            **self.search_kwargs,
+        )
+
+    def _fetch_detail(self, ad: Any) -> int:
+        if self.throttle is not None:
+            self.throttle()
+        return ad.fetch(timeout=self.request_timeout)
+
+    def poll(self) -> WatchResult:
+        """Fetch pages until one is entirely already seen; return new and changed ads."""
+        started = time.monotonic()
+        result = WatchResult(self.key)
+        bloom = self.store.load_bloom(self.key, self.url)
+        polled_ids = set()
+        updates: List[Tuple[int, str]] = []
+
+        for page in range(self.max_pages):
+            search = self._fetch_page(page)
+            ads = [ad for ad in search.ads if ad.d_pid is not None and ad.d_pid not in polled_ids]
+            result.pages += 1
+            if not ads:
+                # Empty page, or the server ignored the offset and repeated a page.
+                break
+            result.scanned += len(ads)
+            polled_ids.update(ad.d_pid for ad in ads)
+
+            # Bloom misses are certainly new; only hits need the durable table.
+            maybe_seen = [ad.d_pid for ad in ads if ad.d_pid in bloom]
+            known = self.store.fingerprints(self.key, maybe_seen)
+
+            fresh = []
+            for ad in ads:
+                digest = fingerprint(ad)
+                previous = known.get(ad.d_pid)
+                if previous == digest:
+                    continue
+                (result.changed if previous is not None else result.new).append(ad)
+                fresh.append(ad)
+                updates.append((ad.d_pid, digest))
+
+            if fresh:
+                search.enrich_distances(ads=fresh)
+            if len(known) == len(ads):
+                break
+
+        fresh = result.new + result.changed
+        if self.fetch_details and fresh:
+            with ThreadPoolExecutor(max_workers=4, thread_name_prefix="watch-detail") as executor:
+                list(executor.map(self._fetch_detail, fresh))
+
+        for d_pid, _ in updates:
+            bloom.add(d_pid)
+        self.store.record(self.key, updates, bloom)
+        result.elapsed_seconds = round(time.monotonic() - started, 3)
+        return result
+
+    def run(
+        self,
+        interval: float = 900.0,
+        on_result: Optional[Callable[[WatchResult], None]] = None,
+        max_polls: Optional[int] = None,
+    ) -> None:
+        """Poll every ``interval`` seconds until interrupted (or ``max_polls`` polls)."""
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            started = time.monotonic()
+            result = self.poll()
+            polls += 1
+            if on_result is not None:
+                on_result(result)
+            if max_polls is not None and polls >= max_polls:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))